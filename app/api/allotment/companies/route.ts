@@ -1,5 +1,6 @@
 import { NextResponse } from 'next/server'
 import { redis } from '@/lib/redis'
+import { decodeCached } from '@/lib/redis-codec'
 import { exec } from 'child_process'
 import { promisify } from 'util'
 import path from 'path'
@@ -10,7 +11,7 @@ export async function GET() {
   try {
     // Check cache first
     const cacheKey = 'ipo:companies:active'
-    const cachedCompanies = await redis.get(cacheKey)
+    const cachedCompanies = decodeCached(await redis.get(cacheKey))
 
     if (cachedCompanies) {
       return NextResponse.json({
@@ -34,8 +35,10 @@ export async function GET() {
       HEADLESS_BROWSER: 'true',
     }
 
+    // get-companies re-checks the cache, scrapes on a miss and stores the
+    // combined list itself
     const { stdout, stderr } = await execAsync(
-      `${pythonPath} ${mainScript} scrape-all`,
+      `${pythonPath} ${mainScript} get-companies`,
       {
         cwd: scriptsPath,
         env,
@@ -47,15 +50,9 @@ export async function GET() {
       console.log('Scraper logs:', stderr)
     }
 
-    const scrapedData = stdout ? JSON.parse(stdout) : {}
-
-    // Flatten all companies from all registrars
-    const allCompanies = Object.values(scrapedData).flat()
-
-    // Cache scraped data for 1 hour (3600 seconds)
-    if (allCompanies.length > 0) {
-      await redis.setex(cacheKey, 3600, allCompanies)
-    }
+    const allCompanies: { registrar?: string }[] = stdout ? JSON.parse(stdout) : []
+    const countFor = (registrar: string) =>
+      allCompanies.filter((company) => company.registrar === registrar).length
 
     return NextResponse.json({
       companies: allCompanies,
@@ -63,9 +60,9 @@ export async function GET() {
       source: 'python-scrapers',
       count: allCompanies.length,
       breakdown: {
-        bigshare: scrapedData.bigshare?.length || 0,
-        kfin: scrapedData.kfin?.length || 0,
-        linkintime: scrapedData.linkintime?.length || 0,
+        bigshare: countFor('bigshare'),
+        kfin: countFor('kfin'),
+        linkintime: countFor('linkintime'),
       }
     })
   } catch (error) {
@@ -1,5 +1,6 @@
 import { NextResponse } from 'next/server'
 import { redis } from '@/lib/redis'
+import { decodeCached } from '@/lib/redis-codec'
 
 // Dynamically detect available registrars based on scraped data
 export async function GET() {
@@ -16,7 +17,7 @@ export async function GET() {
 
     // Get unique registrars from companies data
     const companiesCacheKey = 'ipo:companies:active'
-    const companies = await redis.get<Array<{ registrar: string; name: string }>>(companiesCacheKey)
+    const companies = decodeCached<Array<{ registrar: string; name: string }>>(await redis.get(companiesCacheKey))
 
     const registrars = [
       { value: "kfin", label: "KFin Technologies", icon: "⚡", available: false, count: 0 },
@@ -9,6 +9,10 @@ const execAsync = promisify(exec)
  * Cron endpoint to sync all registrar data
  * Can be called by Vercel Cron or external cron service
  *
+ * Runs `main.py watch --once`: each registrar's company list is probed with a
+ * cheap HTTP request and only registrars whose list changed (or whose last
+ * scrape is stale) get a browser scrape. Pass ?force=1 to scrape all.
+ *
  * Add to vercel.json:
  * {
  *   "crons": [{
@@ -45,8 +49,9 @@ export async function GET(request: Request) {
 
     const startTime = Date.now()
 
+    const force = new URL(request.url).searchParams.get('force') === '1'
     const { stdout, stderr } = await execAsync(
-      `${pythonPath} ${mainScript} scrape-all`,
+      `${pythonPath} ${mainScript} watch --once${force ? ' --force' : ''}`,
       {
         cwd: scriptsPath,
         env,
@@ -56,21 +61,21 @@ export async function GET(request: Request) {
 
     const duration = Date.now() - startTime
 
-    const result = stdout ? JSON.parse(stdout) : {}
-    const totalCompanies = Object.values(result).flat().length
+    const result: Record<string, { scraped: boolean; companies?: number }> = stdout ? JSON.parse(stdout) : {}
+    const scraped = Object.keys(result).filter((registrar) => result[registrar].scraped)
+    const totalCompanies = scraped.reduce((total, registrar) => total + (result[registrar].companies || 0), 0)
 
-    console.log(`[CRON] Scraper sync completed in ${duration}ms. Found ${totalCompanies} companies.`)
+    console.log(
+      `[CRON] Scraper sync completed in ${duration}ms. Scraped ${scraped.join(', ') || 'nothing'}; found ${totalCompanies} companies.`
+    )
 
     return NextResponse.json({
       success: true,
       message: 'Scraper sync completed',
       duration,
       totalCompanies,
-      breakdown: {
-        bigshare: result.bigshare?.length || 0,
-        kfin: result.kfin?.length || 0,
-        linkintime: result.linkintime?.length || 0,
-      },
+      scraped,
+      breakdown: result,
       timestamp: new Date().toISOString(),
     })
   } catch (error: any) {
@@ -2,6 +2,8 @@ import { NextRequest, NextResponse } from 'next/server'
 import { exec } from 'child_process'
 import { promisify } from 'util'
 import path from 'path'
+import { callScraperService } from '@/lib/scraper-service'
+import { runQueuedScraperJob } from '@/lib/scraper-queue'
 
 const execAsync = promisify(exec)
 
@@ -17,6 +19,27 @@ export async function POST(request: NextRequest) {
       )
     }
 
+    const jobParams = {
+      registrar,
+      pan,
+      company_value: companyValue,
+      application_number: applicationNumber,
+      dp_id: dpId,
+      client_id: clientId,
+      url,
+    }
+
+    const serviceResult =
+      (await runQueuedScraperJob('check-allotment', jobParams, 60000)) ??
+      (await callScraperService('check-allotment', jobParams, 60000))
+
+    if (serviceResult !== null) {
+      return NextResponse.json({
+        success: true,
+        data: serviceResult,
+      })
+    }
+
     const scriptsPath = path.join(process.cwd(), 'scrapers')
     const pythonPath = path.join(scriptsPath, 'venv', 'bin', 'python')
     const mainScript = path.join(scriptsPath, 'main.py')
@@ -3,6 +3,8 @@ import { exec } from 'child_process'
 import { promisify } from 'util'
 import path from 'path'
 import { redis } from '@/lib/redis'
+import { decodeCached } from '@/lib/redis-codec'
+import { callScraperService } from '@/lib/scraper-service'
 
 const execAsync = promisify(exec)
 
@@ -12,6 +14,19 @@ export async function POST(request: NextRequest) {
     const body = await request.json()
     const { registrar } = body // optional, if not provided scrapes all
 
+    const serviceResult = await callScraperService(
+      registrar ? 'scrape-companies' : 'scrape-all',
+      registrar ? { registrar } : {},
+      120000
+    )
+
+    if (serviceResult !== null) {
+      return NextResponse.json({
+        success: true,
+        data: serviceResult,
+      })
+    }
+
     const scriptsPath = path.join(process.cwd(), 'scrapers')
     const pythonPath = path.join(scriptsPath, 'venv', 'bin', 'python')
     const mainScript = path.join(scriptsPath, 'main.py')
@@ -73,7 +88,7 @@ export async function GET(request: NextRequest) {
       ? `ipo:companies:${registrar}`
       : 'ipo:companies:active'
 
-    const companies = await redis.get(cacheKey)
+    const companies = decodeCached(await redis.get(cacheKey))
 
     if (!companies) {
       return NextResponse.json({
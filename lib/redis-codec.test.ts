@@ -0,0 +1,34 @@
+// Decodes values written by scrapers/utils/codec.py (see
+// scrapers/tests/test_codec.py, which produces and checks the fixture).
+// Run with `npm test`.
+import { test } from 'node:test'
+import assert from 'node:assert/strict'
+import { readFileSync } from 'fs'
+import { join } from 'path'
+import { decodeCached } from './redis-codec'
+
+const fixture = JSON.parse(
+  readFileSync(join(__dirname, '..', 'scrapers', 'tests', 'fixtures', 'codec_values.json'), 'utf8')
+)
+
+test('decodes msgpack company lists', () => {
+  assert.ok(fixture.encoded['msgpack'].startsWith('bv1:m:'))
+  assert.deepEqual(decodeCached(fixture.encoded['msgpack']), fixture.value)
+})
+
+test('decodes zlib-compressed msgpack company lists', () => {
+  assert.ok(fixture.encoded['msgpack+zlib'].startsWith('bv1:mz:'))
+  assert.deepEqual(decodeCached(fixture.encoded['msgpack+zlib']), fixture.value)
+})
+
+test('rejects zstd, which the scrapers never write to keys read here', () => {
+  assert.ok(fixture.encoded['msgpack+zstd'].startsWith('bv1:mzs:'))
+  assert.throws(() => decodeCached(fixture.encoded['msgpack+zstd']), /Unsupported cached value encoding: mzs/)
+})
+
+test('passes plain values through', () => {
+  const result = { status: 'allotted', shares: 10 }
+  assert.equal(decodeCached(result), result)
+  assert.equal(decodeCached('plain text'), 'plain text')
+  assert.equal(decodeCached(null), null)
+})
@@ -0,0 +1,131 @@
+// Reader for the compact values written by scrapers/utils/codec.py when
+// REDIS_ENCODING is not json: "bv1:<tag>:" + base64 of msgpack, optionally
+// zlib-compressed, with company lists packed as an interned table. Plain JSON
+// values (already parsed by @upstash/redis) pass through unchanged.
+import { inflateSync } from 'zlib'
+
+const PREFIX = 'bv1:'
+const COMPANY_TABLE = 'companies/1'
+const INTERNED_FIELDS = new Set(['registrar', 'url', 'status', 'ipoType'])
+
+class MsgpackReader {
+  private offset = 0
+  private view: DataView
+
+  constructor(private bytes: Buffer) {
+    this.view = new DataView(bytes.buffer, bytes.byteOffset, bytes.byteLength)
+  }
+
+  read(): any {
+    const type = this.bytes[this.offset++]
+    if (type <= 0x7f) return type
+    if (type >= 0xe0) return type - 0x100
+    if ((type & 0xf0) === 0x80) return this.map(type & 0x0f)
+    if ((type & 0xf0) === 0x90) return this.array(type & 0x0f)
+    if ((type & 0xe0) === 0xa0) return this.str(type & 0x1f)
+
+    switch (type) {
+      case 0xc0: return null
+      case 0xc2: return false
+      case 0xc3: return true
+      case 0xc4: return this.bin(this.uint(1))
+      case 0xc5: return this.bin(this.uint(2))
+      case 0xc6: return this.bin(this.uint(4))
+      case 0xca: return this.float(4)
+      case 0xcb: return this.float(8)
+      case 0xcc: return this.uint(1)
+      case 0xcd: return this.uint(2)
+      case 0xce: return this.uint(4)
+      case 0xcf: return this.uint(8)
+      case 0xd0: return this.int(1)
+      case 0xd1: return this.int(2)
+      case 0xd2: return this.int(4)
+      case 0xd3: return this.int(8)
+      case 0xd9: return this.str(this.uint(1))
+      case 0xda: return this.str(this.uint(2))
+      case 0xdb: return this.str(this.uint(4))
+      case 0xdc: return this.array(this.uint(2))
+      case 0xdd: return this.array(this.uint(4))
+      case 0xde: return this.map(this.uint(2))
+      case 0xdf: return this.map(this.uint(4))
+      default: throw new Error(`Unsupported msgpack type 0x${type.toString(16)}`)
+    }
+  }
+
+  private uint(size: number): number {
+    const at = this.offset
+    this.offset += size
+    if (size === 1) return this.view.getUint8(at)
+    if (size === 2) return this.view.getUint16(at)
+    if (size === 4) return this.view.getUint32(at)
+    return Number(this.view.getBigUint64(at))
+  }
+
+  private int(size: number): number {
+    const at = this.offset
+    this.offset += size
+    if (size === 1) return this.view.getInt8(at)
+    if (size === 2) return this.view.getInt16(at)
+    if (size === 4) return this.view.getInt32(at)
+    return Number(this.view.getBigInt64(at))
+  }
+
+  private float(size: number): number {
+    const at = this.offset
+    this.offset += size
+    return size === 4 ? this.view.getFloat32(at) : this.view.getFloat64(at)
+  }
+
+  private str(length: number): string {
+    const value = this.bytes.toString('utf8', this.offset, this.offset + length)
+    this.offset += length
+    return value
+  }
+
+  private bin(length: number): Buffer {
+    const value = this.bytes.subarray(this.offset, this.offset + length)
+    this.offset += length
+    return value
+  }
+
+  private array(length: number): any[] {
+    const items = new Array(length)
+    for (let i = 0; i < length; i++) items[i] = this.read()
+    return items
+  }
+
+  private map(length: number): Record<string, any> {
+    const value: Record<string, any> = {}
+    for (let i = 0; i < length; i++) {
+      const key = this.read()
+      value[String(key)] = this.read()
+    }
+    return value
+  }
+}
+
+function unpackCompanies(table: { k: string[][]; v: any[]; r: any[][] }): Record<string, any>[] {
+  return table.r.map((row) => {
+    const fields = table.k[row[0]]
+    const company: Record<string, any> = {}
+    fields.forEach((field, i) => {
+      company[field] = INTERNED_FIELDS.has(field) ? table.v[row[i + 1]] : row[i + 1]
+    })
+    return company
+  })
+}
+
+export function decodeCached<T = any>(value: unknown): T | null {
+  if (typeof value !== 'string' || !value.startsWith(PREFIX)) return (value as T) ?? null
+
+  const rest = value.slice(PREFIX.length)
+  const separator = rest.indexOf(':')
+  const tag = rest.slice(0, separator)
+  let bytes = Buffer.from(rest.slice(separator + 1), 'base64')
+  if (tag === 'mz') bytes = inflateSync(bytes)
+  else if (tag !== 'm') throw new Error(`Unsupported cached value encoding: ${tag}`)
+
+  const decoded = new MsgpackReader(bytes).read()
+  if (decoded && decoded.$t === COMPANY_TABLE) return unpackCompanies(decoded) as T
+  return decoded as T
+}
@@ -0,0 +1,41 @@
+// Client for the Redis work queue consumed by `python main.py worker`.
+// Returns null when SCRAPER_QUEUE is not enabled so callers can fall back to
+// the scraper service or to spawning main.py. Records match
+// scrapers/utils/work_queue.py.
+import { randomUUID } from 'crypto'
+
+const PREFIX = process.env.WORK_QUEUE_PREFIX || 'ipo:queue'
+const RESULT_TTL = 3600
+
+type Lane = 'interactive' | 'batch' | 'background'
+
+export async function runQueuedScraperJob(
+  job: 'scrape-companies' | 'scrape-all' | 'check-allotment' | 'check-allotment-batch',
+  params: Record<string, unknown>,
+  timeoutMs: number,
+  lane: Lane = 'interactive'
+): Promise<any | null> {
+  if (process.env.SCRAPER_QUEUE !== 'true') return null
+
+  // Imported lazily: lib/redis throws when Redis is not configured
+  const { redis } = await import('@/lib/redis')
+
+  const id = randomUUID().replace(/-/g, '')
+  const record = { id, job, params, lane, attempts: 0, enqueuedAt: Date.now() / 1000 }
+  await redis.set(`${PREFIX}:job:${id}`, JSON.stringify(record), { ex: RESULT_TTL })
+  await redis.lpush(`${PREFIX}:pending:${lane}`, id)
+
+  const deadline = Date.now() + timeoutMs
+  let delay = 200
+  while (Date.now() + delay <= deadline) {
+    await new Promise((resolve) => setTimeout(resolve, delay))
+    const outcome = await redis.get<{ ok: boolean; result?: any; error?: string }>(`${PREFIX}:result:${id}`)
+    if (outcome) {
+      if (!outcome.ok) throw new Error(outcome.error || 'Scraper job failed')
+      return outcome.result
+    }
+    delay = Math.min(delay * 1.5, 1000)
+  }
+
+  throw new Error(`Scraper job ${id} did not finish within ${timeoutMs}ms`)
+}
@@ -0,0 +1,25 @@
+// Client for the long-lived Python scraper service (`python main.py serve`).
+// Returns null when SCRAPER_SERVICE_URL is not configured so callers can
+// fall back to spawning main.py.
+export async function callScraperService(
+  job: 'scrape-companies' | 'scrape-all' | 'check-allotment',
+  params: Record<string, unknown>,
+  timeoutMs: number
+): Promise<any | null> {
+  const serviceUrl = process.env.SCRAPER_SERVICE_URL
+  if (!serviceUrl) return null
+
+  const response = await fetch(`${serviceUrl.replace(/\/$/, '')}/${job}`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify(params),
+    signal: AbortSignal.timeout(timeoutMs),
+  })
+
+  const payload = await response.json()
+  if (!response.ok) {
+    throw new Error(payload.error || `Scraper service returned ${response.status}`)
+  }
+
+  return payload
+}
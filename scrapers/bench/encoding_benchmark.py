@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Redis value encoding benchmark
+Compares the stored size and encode/decode time of each encoding in
+utils/codec.py on company lists shaped like the scrapers' output (per
+registrar and the combined ipo:companies:active list) and on cached
+allotment results.
+
+Usage:
+  python bench/encoding_benchmark.py --companies=60 --iterations=500
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+from typing import Callable, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench.stand_in_server import COMPANIES  # noqa: E402
+from config import REGISTRAR_URLS  # noqa: E402
+from utils import codec  # noqa: E402
+from utils.redis_client import RedisClient  # noqa: E402
+
+
+def company_list(registrar: str, count: int) -> List[Dict]:
+    """count companies for a registrar, cycling through the stand-in names"""
+    companies = []
+    for index in range(count):
+        value, name = COMPANIES[registrar][index % len(COMPANIES[registrar])]
+        name = f"{name} {index}" if index >= len(COMPANIES[registrar]) else name
+        companies.append({
+            "name": name,
+            "registrar": registrar,
+            "ipoType": "sme" if "SME" in name else "mainboard",
+            "status": "active",
+            "url": REGISTRAR_URLS[registrar],
+            "companyValue": f"{value}-{index}",
+        })
+    return companies
+
+
+ALLOTMENT_RESULT = {
+    "status": "allotted",
+    "message": "Congratulations! Shares have been allotted",
+    "sharesApplied": "150",
+    "sharesAllotted": "50",
+    "applicationNumber": "1234567890",
+    "name": "RAMESH KUMAR",
+}
+
+
+def time_per_call(operation: Callable[[], object], iterations: int) -> float:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        operation()
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Redis value encoding benchmark")
+    parser.add_argument("--companies", type=int, default=60, help="Companies per registrar")
+    parser.add_argument("--iterations", type=int, default=500)
+    args = parser.parse_args()
+
+    per_registrar = {registrar: company_list(registrar, args.companies) for registrar in COMPANIES}
+    values = {
+        "companies:kfin": per_registrar["kfin"],
+        "companies:active": [company for companies in per_registrar.values() for company in companies],
+        "allotment_result": ALLOTMENT_RESULT,
+    }
+
+    encodings = [encoding for encoding in codec.ENCODINGS if codec.available_encoding(encoding) == encoding]
+    results = []
+    for case, value in values.items():
+        baseline = None
+        for encoding in encodings:
+            stored = RedisClient._encode(value, encoding)
+            if RedisClient._decode(stored) != value:
+                raise AssertionError(f"{encoding} did not round-trip {case}")
+            size = len(stored.encode("utf-8"))
+            baseline = baseline or size
+            row = {
+                "case": case,
+                "encoding": encoding,
+                "bytes": size,
+                "ratio": round(size / baseline, 3),
+                "encodeMicroseconds": round(time_per_call(lambda: RedisClient._encode(value, encoding), args.iterations), 1),
+                "decodeMicroseconds": round(time_per_call(lambda: RedisClient._decode(stored), args.iterations), 1),
+            }
+            results.append(row)
+            print(
+                f"{case:18} {encoding:13} {size:8d} B  x{row['ratio']:<6} "
+                f"enc {row['encodeMicroseconds']:8.1f}us  dec {row['decodeMicroseconds']:8.1f}us",
+                file=sys.stderr,
+            )
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Allotment result parsing benchmark
+Compares the old approach (BeautifulSoup with html.parser over the whole
+page_source) with each installed parsing backend over the result fragment
+the scrapers now pull from the DOM, using pages rendered by the stand-in.
+
+Usage:
+  python bench/parse_benchmark.py --iterations=2000
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+from typing import Callable, Dict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests  # noqa: E402
+from bs4 import BeautifulSoup  # noqa: E402
+from bench.stand_in_server import PATHS, company_values, outcome_for, start_in_thread  # noqa: E402
+from scrapers.parsing import available_backends, get_backend  # noqa: E402
+
+FORM_FIELDS = {
+    "bigshare": ("ddlCompany", "txtPanNo"),
+    "kfin": ("ddlIssue", "txtPAN"),
+    "linkintime": ("ddlCompany", "pan"),
+}
+
+
+def pan_with_outcome(allotted: bool) -> str:
+    for suffix in "ABCDEFGHIJ":
+        pan = "ABCDE1234" + suffix
+        if outcome_for(pan)[0] == allotted:
+            return pan
+    raise ValueError("No PAN found")
+
+
+def scraper_for(registrar: str):
+    from scrapers.bigshare_scraper import BigshareScraper
+    from scrapers.kfin_scraper import KFinScraper
+    from scrapers.linkintime_scraper import LinkIntimeScraper
+
+    return {"bigshare": BigshareScraper, "kfin": KFinScraper, "linkintime": LinkIntimeScraper}[registrar]()
+
+
+def fragment(page: str, scope: str) -> str:
+    """What SCOPE_HTML_SCRIPT returns for this page"""
+    soup = BeautifulSoup(page, "html.parser")
+    matched = soup.select(scope)
+    outer = [el for el in matched if not any(other is not el and el in other.descendants for other in matched)]
+    return "".join(str(el) for el in outer)
+
+
+def time_per_call(operation: Callable[[], object], iterations: int) -> float:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        operation()
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Allotment result parsing benchmark")
+    parser.add_argument("--iterations", type=int, default=1000)
+    parser.add_argument("--padding", type=int, default=200, help="Extra table rows appended to each page, like real page chrome")
+    args = parser.parse_args()
+
+    server = start_in_thread()
+    padding = "<table>" + "<tr><td>menu</td><td>item</td></tr>" * args.padding + "</table>"
+    results = []
+
+    for registrar, (company_field, pan_field) in FORM_FIELDS.items():
+        scraper = scraper_for(registrar)
+        selectors = scraper.RESULT_SELECTORS
+
+        for allotted in (True, False):
+            pan = pan_with_outcome(allotted)
+            page = requests.post(
+                server.base_url + PATHS[registrar],
+                data={company_field: company_values(registrar)[0], pan_field: pan},
+                timeout=10,
+            ).text.replace("</body>", padding + "</body>")
+            scoped = fragment(page, selectors.scope)
+            case = f"{registrar}:{'allotted' if allotted else 'not_allotted'}"
+
+            timings: Dict[str, float] = {
+                "bs4_full_page": time_per_call(
+                    lambda: BeautifulSoup(page, "html.parser").find("div"), args.iterations
+                ),
+            }
+            for name in available_backends():
+                backend = get_backend(name)
+                result = scraper.parse_allotment_result(selectors.parse(scoped, backend))
+                if result["status"] != ("allotted" if allotted else "not_allotted"):
+                    raise AssertionError(f"{name} misparsed {case}: {result}")
+                timings[f"{name}_fragment"] = time_per_call(
+                    lambda: scraper.parse_allotment_result(selectors.parse(scoped, backend)), args.iterations
+                )
+
+            results.append({"case": case, "pageBytes": len(page), "fragmentBytes": len(scoped), "microseconds": timings})
+            print(case, {name: round(value, 1) for name, value in timings.items()}, file=sys.stderr)
+
+    server.shutdown()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
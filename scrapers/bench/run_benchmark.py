@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Offline scraper benchmark against the local stand-in server
+Reports throughput, p50/p95/p99 latency and peak RSS for scrape_companies,
+single check_allotment and bulk (batch) allotment workloads, and can fail
+when results regress against a saved baseline.
+
+Usage:
+  python bench/run_benchmark.py --iterations=20 --output=bench.json
+  python bench/run_benchmark.py --baseline=bench.json --max-regression=0.2
+  python bench/run_benchmark.py --no-fast-path --workloads=check   # browser path (needs Chrome)
+  python bench/run_benchmark.py --no-fast-path --no-resource-policy   # compare page loads and driver RSS
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import string
+import argparse
+import resource
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench.stand_in_server import company_values, start_in_thread  # noqa: E402
+
+WORKLOADS = ["scrape", "check", "bulk"]
+
+
+def random_pan(rng: random.Random) -> str:
+    letters = string.ascii_uppercase
+    return (
+        "".join(rng.choice(letters) for _ in range(5))
+        + "".join(rng.choice(string.digits) for _ in range(4))
+        + rng.choice(letters)
+    )
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+
+def peak_rss_mb() -> Dict[str, float]:
+    """Peak RSS of this process and of the largest reaped child (Chrome/chromedriver)"""
+    scale = 1024.0 if sys.platform != "darwin" else 1024.0 * 1024.0
+    return {
+        "self": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale, 1),
+        "children": round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale, 1),
+    }
+
+
+def browser_stats(registrar: str) -> Dict:
+    """Mean page load and driver RSS recorded by the scrapers since the last reset"""
+    from utils.metrics import metrics
+
+    page_load = metrics.stage_stats.get((registrar, "page_load"))
+    rss = [stats for (name, labels), stats in metrics.observations.items()
+           if name == "driver_rss_mb" and dict(labels).get("registrar") == registrar]
+    return {
+        "pageLoadMean": round(page_load["sum"] / page_load["count"], 4) if page_load else None,
+        "driverRssMb": {
+            "mean": round(sum(s["sum"] for s in rss) / sum(s["count"] for s in rss), 1),
+            "max": max(s["max"] for s in rss),
+        } if rss else None,
+    }
+
+
+def measure(name: str, operation: Callable[[int], Dict], iterations: int, concurrency: int, units: int = 1) -> Dict:
+    """
+    Run operation(i) for i in range(iterations) on a thread pool
+
+    Each call returns a {status: count} dict; units is how many checks one
+    call covers, so bulk workloads report per-PAN throughput.
+    """
+    from utils.metrics import metrics
+
+    metrics.reset()
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+
+    def timed(index: int):
+        started = time.perf_counter()
+        outcome = operation(index)
+        latencies.append(time.perf_counter() - started)
+        for status, count in outcome.items():
+            statuses[status] = statuses.get(status, 0) + count
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(timed, range(iterations)))
+    wall = time.perf_counter() - started
+
+    result = {
+        "workload": name,
+        "iterations": iterations,
+        "concurrency": concurrency,
+        "throughput": round(iterations * units / wall, 3) if wall else 0.0,
+        "p50": round(percentile(latencies, 50), 4),
+        "p95": round(percentile(latencies, 95), 4),
+        "p99": round(percentile(latencies, 99), 4),
+        "statuses": statuses,
+        "peakRssMb": peak_rss_mb(),
+        "browser": browser_stats(name.split(":")[-1]),
+    }
+    print(
+        f"{name:<28} {result['throughput']:>9.2f}/s  p50={result['p50']:.3f}s  "
+        f"p95={result['p95']:.3f}s  p99={result['p99']:.3f}s  {statuses}",
+        file=sys.stderr,
+    )
+    return result
+
+
+def compare(results: List[Dict], baseline: List[Dict], max_regression: float) -> List[str]:
+    """Workloads whose p50 or throughput regressed by more than max_regression"""
+    previous = {entry["workload"]: entry for entry in baseline}
+    regressions = []
+    for entry in results:
+        before = previous.get(entry["workload"])
+        if not before:
+            continue
+        if before["p50"] and entry["p50"] > before["p50"] * (1 + max_regression):
+            regressions.append(f"{entry['workload']}: p50 {before['p50']}s -> {entry['p50']}s")
+        if before["throughput"] and entry["throughput"] < before["throughput"] * (1 - max_regression):
+            regressions.append(f"{entry['workload']}: throughput {before['throughput']}/s -> {entry['throughput']}/s")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline scraper benchmark")
+    parser.add_argument("--registrars", default="bigshare,kfin,linkintime")
+    parser.add_argument("--workloads", default=",".join(WORKLOADS), help="Comma-separated: " + ",".join(WORKLOADS))
+    parser.add_argument("--iterations", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--bulk-size", type=int, default=25, help="PANs per bulk batch")
+    parser.add_argument("--latency", type=float, default=0.05, help="Stand-in response latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.01)
+    parser.add_argument("--no-fast-path", action="store_true", help="Force the Selenium path")
+    parser.add_argument("--no-resource-policy", action="store_true", help="Let Chrome load every resource")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="Write results as JSON")
+    parser.add_argument("--baseline", help="Compare against a previous --output file")
+    parser.add_argument("--max-regression", type=float, default=0.2)
+    args = parser.parse_args()
+
+    server = start_in_thread(latency=args.latency, jitter=args.jitter)
+    os.environ.update(server.registrar_env())
+    os.environ["ALLOTMENT_FAST_PATH"] = "false" if args.no_fast_path else "true"
+    os.environ["SCRAPER_RESOURCE_POLICY"] = "false" if args.no_resource_policy else "true"
+    # Sample driver RSS on every check so short runs still report it
+    os.environ.setdefault("SCRAPER_RSS_SAMPLE_EVERY", "1")
+
+    # Imported after the environment points config.py at the stand-in
+    import main as scraper_main
+
+    rng = random.Random(args.seed)
+    registrars = [registrar.strip() for registrar in args.registrars.split(",") if registrar.strip()]
+    workloads = [workload.strip() for workload in args.workloads.split(",") if workload.strip()]
+    results = []
+
+    for registrar in registrars:
+        company_value = company_values(registrar)[0]
+
+        if "scrape" in workloads:
+            def scrape(_, registrar=registrar):
+                companies = scraper_main.scrape_companies(registrar, store=False)
+                return {"companies": len(companies)}
+
+            results.append(measure(f"scrape_companies:{registrar}", scrape, args.iterations, args.concurrency))
+
+        if "check" in workloads:
+            pans = [random_pan(rng) for _ in range(args.iterations)]
+
+            def check(index, registrar=registrar, company_value=company_value, pans=pans):
+                result = scraper_main.check_allotment(
+                    registrar, pans[index], use_cache=False, company_value=company_value
+                )
+                return {result.get("status", "unknown"): 1}
+
+            results.append(measure(f"check_allotment:{registrar}", check, args.iterations, args.concurrency))
+
+        if "bulk" in workloads:
+            batches = [[random_pan(rng) for _ in range(args.bulk_size)] for _ in range(args.iterations)]
+
+            def bulk(index, registrar=registrar, company_value=company_value, batches=batches):
+                statuses: Dict[str, int] = {}
+                for result in scraper_main.check_allotment_batch(
+                    registrar, company_value, batches[index], use_cache=False
+                ):
+                    statuses[result.get("status", "unknown")] = statuses.get(result.get("status", "unknown"), 0) + 1
+                return statuses
+
+            results.append(
+                measure(f"bulk_allotment:{registrar}", bulk, args.iterations, args.concurrency, units=args.bulk_size)
+            )
+
+    server.shutdown()
+    report = {"config": vars(args), "results": results, "standInRequests": server.requests}
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f)["results"], args.max_regression)
+        if regressions:
+            print("Performance regressions:", file=sys.stderr)
+            for regression in regressions:
+                print(f"  {regression}", file=sys.stderr)
+            sys.exit(1)
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Result sink benchmark
+Writes the same allotment results through utils/result_sink.py once per row
+(batch size 1: one transaction and round trip per PAN, the baseline) and in
+batches, and reports rows per second. Uses a fresh SQLite file by default;
+pass --database-url and the id of an existing IPOCompany to measure Postgres
+(COPY and multi-row INSERT).
+
+Usage:
+  python bench/sink_benchmark.py --rows=5000 --batch-size=500
+  python bench/sink_benchmark.py --rows=5000 --database-url=postgresql://... --company-id=clx...
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+from typing import Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.result_sink import PostgresBackend, ResultSink, SinkBackend, SqliteBackend  # noqa: E402
+
+
+def results(count: int) -> List[Dict]:
+    """Allotment results shaped like the scrapers' output, a third of them allotted"""
+    rows = []
+    for index in range(count):
+        if index % 3 == 0:
+            result = {"status": "allotted", "shares": 50, "amount": "₹7,450.00", "refundAmount": "₹0"}
+        else:
+            result = {"status": "not_allotted", "message": "Not allotted"}
+        rows.append({"pan": f"ABCDE{index % 10000:04d}F", "result": result})
+    return rows
+
+
+def run(backend: SinkBackend, company_id: str, rows: List[Dict], batch_size: int) -> float:
+    """Rows per second through a sink with this batch size"""
+    sink = ResultSink(backend, batch_size=batch_size, flush_interval=3600)
+    started = time.perf_counter()
+    for row in rows:
+        sink.add(row["result"], row["pan"], company_id=company_id)
+    sink.flush()
+    elapsed = time.perf_counter() - started
+    if sink.counts["written"] != len(rows):
+        raise AssertionError(f"Wrote {sink.counts['written']} of {len(rows)} rows: {sink.counts}")
+    return len(rows) / elapsed
+
+
+def sqlite_backend(directory: str, name: str) -> SqliteBackend:
+    backend = SqliteBackend(os.path.join(directory, f"{name}.db"))
+    with backend.conn:
+        backend.conn.execute(
+            'INSERT INTO "IPOCompany" ("id", "name", "registrar") VALUES (?, ?, ?)', ("bench", "Bench Co", "kfin")
+        )
+    return backend
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Result sink benchmark")
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--database-url", help="Postgres URL (default: a temporary SQLite file)")
+    parser.add_argument("--company-id", help="IPOCompany id to attach rows to (Postgres only)")
+    args = parser.parse_args()
+
+    rows = results(args.rows)
+    report = []
+    with tempfile.TemporaryDirectory() as directory:
+        if args.database_url:
+            if not args.company_id:
+                parser.error("--company-id is required with --database-url")
+            cases = [
+                ("postgres", "per-row", lambda: PostgresBackend(args.database_url, "insert"), 1),
+                ("postgres", "insert", lambda: PostgresBackend(args.database_url, "insert"), args.batch_size),
+                ("postgres", "copy", lambda: PostgresBackend(args.database_url, "copy"), args.batch_size),
+            ]
+            company_id = args.company_id
+        else:
+            cases = [
+                ("sqlite", "per-row", lambda: sqlite_backend(directory, "per-row"), 1),
+                ("sqlite", "batched", lambda: sqlite_backend(directory, "batched"), args.batch_size),
+            ]
+            company_id = "bench"
+
+        baseline = None
+        for database, mode, make_backend, batch_size in cases:
+            backend = make_backend()
+            try:
+                rate = run(backend, company_id, rows, batch_size)
+            finally:
+                backend.close()
+            baseline = baseline or rate
+            row = {
+                "database": database,
+                "mode": mode,
+                "batchSize": batch_size,
+                "rows": args.rows,
+                "rowsPerSecond": round(rate, 1),
+                "speedup": round(rate / baseline, 1),
+            }
+            report.append(row)
+            print(f"{database:9} {mode:8} batch {batch_size:5d}  {rate:10.1f} rows/s  x{row['speedup']}", file=sys.stderr)
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the registrar sites
+Serves recorded-style pages for Bigshare ipo_status.html (ddlCompany /
+gvAllotmentDetails), the KFin Material-UI dropdown and the Link Intime form,
+plus the JSON/XML endpoints behind the HTTP fast path, with configurable
+latency. Allotment outcomes are derived
+deterministically from the PAN.
+
+Usage:
+  python bench/stand_in_server.py --port=8899 --latency=0.05
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from html import escape
+from string import Template
+from urllib.parse import parse_qs, urlparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Tuple
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+COMPANIES = {
+    "bigshare": [("101", "Aditya Infotech Limited"), ("102", "Shree Tirupati Balajee Agro SME IPO"), ("103", "Amanta Healthcare Limited")],
+    "kfin": [("KF01", "Urban Company Limited"), ("KF02", "Euro Pratik Sales Limited"), ("KF03", "Sampat Aluminium SME IPO"), ("KF04", "Tata Capital NCD Tranche II")],
+    "linkintime": [("LI01", "Vikram Solar Limited - IPO"), ("LI02", "Mangal Electrical Industries - SME IPO"), ("LI03", "Patel Retail Limited - IPO")],
+}
+
+STATIC_ASSETS = {
+    ".css": ("text/css", b"body{font-family:sans-serif}" * 200),
+    ".js": ("application/javascript", b"/* analytics */ var x = 1;" * 400),
+    ".png": ("image/png", b"\x89PNG\r\n\x1a\n" + b"\x00" * 20000),
+}
+
+PATHS = {
+    "bigshare": "/bigshare/ipo_status.html",
+    "kfin": "/kfin/",
+    "linkintime": "/linkintime/public-issues.html",
+    "bigshare_api": "/bigshare/Data.aspx/FetchIpodetails",
+    "linkintime_token": "/linkintime/IPO.aspx/generateToken",
+    "linkintime_api": "/linkintime/IPO.aspx/SearchOnPan",
+}
+
+
+def load_fixture(name: str) -> Template:
+    with open(os.path.join(FIXTURES, name), encoding="utf-8") as f:
+        return Template(f.read())
+
+
+def outcome_for(pan: str) -> Tuple[bool, int]:
+    """Deterministic (allotted, shares) for a PAN so runs are comparable"""
+    allotted = sum(ord(c) for c in pan.upper()) % 2 == 0
+    return allotted, (50 if allotted else 0)
+
+
+def select_options(registrar: str, selected: str) -> str:
+    return "\n".join(
+        f'        <option value="{value}"{" selected" if value == selected else ""}>{escape(name)}</option>'
+        for value, name in COMPANIES[registrar]
+    )
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    server: "StandInServer"
+    protocol_version = "HTTP/1.1"
+
+    def _delay(self):
+        latency = self.server.latency
+        if latency:
+            time.sleep(max(0.0, latency + random.uniform(-self.server.jitter, self.server.jitter)))
+
+    def _send(self, status: int, content_type: str, body: bytes):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_body(self) -> bytes:
+        return self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+    def do_GET(self):
+        self._delay()
+        path = urlparse(self.path).path
+        self.server.count(path)
+
+        extension = os.path.splitext(path)[1]
+        if path.startswith("/static/") and extension in STATIC_ASSETS:
+            self._send(200, *STATIC_ASSETS[extension])
+        elif path in (PATHS["bigshare"], PATHS["kfin"], PATHS["linkintime"]):
+            self._send(200, "text/html; charset=utf-8", self.render_page(path, {}).encode("utf-8"))
+        else:
+            self._send(404, "text/plain", b"Not found")
+
+    def do_POST(self):
+        self._delay()
+        path = urlparse(self.path).path
+        self.server.count(path)
+        body = self._read_body()
+
+        if path == PATHS["bigshare_api"]:
+            self._send(200, "application/json", json.dumps(self.bigshare_api(json.loads(body or b"{}"))).encode())
+        elif path == PATHS["linkintime_token"]:
+            self._send(200, "application/json", json.dumps({"d": "stand-in-token"}).encode())
+        elif path == PATHS["linkintime_api"]:
+            self._send(200, "application/json", json.dumps(self.linkintime_api(json.loads(body or b"{}"))).encode())
+        elif path in (PATHS["bigshare"], PATHS["kfin"], PATHS["linkintime"]):
+            form = {key: values[0] for key, values in parse_qs(body.decode("utf-8")).items()}
+            self._send(200, "text/html; charset=utf-8", self.render_page(path, form).encode("utf-8"))
+        else:
+            self._send(404, "text/plain", b"Not found")
+
+    def render_page(self, path: str, form: Dict[str, str]) -> str:
+        if path == PATHS["bigshare"]:
+            pan = form.get("txtPanNo", "")
+            result = ""
+            if pan:
+                allotted, shares = outcome_for(pan)
+                if allotted:
+                    result = (
+                        '<table id="gvAllotmentDetails"><tr><th>Shares Allotted</th><th>Amount</th></tr>'
+                        f'<tr><td>{shares}</td><td>₹7,450.00</td></tr></table>'
+                    )
+                else:
+                    result = '<div class="alert">Sorry, Not Allotted</div>'
+            return self.server.templates["bigshare"].substitute(
+                action=path, options=select_options("bigshare", form.get("ddlCompany", "")), pan=escape(pan), result=result
+            )
+
+        if path == PATHS["kfin"]:
+            pan = form.get("txtPAN", "")
+            result = ""
+            if pan:
+                allotted, shares = outcome_for(pan)
+                result = (
+                    f'Allotted <span class="shares">{shares}</span> <span class="amount">₹14,900.00</span>'
+                    if allotted else "Not Allotted"
+                )
+            issues = [{"value": value, "name": name} for value, name in COMPANIES["kfin"]]
+            return self.server.templates["kfin"].substitute(
+                action=path,
+                options=select_options("kfin", form.get("ddlIssue", "")),
+                pan=escape(pan),
+                result=result,
+                issues_json=json.dumps(issues),
+                render_delay_ms=int(self.server.render_delay * 1000),
+            )
+
+        pan = form.get("pan", "")
+        result = ""
+        if pan:
+            allotted, shares = outcome_for(pan)
+            result = (
+                f'Allotted <span class="shares-allotted">{shares}</span> <span class="amount-paid">₹14,250.00</span>'
+                if allotted else "Not Allotted"
+            )
+        return self.server.templates["linkintime"].substitute(
+            action=path, options=select_options("linkintime", form.get("ddlCompany", "")), pan=escape(pan), result=result
+        )
+
+    @staticmethod
+    def bigshare_api(payload: Dict) -> Dict:
+        _, shares = outcome_for(payload.get("PanNo", ""))
+        return {"d": {"Name": "STAND IN APPLICANT", "APPLIED": "100", "ALLOTED": str(shares), "DPID": ""}}
+
+    @staticmethod
+    def linkintime_api(payload: Dict) -> Dict:
+        _, shares = outcome_for(payload.get("PAN", ""))
+        return {"d": f"<NewDataSet><Table><NAME1>STAND IN</NAME1><ALLOT>{shares}</ALLOT><AMTADJ>14250</AMTADJ></Table></NewDataSet>"}
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            print(f"[stand-in] {format % args}", file=sys.stderr)
+
+
+class StandInServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, host: str, port: int, latency: float = 0.0, jitter: float = 0.0,
+                 render_delay: float = 0.5, verbose: bool = False):
+        super().__init__((host, port), StandInHandler)
+        self.latency = latency
+        self.jitter = min(jitter, latency)
+        self.render_delay = render_delay
+        self.verbose = verbose
+        self.templates = {
+            "bigshare": load_fixture("bigshare_ipo_status.html"),
+            "kfin": load_fixture("kfin_index.html"),
+            "linkintime": load_fixture("linkintime_public_issues.html"),
+        }
+        self.requests: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def count(self, path: str):
+        with self._lock:
+            self.requests[path] = self.requests.get(path, 0) + 1
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def registrar_env(self) -> Dict[str, str]:
+        """Environment that points config.py at this server"""
+        base = self.base_url
+        return {
+            "BIGSHARE_URL": base + PATHS["bigshare"],
+            "KFIN_URL": base + PATHS["kfin"],
+            "LINKINTIME_URL": base + PATHS["linkintime"],
+            "BIGSHARE_ALLOTMENT_API": base + PATHS["bigshare_api"],
+            "LINKINTIME_TOKEN_API": base + PATHS["linkintime_token"],
+            "LINKINTIME_ALLOTMENT_API": base + PATHS["linkintime_api"],
+        }
+
+
+def company_values(registrar: str) -> List[str]:
+    return [value for value, _ in COMPANIES[registrar]]
+
+
+def start_in_thread(**kwargs) -> StandInServer:
+    """Start a stand-in server on a free port in a daemon thread"""
+    server = StandInServer("127.0.0.1", 0, **kwargs)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Registrar stand-in server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8899)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Random +/- seconds around the latency")
+    parser.add_argument("--render-delay", type=float, default=0.5, help="Seconds before the KFin dropdown renders")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    server = StandInServer(args.host, args.port, args.latency, args.jitter, args.render_delay, args.verbose)
+    for key, value in server.registrar_env().items():
+        print(f"export {key}={value}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,273 @@
+"""
+Resumable bulk allotment checks
+Streams rows (registrar, pan, company_value, plus optional url,
+application_number, dp_id, client_id, company_name) from a CSV or JSONL file, groups each
+chunk of rows by registrar and company, and runs the groups on a thread pool
+with shared pooled drivers, one batch check per group. Results are appended
+to a JSONL file as they finish, each tagged with its input row number.
+
+Progress is checkpointed as a watermark (every row up to it is done) plus the
+done rows above it, so a restart skips finished rows. A crash between writing
+a result and saving the checkpoint can repeat those few rows on resume;
+consumers can dedupe on "row". Only one chunk (and the groups in flight) is
+held in memory at a time.
+"""
+
+import os
+import sys
+import csv
+import json
+import time
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import IO, Any, Callable, Deque, Dict, Iterator, List, Optional, Set, Tuple
+from config import BULK_CHUNK_ROWS, BULK_CHECKPOINT_INTERVAL
+from scrapers.registry import SCRAPERS
+from utils.metrics import metrics
+
+ROW_OPTIONS = ["application_number", "dp_id", "client_id"]
+# Accepted spellings of each input column
+COLUMNS = {
+    "registrar": ("registrar",),
+    "pan": ("pan", "PAN"),
+    "company_value": ("company_value", "companyValue", "company"),
+    "url": ("url",),
+    "application_number": ("application_number", "applicationNumber"),
+    "dp_id": ("dp_id", "dpId"),
+    "client_id": ("client_id", "clientId"),
+    "company_name": ("company_name", "companyName"),
+}
+
+Row = Tuple[int, Dict[str, str]]
+GroupKey = Tuple[str, str, str]
+
+
+def read_rows(source: IO[str], fmt: str) -> Iterator[Row]:
+    """Yield (row number, normalized row) from CSV (with a header) or JSONL, skipping blank lines"""
+    records: Iterator[Dict] = (
+        csv.DictReader(source) if fmt == "csv"
+        else (json.loads(line) for line in source if line.strip())
+    )
+    for number, record in enumerate(records, start=1):
+        row = {}
+        for field, names in COLUMNS.items():
+            value = next((record[name] for name in names if record.get(name) not in (None, "")), None)
+            if value is not None:
+                row[field] = str(value).strip()
+        if "registrar" in row:
+            row["registrar"] = row["registrar"].lower()
+        if "pan" in row:
+            row["pan"] = row["pan"].upper()
+        yield number, row
+
+
+class Checkpoint:
+    """
+    Watermark plus the finished rows above it, saved atomically to a JSON file
+
+    before_save, if set, runs between taking the state and writing it, so a
+    result sink can flush every row the saved state calls done. If it raises,
+    the checkpoint is not written and the next save tries again.
+    """
+
+    def __init__(self, path: str, input_path: str, before_save: Optional[Callable[[], None]] = None):
+        self.path = path
+        self.input_path = os.path.abspath(input_path)
+        self.before_save = before_save
+        self.watermark = 0
+        self.done: Set[int] = set()
+        self._saved_at = 0.0
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+
+    def load(self) -> bool:
+        """Read an existing checkpoint; False if there is none"""
+        try:
+            with open(self.path) as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            return False
+        if state.get("input") != self.input_path:
+            raise ValueError(f"Checkpoint {self.path} belongs to {state.get('input')}; pass --restart to start over")
+        self.watermark = state["watermark"]
+        self.done = set(state["done"])
+        return True
+
+    def is_done(self, row: int) -> bool:
+        with self._lock:
+            return row <= self.watermark or row in self.done
+
+    def mark(self, row: int):
+        with self._lock:
+            self.done.add(row)
+            while self.watermark + 1 in self.done:
+                self.watermark += 1
+                self.done.discard(self.watermark)
+        if time.monotonic() - self._saved_at >= BULK_CHECKPOINT_INTERVAL:
+            self.save()
+
+    def save(self):
+        with self._save_lock:
+            with self._lock:
+                state = {"input": self.input_path, "watermark": self.watermark, "done": sorted(self.done)}
+                self._saved_at = time.monotonic()
+            if self.before_save is not None:
+                try:
+                    self.before_save()
+                except Exception as e:
+                    print(f"Not saving checkpoint {self.path}: {e}", file=sys.stderr)
+                    return
+            tmp = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp, "w") as f:
+                json.dump(state, f)
+            os.replace(tmp, self.path)
+
+
+class BulkCheck:
+    """
+    Runs a bulk check file through check functions with the same contract
+    as main.check_allotment / main.check_allotment_batch
+    """
+
+    def __init__(
+        self,
+        check_one: Callable[..., Dict],
+        check_batch: Callable[..., Iterator[Dict]],
+        scraper_for: Callable[[str], Any],
+        output: IO[str],
+        checkpoint: Checkpoint,
+        workers: int,
+        chunk_rows: int = BULK_CHUNK_ROWS,
+        use_cache: bool = True,
+        on_result: Optional[Callable[[Dict[str, str], Dict], None]] = None,
+    ):
+        self.check_one = check_one
+        self.check_batch = check_batch
+        self.scraper_for = scraper_for
+        self.output = output
+        self.checkpoint = checkpoint
+        self.workers = workers
+        self.chunk_rows = chunk_rows
+        self.use_cache = use_cache
+        self.on_result = on_result
+        self.stopping = threading.Event()
+        self.counts: Dict[str, int] = {}
+        self._write_lock = threading.Lock()
+        # Bounds the groups queued or running, and with them memory
+        self._slots = threading.BoundedSemaphore(workers * 2)
+
+    def emit(self, row: int, values: Dict[str, str], result: Dict):
+        """Append one result line and hand it to on_result, then mark its row done"""
+        record = {
+            "row": row,
+            "registrar": values.get("registrar"),
+            "companyValue": values.get("company_value"),
+            "pan": values.get("pan"),
+            **result,
+        }
+        with self._write_lock:
+            self.output.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self.output.flush()
+            status = result.get("status", "unknown")
+            self.counts[status] = self.counts.get(status, 0) + 1
+        metrics.increment("bulk_rows", status=status)
+        if self.on_result is not None:
+            self.on_result(values, result)
+        self.checkpoint.mark(row)
+
+    def run_group(self, key: GroupKey, rows: List[Row]):
+        """Check one company's rows: a batch for plain PANs, single checks for rows with extra options"""
+        registrar, company_value, url = key
+        scraper = self.scraper_for(registrar)
+        kwargs = {"url": url} if url else {}
+        plain: List[Row] = []
+        single: List[Row] = []
+        for row in rows:
+            batchable = company_value and not any(option in row[1] for option in ROW_OPTIONS)
+            (plain if batchable else single).append(row)
+
+        if plain:
+            rows_by_pan: Dict[str, Deque[Tuple[int, Dict]]] = {}
+            for number, values in plain:
+                rows_by_pan.setdefault(values["pan"], deque()).append((number, values))
+
+            def pans() -> Iterator[str]:
+                for _, values in plain:
+                    if self.stopping.is_set():
+                        return
+                    yield values["pan"]
+
+            for result in self.check_batch(
+                registrar, company_value, pans(), scraper=scraper, use_cache=self.use_cache, **kwargs
+            ):
+                number, values = rows_by_pan[result["pan"]].popleft()
+                self.emit(number, values, {k: v for k, v in result.items() if k != "pan"})
+
+        for number, values in single:
+            if self.stopping.is_set():
+                return
+            options = {k: values[k] for k in ROW_OPTIONS if k in values}
+            if company_value:
+                options["company_value"] = company_value
+            result = self.check_one(
+                registrar, values["pan"], scraper=scraper, use_cache=self.use_cache, **kwargs, **options
+            )
+            self.emit(number, values, result)
+
+    def _submit(self, executor: ThreadPoolExecutor, key: GroupKey, rows: List[Row]) -> Future:
+        self._slots.acquire()
+        future = executor.submit(self.run_group, key, rows)
+
+        def done(finished: Future):
+            self._slots.release()
+            error = finished.exception()
+            if error is not None:
+                print(f"Bulk group {key[0]}:{key[1]} failed: {error}", file=sys.stderr)
+                self.stopping.set()
+
+        future.add_done_callback(done)
+        return future
+
+    def run(self, rows: Iterator[Row]) -> Dict[str, int]:
+        """Check every unfinished row; returns result counts by status"""
+        executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bulk")
+        futures: Set[Future] = set()
+        skipped = 0
+        try:
+            chunk: Dict[GroupKey, List[Row]] = {}
+            chunk_size = 0
+            for number, values in rows:
+                if self.stopping.is_set():
+                    break
+                if self.checkpoint.is_done(number):
+                    skipped += 1
+                    continue
+                if values.get("registrar") not in SCRAPERS or not values.get("pan"):
+                    self.emit(number, values, {"status": "error", "message": "Row needs a known registrar and a PAN"})
+                    continue
+
+                key = (values["registrar"], values.get("company_value", ""), values.get("url", ""))
+                chunk.setdefault(key, []).append((number, values))
+                chunk_size += 1
+                if chunk_size >= self.chunk_rows:
+                    futures = {future for future in futures if not future.done()}
+                    futures.update(self._submit(executor, key, group) for key, group in chunk.items())
+                    chunk, chunk_size = {}, 0
+
+            if not self.stopping.is_set():
+                futures.update(self._submit(executor, key, group) for key, group in chunk.items())
+            for future in list(futures):
+                future.exception()
+        except KeyboardInterrupt:
+            print("Stopping bulk check after the rows in progress", file=sys.stderr)
+            self.stopping.set()
+            for future in list(futures):
+                future.exception()
+        finally:
+            executor.shutdown(wait=True)
+            self.checkpoint.save()
+
+        if skipped:
+            print(f"Skipped {skipped} rows finished in an earlier run", file=sys.stderr)
+        return dict(self.counts)
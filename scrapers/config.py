@@ -1,18 +1,221 @@
 import os
+import json
 from typing import Dict
 
-# Registrar URLs
+# Registrar URLs (overridable, e.g. to point at the bench/ stand-in server)
 REGISTRAR_URLS = {
-    "kfin": "https://ipostatus.kfintech.com",
-    "bigshare": "https://ipo.bigshareonline.com/ipo_status.html",
-    "linkintime": "https://linkintime.co.in/initial_offer/public-issues.html",
+    "kfin": os.getenv("KFIN_URL", "https://ipostatus.kfintech.com"),
+    "bigshare": os.getenv("BIGSHARE_URL", "https://ipo.bigshareonline.com/ipo_status.html"),
+    "linkintime": os.getenv("LINKINTIME_URL", "https://linkintime.co.in/initial_offer/public-issues.html"),
 }
 
 # Redis configuration (from environment)
 REDIS_URL = os.getenv("UPSTASH_REDIS_REST_URL", "")
 REDIS_TOKEN = os.getenv("UPSTASH_REDIS_REST_TOKEN", "")
+REDIS_TIMEOUT = float(os.getenv("REDIS_TIMEOUT", "5"))
+# Retries of Redis REST requests that failed to connect (never of sent commands)
+REDIS_RETRIES = int(os.getenv("REDIS_RETRIES", "2"))
+REDIS_POOL_SIZE = int(os.getenv("REDIS_POOL_SIZE", "10"))
+# Optional native Redis (redis://host:port/db), used instead of the REST API
+# when set, e.g. for a local Redis while testing the work queue
+REDIS_DIRECT_URL = os.getenv("REDIS_DIRECT_URL", "")
+# Encoding of company lists and cached allotment results: json, msgpack,
+# msgpack+zlib or msgpack+zstd (needs zstandard). Readers detect the format,
+# so this can be changed at any time. The Next.js routes decode all but zstd,
+# so with msgpack+zstd the company lists they read are written as msgpack+zlib.
+REDIS_ENCODING = os.getenv("REDIS_ENCODING", "json")
 
 # Scraper settings
 HEADLESS = os.getenv("HEADLESS_BROWSER", "true").lower() == "true"
 TIMEOUT = int(os.getenv("SCRAPER_TIMEOUT", "30"))
 USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+
+# Per-registrar wait timeouts in seconds, used instead of fixed sleeps.
+# Override any value with SCRAPER_TIMING_PROFILES, e.g. '{"kfin": {"result": 20}}'
+DEFAULT_TIMING_PROFILE = {"page_load": TIMEOUT, "element": 10, "result": 10, "idle": 0.5, "poll": 0.2}
+TIMING_PROFILES = {
+    "bigshare": {"element": 10, "result": 10},
+    "kfin": {"element": 20, "result": 15, "poll": 0.25},
+    "linkintime": {"element": 10, "result": 10},
+}
+for _registrar, _overrides in json.loads(os.getenv("SCRAPER_TIMING_PROFILES", "{}")).items():
+    TIMING_PROFILES.setdefault(_registrar, {}).update(_overrides)
+
+# chromedriver resolution: CHROMEDRIVER_PATH pins a binary outright; otherwise
+# the path found by webdriver-manager is cached in CHROMEDRIVER_CACHE_FILE and
+# reused without any lookup. Offline mode never touches the network.
+CHROMEDRIVER_PATH = os.getenv("CHROMEDRIVER_PATH", "")
+CHROMEDRIVER_CACHE_FILE = os.getenv(
+    "CHROMEDRIVER_CACHE_FILE", os.path.join(os.path.expanduser("~"), ".cache", "binduv", "chromedriver.json")
+)
+CHROMEDRIVER_OFFLINE = os.getenv("CHROMEDRIVER_OFFLINE", "false").lower() == "true"
+
+# Chrome resource diet: resource types and URL patterns blocked per registrar
+# through CDP at driver checkout, plus viewport and low-memory launch flags.
+# Resource types: image, font, media, stylesheet. Override per registrar with
+# SCRAPER_RESOURCE_POLICIES, e.g. '{"kfin": {"block_types": ["image"]}}'
+RESOURCE_POLICY_ENABLED = os.getenv("SCRAPER_RESOURCE_POLICY", "true").lower() == "true"
+BROWSER_WINDOW_SIZE = os.getenv("BROWSER_WINDOW_SIZE", "1280,800")
+BROWSER_LOW_MEMORY = os.getenv("BROWSER_LOW_MEMORY", "true").lower() == "true"
+DEFAULT_RESOURCE_POLICY = {
+    "block_types": ["image", "font", "media"],
+    "block_urls": [
+        "*google-analytics.com*",
+        "*googletagmanager.com*",
+        "*doubleclick.net*",
+        "*facebook.net*",
+        "*hotjar.com*",
+        "*clarity.ms*",
+    ],
+}
+RESOURCE_POLICIES = {
+    "bigshare": {"block_types": ["image", "font", "media", "stylesheet"]},
+    # Material-UI visibility (and so clickability) depends on its stylesheets
+    "kfin": {},
+    "linkintime": {"block_types": ["image", "font", "media", "stylesheet"]},
+}
+for _registrar, _overrides in json.loads(os.getenv("SCRAPER_RESOURCE_POLICIES", "{}")).items():
+    RESOURCE_POLICIES.setdefault(_registrar, {}).update(_overrides)
+
+# Direct HTTP allotment fast path (Selenium stays as the fallback)
+FAST_PATH_ENABLED = os.getenv("ALLOTMENT_FAST_PATH", "true").lower() == "true"
+HTTP_TIMEOUT = int(os.getenv("HTTP_TIMEOUT", "10"))
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "20"))
+FAST_PATH_URLS = {
+    "bigshare": os.getenv("BIGSHARE_ALLOTMENT_API", "https://ipo.bigshareonline.com/Data.aspx/FetchIpodetails"),
+    "linkintime_token": os.getenv("LINKINTIME_TOKEN_API", "https://linkintime.co.in/initial_offer/IPO.aspx/generateToken"),
+    "linkintime": os.getenv("LINKINTIME_ALLOTMENT_API", "https://linkintime.co.in/initial_offer/IPO.aspx/SearchOnPan"),
+}
+
+# HTML parser for allotment results: auto, selectolax, lxml or bs4
+HTML_PARSER = os.getenv("SCRAPER_HTML_PARSER", "auto")
+
+# Allotment result cache: TTL in seconds by result status (0 disables caching)
+ALLOTMENT_CACHE_TTLS = {
+    "allotted": int(os.getenv("ALLOTMENT_CACHE_TTL_FINAL", str(7 * 24 * 3600))),
+    "not_allotted": int(os.getenv("ALLOTMENT_CACHE_TTL_FINAL", str(7 * 24 * 3600))),
+    "pending": int(os.getenv("ALLOTMENT_CACHE_TTL_PENDING", "120")),
+    "error": int(os.getenv("ALLOTMENT_CACHE_TTL_ERROR", "30")),
+}
+ALLOTMENT_CACHE_SIZE = int(os.getenv("ALLOTMENT_CACHE_SIZE", "10000"))
+ALLOTMENT_CACHE_SALT = os.getenv("ALLOTMENT_CACHE_SALT", "binduv")
+
+# Per-registrar circuit breaker, shared through Redis. Outcomes are counted
+# in time buckets; the circuit opens once a window has at least
+# CIRCUIT_MIN_REQUESTS checks and the share of errors and slow calls reaches
+# CIRCUIT_ERROR_RATE. It stays open for a jittered, exponentially growing
+# period, then lets a single probe through (half-open).
+CIRCUIT_ENABLED = os.getenv("CIRCUIT_BREAKER", "true").lower() == "true"
+CIRCUIT_WINDOW = int(os.getenv("CIRCUIT_WINDOW", "60"))
+CIRCUIT_BUCKET = int(os.getenv("CIRCUIT_BUCKET", "10"))
+CIRCUIT_MIN_REQUESTS = int(os.getenv("CIRCUIT_MIN_REQUESTS", "5"))
+CIRCUIT_ERROR_RATE = float(os.getenv("CIRCUIT_ERROR_RATE", "0.5"))
+CIRCUIT_SLOW_CALL = float(os.getenv("CIRCUIT_SLOW_CALL", str(TIMEOUT)))
+CIRCUIT_OPEN_BASE = float(os.getenv("CIRCUIT_OPEN_BASE", "30"))
+CIRCUIT_OPEN_MAX = float(os.getenv("CIRCUIT_OPEN_MAX", "600"))
+CIRCUIT_PROBE_TIMEOUT = int(os.getenv("CIRCUIT_PROBE_TIMEOUT", str(TIMEOUT * 2)))
+CIRCUIT_STATE_CACHE = float(os.getenv("CIRCUIT_STATE_CACHE", "2"))
+# Retries of failed allotment checks while the circuit stays closed
+ALLOTMENT_RETRIES = int(os.getenv("ALLOTMENT_RETRIES", "1"))
+ALLOTMENT_RETRY_BASE = float(os.getenv("ALLOTMENT_RETRY_BASE", "1.0"))
+
+# Company list sync: TTL of the full JSON lists and of the per-company snapshots
+COMPANY_LIST_TTL = int(os.getenv("COMPANY_LIST_TTL", "3600"))
+COMPANY_SNAPSHOT_TTL = int(os.getenv("COMPANY_SNAPSHOT_TTL", str(7 * 24 * 3600)))
+# Company index (lookup-company): how often long-lived processes reload it,
+# in seconds, and the lowest trigram similarity (0-1) a fuzzy match needs
+COMPANY_INDEX_REFRESH = float(os.getenv("COMPANY_INDEX_REFRESH", "60"))
+COMPANY_INDEX_FUZZY_THRESHOLD = float(os.getenv("COMPANY_INDEX_FUZZY_THRESHOLD", "0.35"))
+
+# WebDriver pool settings (shared by all scrapers in the scraper service)
+DRIVER_POOL_SIZE = int(os.getenv("DRIVER_POOL_SIZE", "3"))
+DRIVER_MAX_USES = int(os.getenv("DRIVER_MAX_USES", "50"))
+DRIVER_ACQUIRE_TIMEOUT = int(os.getenv("DRIVER_ACQUIRE_TIMEOUT", str(TIMEOUT)))
+
+# Warm form sessions (pooled mode): pool drivers kept on a hot company's
+# allotment form so repeat checks only enter the PAN. A company is hot after
+# FORM_SESSION_HOT_THRESHOLD checks within FORM_SESSION_HOT_WINDOW seconds.
+# Sessions are retired after FORM_SESSION_IDLE seconds unused, at
+# FORM_SESSION_MAX_AGE (before the registrar's own session times out) or
+# after FORM_SESSION_MAX_CHECKS checks.
+FORM_SESSIONS_ENABLED = os.getenv("FORM_SESSIONS", "true").lower() == "true"
+FORM_SESSION_MAX = int(os.getenv("FORM_SESSION_MAX", str(max(DRIVER_POOL_SIZE - 1, 1))))
+FORM_SESSION_HOT_THRESHOLD = int(os.getenv("FORM_SESSION_HOT_THRESHOLD", "3"))
+FORM_SESSION_HOT_WINDOW = float(os.getenv("FORM_SESSION_HOT_WINDOW", "300"))
+FORM_SESSION_IDLE = float(os.getenv("FORM_SESSION_IDLE", "120"))
+FORM_SESSION_MAX_AGE = float(os.getenv("FORM_SESSION_MAX_AGE", "900"))
+FORM_SESSION_MAX_CHECKS = int(os.getenv("FORM_SESSION_MAX_CHECKS", "500"))
+
+# bulk-check: rows read (and grouped by company) at a time, and how often
+# the resume checkpoint is written, in seconds
+BULK_CHUNK_ROWS = int(os.getenv("BULK_CHUNK_ROWS", "500"))
+BULK_CHECKPOINT_INTERVAL = float(os.getenv("BULK_CHECKPOINT_INTERVAL", "2"))
+
+# Result sink (bulk-check --store): the app's Postgres database by default, or
+# sqlite:///path for local runs. Rows are written SINK_BATCH_SIZE at a time,
+# at least every SINK_FLUSH_INTERVAL seconds while results arrive; Postgres
+# batches use COPY or a multi-row INSERT (SINK_PG_MODE).
+RESULTS_DATABASE_URL = os.getenv("RESULTS_DATABASE_URL", os.getenv("DATABASE_URL", ""))
+SINK_BATCH_SIZE = int(os.getenv("SINK_BATCH_SIZE", "500"))
+SINK_FLUSH_INTERVAL = float(os.getenv("SINK_FLUSH_INTERVAL", "2"))
+SINK_PG_MODE = os.getenv("SINK_PG_MODE", "copy")
+
+# Company list watcher (python main.py watch): registrars are probed every
+# WATCH_INTERVAL_FAST seconds within WATCH_DATE_WINDOW days of an allotment
+# or listing date (from RESULTS_DATABASE_URL and WATCH_KEY_DATES, a JSON list
+# of "YYYY-MM-DD") and for WATCH_CHANGE_HOLD seconds after a change, every
+# WATCH_INTERVAL_SLOW seconds otherwise. A registrar is scraped when its list
+# fingerprint changes, or regardless once its last scrape is WATCH_MAX_STALE
+# seconds old.
+WATCH_INTERVAL_FAST = float(os.getenv("WATCH_INTERVAL_FAST", "300"))
+WATCH_INTERVAL_SLOW = float(os.getenv("WATCH_INTERVAL_SLOW", "1800"))
+WATCH_DATE_WINDOW = int(os.getenv("WATCH_DATE_WINDOW", "1"))
+WATCH_KEY_DATES = json.loads(os.getenv("WATCH_KEY_DATES", "[]"))
+WATCH_CHANGE_HOLD = float(os.getenv("WATCH_CHANGE_HOLD", "3600"))
+WATCH_MAX_STALE = float(os.getenv("WATCH_MAX_STALE", str(6 * 3600)))
+WATCH_STATE_TTL = int(os.getenv("WATCH_STATE_TTL", str(30 * 24 * 3600)))
+
+# scrape-all concurrency: worker threads and overall deadline in seconds
+SCRAPE_ALL_WORKERS = int(os.getenv("SCRAPE_ALL_WORKERS", "3"))
+SCRAPE_ALL_DEADLINE = int(os.getenv("SCRAPE_ALL_DEADLINE", "150"))
+
+# Scraper service scheduler: per-registrar worker count (concurrency), rate
+# limit in jobs per second with a burst allowance, queue capacity and default
+# deadlines in seconds per priority lane. Override limits with
+# SCHEDULER_LIMITS, e.g. '{"kfin": {"concurrency": 1, "rps": 0.5}}'
+SCHEDULER_LIMITS = {
+    "default": {"concurrency": 1, "rps": 1.0, "burst": 2},
+    "bigshare": {"concurrency": 2, "rps": 2.0, "burst": 4},
+    "kfin": {"concurrency": 1, "rps": 1.0, "burst": 2},
+    "linkintime": {"concurrency": 2, "rps": 2.0, "burst": 4},
+}
+for _registrar, _overrides in json.loads(os.getenv("SCHEDULER_LIMITS", "{}")).items():
+    SCHEDULER_LIMITS[_registrar] = {**SCHEDULER_LIMITS.get(_registrar, SCHEDULER_LIMITS["default"]), **_overrides}
+SCHEDULER_MAX_QUEUE = int(os.getenv("SCHEDULER_MAX_QUEUE", "100"))
+SCHEDULER_DEADLINES = {
+    "interactive": float(os.getenv("SCHEDULER_DEADLINE_INTERACTIVE", "60")),
+    "batch": float(os.getenv("SCHEDULER_DEADLINE_BATCH", "600")),
+    "background": float(os.getenv("SCHEDULER_DEADLINE_BACKGROUND", str(SCRAPE_ALL_DEADLINE))),
+}
+
+# Distributed work queue (python main.py worker): lease length in seconds
+# (renewed while a job runs), attempts before a job is dead-lettered, how long
+# results are kept and how often idle workers poll
+WORK_QUEUE_PREFIX = os.getenv("WORK_QUEUE_PREFIX", "ipo:queue")
+WORK_QUEUE_VISIBILITY_TIMEOUT = int(os.getenv("WORK_QUEUE_VISIBILITY_TIMEOUT", "60"))
+WORK_QUEUE_MAX_ATTEMPTS = int(os.getenv("WORK_QUEUE_MAX_ATTEMPTS", "3"))
+WORK_QUEUE_RESULT_TTL = int(os.getenv("WORK_QUEUE_RESULT_TTL", "3600"))
+WORK_QUEUE_POLL_INTERVAL = float(os.getenv("WORK_QUEUE_POLL_INTERVAL", "1.0"))
+WORKER_CONCURRENCY = int(os.getenv("WORKER_CONCURRENCY", str(DRIVER_POOL_SIZE)))
+
+# Metrics export: JSON lines file and Prometheus textfile written at CLI exit
+METRICS_FILE = os.getenv("SCRAPER_METRICS_FILE", "")
+METRICS_PROM_FILE = os.getenv("SCRAPER_METRICS_PROM_FILE", "")
+METRICS_MAX_SPANS = int(os.getenv("SCRAPER_METRICS_MAX_SPANS", "10000"))
+# Driver RSS is sampled when every Nth scraper stops (0 turns it off); each
+# sample walks /proc for the Chrome process tree
+RSS_SAMPLE_EVERY = int(os.getenv("SCRAPER_RSS_SAMPLE_EVERY", "20"))
+
+# Scraper service settings (python main.py serve)
+SERVER_HOST = os.getenv("SCRAPER_SERVER_HOST", "127.0.0.1")
+SERVER_PORT = int(os.getenv("SCRAPER_SERVER_PORT", "8765"))
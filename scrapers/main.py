@@ -4,96 +4,595 @@ Main scraper orchestrator
 Usage:
   python main.py scrape-companies --registrar=bigshare
   python main.py scrape-all
+  python main.py get-companies --registrar=kfin
   python main.py check-allotment --registrar=bigshare --pan=ABCDE1234F
+  python main.py check-allotment-batch --registrar=bigshare --company-value=123 --pans-file=pans.txt
+  python main.py bulk-check --input=clients.csv --output=results.jsonl --workers=3
+  python main.py lookup-company --name="tata tech"
+  python main.py watch --once
+  python main.py serve --port=8765
+  python main.py worker --concurrency=3
+  python main.py submit-job --job=check-allotment --params='{"registrar": "kfin", "pan": "ABCDE1234F"}' --wait=60
+  python main.py refresh-driver
 """
 
 import sys
 import json
+import time
+import atexit
 import argparse
-from typing import List, Dict
-from scrapers.bigshare_scraper import BigshareScraper
-from scrapers.kfin_scraper import KFinScraper
-from scrapers.linkintime_scraper import LinkIntimeScraper
-from utils.redis_client import RedisClient
-
-
-SCRAPERS = {
-    "bigshare": BigshareScraper,
-    "kfin": KFinScraper,
-    "linkintime": LinkIntimeScraper,
-}
-
-
-def scrape_companies(registrar: str) -> List[Dict]:
-    """Scrape companies from a specific registrar"""
+from concurrent.futures import ThreadPoolExecutor, wait
+from collections import deque
+from typing import TYPE_CHECKING, Any, Callable, Deque, Dict, Iterable, Iterator, List, Optional
+from scrapers.registry import SCRAPERS, get_scraper_class
+from utils.company_index import CompanyIndexStore
+from utils.company_sync import ACTIVE_KEY, CompanySync
+from utils.metrics import metrics
+from utils.allotment_cache import get_allotment_cache
+from utils.circuit_breaker import backoff_delay, get_circuit_breaker
+from utils.redis_client import get_redis_client
+from config import (
+    REGISTRAR_URLS, SERVER_HOST, SERVER_PORT, SCRAPE_ALL_WORKERS, SCRAPE_ALL_DEADLINE, METRICS_FILE, METRICS_PROM_FILE,
+    WORKER_CONCURRENCY, ALLOTMENT_RETRIES, ALLOTMENT_RETRY_BASE, FORM_SESSIONS_ENABLED,
+    DRIVER_POOL_SIZE,
+)
+
+# Scraper modules (and selenium with them) are imported only when a registrar
+# is actually scraped; see scrapers/registry.py
+if TYPE_CHECKING:
+    from scrapers.base_scraper import BaseScraper
+    from scrapers.driver_pool import DriverPool
+    from scrapers.form_sessions import FormSessions
+    from scheduler import Scheduler
+
+
+def scrape_companies(registrar: str, scraper: Optional["BaseScraper"] = None, store: bool = True) -> List[Dict]:
+    """Scrape companies from a specific registrar, syncing them into Redis unless store is False"""
     if registrar not in SCRAPERS:
         raise ValueError(f"Unknown registrar: {registrar}")
 
-    scraper_class = SCRAPERS[registrar]
-    scraper = scraper_class()
+    if scraper is None:
+        scraper = get_scraper_class(registrar)()
 
     try:
-        companies = scraper.scrape_companies()
-
-        # Store in Redis
-        redis_client = RedisClient()
-        cache_key = f"ipo:companies:{registrar}"
-        redis_client.set(cache_key, companies, ex=3600)
-
-        return companies
+        with metrics.span("scrape_companies", registrar):
+            companies = scraper.scrape_companies()
+        metrics.increment("companies_scraped", len(companies), registrar=registrar)
     except Exception as e:
         print(f"Error scraping {registrar}: {e}", file=sys.stderr)
         return []
 
+    if store:
+        try:
+            CompanySync().sync(registrar, companies)
+        except Exception as e:
+            print(f"Error syncing {registrar} companies: {e}", file=sys.stderr)
+
+    return companies
+
+
+def scrape_all_registrars(
+    scrapers: Optional[Dict[str, "BaseScraper"]] = None,
+    max_workers: int = SCRAPE_ALL_WORKERS,
+    deadline: float = SCRAPE_ALL_DEADLINE,
+    store: bool = True,
+) -> Dict[str, List[Dict]]:
+    """
+    Scrape all registrars concurrently, each with its own scraper and driver
+
+    A registrar that fails or misses the deadline contributes no companies.
+    Once every registrar has finished or timed out, the changes for all of
+    them and the combined key are synced together in one pipelined write.
+    """
+    scrapers = {registrar: (scrapers or {}).get(registrar) or get_scraper_class(registrar)() for registrar in SCRAPERS}
+    results: Dict[str, List[Dict]] = {registrar: [] for registrar in SCRAPERS}
+
+    executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="scrape")
+    futures = {}
+    for registrar, scraper in scrapers.items():
+        print(f"Scraping {registrar}...", file=sys.stderr)
+        futures[executor.submit(scrape_companies, registrar, scraper, False)] = registrar
+
+    done, not_done = wait(futures, timeout=deadline)
+    for future in done:
+        results[futures[future]] = future.result()
+    for future in not_done:
+        registrar = futures[future]
+        print(f"Scraping {registrar} missed the {deadline}s deadline", file=sys.stderr)
+        if not future.cancel():
+            scrapers[registrar].abort()
+    executor.shutdown(wait=False)
+
+    if store:
+        try:
+            CompanySync().sync_all(results)
+        except Exception as e:
+            print(f"Error syncing companies: {e}", file=sys.stderr)
+
+    print(f"Total companies scraped: {sum(len(companies) for companies in results.values())}", file=sys.stderr)
 
-def scrape_all_registrars() -> Dict[str, List[Dict]]:
-    """Scrape all registrars"""
-    results = {}
-    all_companies = []
+    return results
 
-    for registrar in SCRAPERS.keys():
-        print(f"Scraping {registrar}...", file=sys.stderr)
-        companies = scrape_companies(registrar)
-        results[registrar] = companies
-        all_companies.extend(companies)
 
-    # Store combined results
-    redis_client = RedisClient()
-    redis_client.set("ipo:companies:active", all_companies, ex=3600)
+def get_companies(registrar: Optional[str] = None, cache_only: bool = False) -> List[Dict]:
+    """
+    Companies from the synced Redis lists, scraping only on a cache miss
 
-    print(f"Total companies scraped: {len(all_companies)}", file=sys.stderr)
+    A hit never imports a scraper module.
+    """
+    if registrar is not None and registrar not in SCRAPERS:
+        raise ValueError(f"Unknown registrar: {registrar}")
 
-    return results
+    key = CompanySync.keys(registrar)["list"] if registrar else ACTIVE_KEY
+    companies = get_redis_client().get(key)
+    if isinstance(companies, list):
+        metrics.increment("company_list_requests", registrar=registrar or "all", source="cache")
+        return companies
 
+    metrics.increment("company_list_requests", registrar=registrar or "all", source="miss" if cache_only else "scrape")
+    if cache_only:
+        return []
 
-def check_allotment(registrar: str, pan: str, **kwargs) -> Dict:
-    """Check allotment status"""
+    print(f"No cached companies for {registrar or 'all registrars'}; scraping", file=sys.stderr)
+    if registrar:
+        return scrape_companies(registrar)
+    return [company for companies in scrape_all_registrars().values() for company in companies]
+
+
+def circuit_open_result(registrar: str, retry_after: float) -> Dict:
+    """Answer for checks refused while a registrar's circuit is open"""
+    metrics.increment("circuit_rejected", registrar=registrar)
+    return {
+        "status": "error",
+        "message": f"{registrar} is temporarily unavailable; try again later",
+        "retryAfter": int(retry_after) + 1,
+    }
+
+
+def check_allotment(
+    registrar: str,
+    pan: str,
+    scraper: Optional["BaseScraper"] = None,
+    use_cache: bool = True,
+    **kwargs
+) -> Dict:
+    """
+    Check allotment status, answering from the allotment cache when possible
+
+    While the registrar's circuit is open the check fails fast with a
+    retryAfter error instead of waiting out timeouts. The circuit is only
+    consulted on a cache miss, and a half-open probe that ends up answered
+    by someone else's check is handed back. Failed checks are retried with
+    jittered backoff while the circuit stays closed.
+    """
     if registrar not in SCRAPERS:
         raise ValueError(f"Unknown registrar: {registrar}")
 
-    scraper_class = SCRAPERS[registrar]
-    scraper = scraper_class()
+    if scraper is None:
+        scraper = get_scraper_class(registrar)()
 
     company_url = kwargs.get("url", scraper.base_url)
+    company_value = kwargs.get("company_value") or company_url
+    cache = get_allotment_cache() if use_cache else None
+    breaker = get_circuit_breaker()
+
+    metrics.increment("allotment_requests", registrar=registrar)
+
+    application_number = kwargs.get("application_number")
+    cached = cache.get(registrar, company_value, pan, application_number) if cache else None
+    if cached is not None:
+        return cached
+
+    allowed, probe, retry_after = breaker.allow(registrar)
+    if not allowed:
+        return circuit_open_result(registrar, retry_after)
+    ran = False
+
+    def run_check() -> Dict:
+        nonlocal ran
+        ran = True
+        attempt = 0
+        while True:
+            started = time.monotonic()
+            try:
+                with metrics.span("check_allotment", registrar):
+                    result = scraper.check_allotment(company_url, pan, **kwargs)
+            except Exception as e:
+                print(f"Error checking allotment: {e}", file=sys.stderr)
+                result = {"status": "error", "message": str(e)}
+            ok = result.get("status") != "error"
+            breaker.record(registrar, ok, time.monotonic() - started, probe=probe)
+
+            # A probe gets one try; a failed one has just reopened the circuit
+            if ok or probe or attempt >= ALLOTMENT_RETRIES or breaker.retry_after(registrar) > 0:
+                break
+            time.sleep(backoff_delay(attempt, ALLOTMENT_RETRY_BASE, ALLOTMENT_RETRY_BASE * 8))
+            attempt += 1
+            metrics.increment("allotment_retries", registrar=registrar)
+
+        metrics.increment("allotment_results", registrar=registrar, status=result.get("status"))
+        return result
 
     try:
-        result = scraper.check_allotment(company_url, pan, **kwargs)
-        return result
+        if cache is None:
+            return run_check()
+        # May still be answered by a check already in flight for this PAN
+        return cache.run_check(registrar, company_value, pan, run_check, application_number)
+    finally:
+        if probe and not ran:
+            breaker.release(registrar)
+
+
+def check_allotment_batch(
+    registrar: str,
+    company_value: str,
+    pans: Iterable[str],
+    scraper: Optional["BaseScraper"] = None,
+    use_cache: bool = True,
+    **kwargs
+) -> Iterator[Dict]:
+    """
+    Check many PANs for one company, yielding one result per PAN
+
+    Cached PANs are answered without touching the scraper; their results
+    are yielded as soon as the scraper reaches the next uncached PAN. Once
+    the registrar's circuit is open, the remaining PANs get their cached
+    result or a retryAfter error without reaching the scraper. The circuit
+    is first consulted at the first uncached PAN, so an all-cached batch
+    never takes a half-open probe.
+    """
+    if registrar not in SCRAPERS:
+        raise ValueError(f"Unknown registrar: {registrar}")
+
+    if scraper is None:
+        scraper = get_scraper_class(registrar)()
+
+    cache = get_allotment_cache() if use_cache else None
+    breaker = get_circuit_breaker()
+    allowed: Optional[bool] = None
+    probe = False
+    denied_for = 0.0
+    hits: Deque[Dict] = deque()
+
+    def uncached_pans() -> Iterator[str]:
+        nonlocal allowed, probe, denied_for
+        for pan in pans:
+            metrics.increment("allotment_requests", registrar=registrar)
+            cached = cache.get(registrar, company_value, pan, kwargs.get("application_number")) if cache else None
+            if cached is not None:
+                hits.append({"pan": pan, **cached})
+                continue
+            if allowed is None:
+                allowed, probe, denied_for = breaker.allow(registrar)
+            retry_after = breaker.retry_after(registrar) if allowed else denied_for
+            if not allowed or retry_after > 0:
+                hits.append({"pan": pan, **circuit_open_result(registrar, retry_after)})
+                continue
+            yield pan
+
+    started = time.monotonic()
+    try:
+        for result in scraper.check_allotment_batch(company_value, uncached_pans(), **kwargs):
+            # Time since the previous result, which includes yielding any hits
+            breaker.record(registrar, result.get("status") != "error", time.monotonic() - started, probe=probe)
+            probe = False
+            while hits:
+                yield hits.popleft()
+            metrics.increment("allotment_results", registrar=registrar, status=result.get("status"))
+            if cache:
+                cache.put(registrar, company_value, result["pan"], {k: v for k, v in result.items() if k != "pan"})
+            yield result
+            started = time.monotonic()
+    finally:
+        # A probe whose PAN never produced a result (the batch was abandoned
+        # or the scraper failed) must not hold the probe key until it expires
+        if probe:
+            breaker.release(registrar)
+
+    while hits:
+        yield hits.popleft()
+
+
+def read_pans(source) -> Iterator[str]:
+    """Read PANs one per line, skipping blanks and # comments"""
+    for line in source:
+        pan = line.strip().upper()
+        if pan and not pan.startswith("#"):
+            yield pan
+
+
+ALLOTMENT_OPTIONS = ["url", "company_value", "application_number", "dp_id", "client_id"]
+
+
+class PooledScrapers:
+    """
+    Builds scrapers that borrow drivers from one shared pool and runs each
+    job through the scheduler: interactive checks, batch checks and
+    background scrapes, each bounded by the registrar's limits
+    """
+
+    def __init__(self, pool: "DriverPool", scheduler: "Scheduler", form_sessions: Optional["FormSessions"] = None):
+        self.pool = pool
+        self.scheduler = scheduler
+        self.form_sessions = form_sessions
+        if form_sessions is not None:
+            pool.reclaim = form_sessions.reclaim
+
+    def get(self, registrar: str) -> "BaseScraper":
+        return get_scraper_class(registrar)(driver_pool=self.pool, form_sessions=self.form_sessions)
+
+    @staticmethod
+    def deadline(params: Dict) -> Optional[float]:
+        return float(params["deadline"]) if params.get("deadline") else None
+
+    def scrape_companies(self, params: Dict) -> List[Dict]:
+        registrar = params["registrar"]
+        scraper = self.get(registrar)
+        return self.scheduler.run(
+            registrar, params.get("lane", "background"),
+            lambda: scrape_companies(registrar, scraper=scraper), self.deadline(params),
+        )
+
+    def scrape_all(self, params: Dict) -> Dict[str, List[Dict]]:
+        """Queue one background scrape per registrar and sync whatever finishes in time"""
+        from scheduler import DeadlineExceeded, QueueFull
+
+        scrapers = {registrar: self.get(registrar) for registrar in SCRAPERS}
+        deadline = self.deadline(params) or SCRAPE_ALL_DEADLINE
+        futures = {
+            registrar: self.scheduler.submit(
+                registrar, "background",
+                lambda registrar=registrar: scrape_companies(registrar, scrapers[registrar], False), deadline,
+            )
+            for registrar in SCRAPERS
+        }
+
+        results: Dict[str, List[Dict]] = {}
+        for registrar, future in futures.items():
+            try:
+                results[registrar] = future.result()
+            except (DeadlineExceeded, QueueFull) as e:
+                print(f"Scraping {registrar} skipped: {e}", file=sys.stderr)
+                scrapers[registrar].abort()
+                results[registrar] = []
+
+        CompanySync().sync_all(results)
+        return results
+
+    def check_allotment(self, params: Dict) -> Dict:
+        registrar = params["registrar"]
+        pan = params["pan"]
+        kwargs = {key: params[key] for key in ALLOTMENT_OPTIONS if params.get(key)}
+
+        # Cache hits are answered without queueing
+        company_value = kwargs.get("company_value") or kwargs.get("url") or REGISTRAR_URLS.get(registrar)
+        cached = (
+            get_allotment_cache().get(registrar, company_value, pan, kwargs.get("application_number"))
+            if registrar in SCRAPERS else None
+        )
+        if cached is not None:
+            return cached
+
+        # An open circuit answers without taking a queue slot
+        retry_after = get_circuit_breaker().retry_after(registrar) if registrar in SCRAPERS else 0.0
+        if retry_after > 0:
+            return circuit_open_result(registrar, retry_after)
+
+        scraper = self.get(registrar)
+        return self.scheduler.run(
+            registrar, params.get("lane", "interactive"),
+            lambda: check_allotment(registrar, pan, scraper=scraper, **kwargs), self.deadline(params),
+        )
+
+    def check_allotment_batch(self, params: Dict) -> List[Dict]:
+        registrar = params["registrar"]
+        kwargs = {key: params[key] for key in ALLOTMENT_OPTIONS if params.get(key) and key != "company_value"}
+        scraper = self.get(registrar)
+        return self.scheduler.run(
+            registrar, params.get("lane", "batch"),
+            lambda: list(check_allotment_batch(
+                registrar, params["company_value"], params["pans"], scraper=scraper, **kwargs
+            )),
+            self.deadline(params),
+        )
+
+    def pool_stats(self, params: Dict) -> Dict:
+        stats = self.pool.stats()
+        if self.form_sessions is not None:
+            stats["formSessions"] = self.form_sessions.stats()
+        return stats
+
+    def scheduler_stats(self, params: Dict) -> Dict:
+        return self.scheduler.stats()
+
+    def close(self):
+        self.scheduler.close()
+        if self.form_sessions is not None:
+            self.form_sessions.close()
+        self.pool.close()
+
+
+def service_jobs(scrapers: PooledScrapers) -> Dict[str, Callable[[Dict], Any]]:
+    """Job table shared by the HTTP service and queue workers"""
+    index_store = CompanyIndexStore()
+    return {
+        "scrape-companies": scrapers.scrape_companies,
+        "scrape-all": scrapers.scrape_all,
+        "check-allotment": scrapers.check_allotment,
+        "check-allotment-batch": scrapers.check_allotment_batch,
+        "pool-stats": scrapers.pool_stats,
+        "scheduler-stats": scrapers.scheduler_stats,
+        "lookup-company": lambda params: index_store.current().search(
+            params["name"], int(params.get("limit", 5)), params.get("registrar")
+        ),
+        "metrics": lambda params: [json.loads(line) for line in metrics.json_lines()],
+    }
+
+
+def pooled_scrapers() -> PooledScrapers:
+    from scheduler import Scheduler
+    from scrapers.base_scraper import create_driver
+    from scrapers.driver_pool import DriverPool
+    from scrapers.form_sessions import FormSessions
+
+    pool = DriverPool(create_driver)
+    return PooledScrapers(pool, Scheduler(), FormSessions(pool) if FORM_SESSIONS_ENABLED else None)
+
+
+def serve(host: str, port: int):
+    """Run the long-lived scraper service"""
+    from server import run_server
+
+    scrapers = pooled_scrapers()
+    text_routes = {"/metrics": metrics.prometheus}
+    run_server(host, port, service_jobs(scrapers), text_routes=text_routes, on_shutdown=scrapers.close)
+
+
+def run_worker(concurrency: int):
+    """Consume jobs from the Redis work queue until interrupted"""
+    from worker import Worker
+    from utils.work_queue import WorkQueue
+
+    scrapers = pooled_scrapers()
+    Worker(service_jobs(scrapers), WorkQueue(), concurrency).run(on_shutdown=scrapers.close)
+
+
+def bulk_check(
+    input_path: str,
+    output_path: str,
+    checkpoint_path: str,
+    workers: int,
+    restart: bool = False,
+    use_cache: bool = True,
+    store: bool = False,
+) -> Dict[str, int]:
+    """
+    Check every row of a CSV/JSONL file, resuming from the checkpoint unless restart is set
+
+    With store, results are also written to the AllotmentCheck table of
+    RESULTS_DATABASE_URL. Rows name their company with company_name or by the
+    companyValue of a company synced to Redis.
+    """
+    from bulk_check import ROW_OPTIONS, BulkCheck, Checkpoint, read_rows
+    from scrapers.base_scraper import create_driver
+    from scrapers.driver_pool import DriverPool
+
+    sink = None
+    on_result = None
+    if store:
+        from utils.result_sink import STORED_STATUSES, ResultSink, get_backend
+
+        sink = ResultSink(get_backend())
+        names: Dict[str, Dict[str, str]] = {}
+
+        def company_names(registrar: str) -> Dict[str, str]:
+            """companyValue -> name from the registrar's synced company entries"""
+            if registrar not in names:
+                try:
+                    snapshots, _ = CompanySync().load_snapshots([registrar])
+                    entries = snapshots[registrar]["entries"]
+                    names[registrar] = {key: json.loads(entry)["name"] for key, entry in entries.items()}
+                except Exception as e:
+                    print(f"Error loading {registrar} company names: {e}", file=sys.stderr)
+                    names[registrar] = {}
+            return names[registrar]
+
+        def store_result(values: Dict[str, str], result: Dict):
+            if result.get("status") not in STORED_STATUSES:
+                sink.add(result, values.get("pan", ""))
+                return
+            company_name = values.get("company_name")
+            if not company_name and values.get("company_value"):
+                company_name = company_names(values["registrar"]).get(values["company_value"])
+            options = {k: values[k] for k in ROW_OPTIONS if k in values}
+            sink.add(result, values.get("pan", ""), company_name=company_name, **options)
+
+        on_result = store_result
+
+    checkpoint = Checkpoint(checkpoint_path, input_path, before_save=(lambda: sink.flush(raise_errors=True)) if sink else None)
+    resuming = not restart and checkpoint.load()
+    if resuming:
+        print(f"Resuming after row {checkpoint.watermark}", file=sys.stderr)
+
+    pool = DriverPool(create_driver, max_size=workers)
+    fmt = "jsonl" if input_path.endswith((".jsonl", ".ndjson")) else "csv"
+    with open(input_path, newline="") as source, open(output_path, "a" if resuming else "w") as output:
+        runner = BulkCheck(
+            check_allotment, check_allotment_batch,
+            lambda registrar: get_scraper_class(registrar)(driver_pool=pool),
+            output, checkpoint, workers, use_cache=use_cache, on_result=on_result,
+        )
+        try:
+            return runner.run(read_rows(source, fmt))
+        finally:
+            pool.close()
+            if sink is not None:
+                sink.close()
+                print(f"Stored results: {json.dumps(sink.counts)}", file=sys.stderr)
+
+
+def lookup_company(name: str, registrar: Optional[str] = None, limit: int = 5, rebuild: bool = False) -> Dict:
+    """Find companies by name in the cross-registrar index"""
+    store = CompanyIndexStore()
+    try:
+        index = store.rebuild() if rebuild else store.current()
     except Exception as e:
-        print(f"Error checking allotment: {e}", file=sys.stderr)
-        return {"status": "error", "message": str(e)}
+        print(f"Error loading company index: {e}", file=sys.stderr)
+        return {"query": name, "error": f"Company index unavailable: {e}"}
+    started = time.perf_counter()
+    matches = index.search(name, limit, registrar)
+    return {
+        "query": name,
+        "matches": matches,
+        "indexedCompanies": len(index),
+        "lookupMicroseconds": round((time.perf_counter() - started) * 1e6, 1),
+    }
+
+
+def watch(registrars: List[str], once: bool = False, force: bool = False) -> Optional[Dict[str, Dict]]:
+    """Scrape registrars only when their company lists change; once returns after a single round"""
+    from watcher import Watcher
+
+    watcher = Watcher(lambda registrar: scrape_companies(registrar, store=False), registrars)
+    if once:
+        return watcher.run_once(force=force)
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        print("Stopping watcher", file=sys.stderr)
+    return None
+
+
+def export_metrics():
+    """Write this run's metrics to the configured files"""
+    if METRICS_FILE:
+        metrics.write_json_lines(METRICS_FILE)
+    if METRICS_PROM_FILE:
+        with open(METRICS_PROM_FILE, "w") as f:
+            f.write(metrics.prometheus())
 
 
 def main():
+    atexit.register(export_metrics)
+
     parser = argparse.ArgumentParser(description="IPO Registrar Scraper")
     subparsers = parser.add_subparsers(dest="command", help="Command to run")
 
     # Scrape companies command
     scrape_parser = subparsers.add_parser("scrape-companies", help="Scrape companies from a registrar")
     scrape_parser.add_argument("--registrar", required=True, choices=SCRAPERS.keys(), help="Registrar to scrape")
+    scrape_parser.add_argument("--changes", action="store_true", help="Print the change set instead of the full list")
+
+    # Get companies command
+    companies_parser = subparsers.add_parser("get-companies", help="Print cached companies, scraping only on a miss")
+    companies_parser.add_argument("--registrar", choices=SCRAPERS.keys(), help="One registrar (default: all active)")
+    companies_parser.add_argument("--cache-only", action="store_true", help="Print [] instead of scraping on a miss")
 
     # Scrape all command
-    subparsers.add_parser("scrape-all", help="Scrape all registrars")
+    scrape_all_parser = subparsers.add_parser("scrape-all", help="Scrape all registrars")
+    scrape_all_parser.add_argument("--workers", type=int, default=SCRAPE_ALL_WORKERS, help="Registrars scraped at once")
+    scrape_all_parser.add_argument("--deadline", type=float, default=SCRAPE_ALL_DEADLINE, help="Seconds before giving up on slow registrars")
+    scrape_all_parser.add_argument("--changes", action="store_true", help="Print change sets instead of full lists")
 
     # Check allotment command
     allotment_parser = subparsers.add_parser("check-allotment", help="Check allotment status")
@@ -104,33 +603,138 @@ def main():
     allotment_parser.add_argument("--application-number", help="Application number")
     allotment_parser.add_argument("--dp-id", help="DP ID")
     allotment_parser.add_argument("--client-id", help="Client ID")
+    allotment_parser.add_argument("--no-cache", action="store_true", help="Skip the allotment result cache")
+
+    # Batch check allotment command
+    batch_parser = subparsers.add_parser("check-allotment-batch", help="Check allotment for many PANs of one company")
+    batch_parser.add_argument("--registrar", required=True, choices=SCRAPERS.keys())
+    batch_parser.add_argument("--company-value", required=True, help="Company dropdown value")
+    batch_parser.add_argument("--pans-file", default="-", help="File with one PAN per line (default: stdin)")
+    batch_parser.add_argument("--url", help="Company-specific URL")
+    batch_parser.add_argument("--no-cache", action="store_true", help="Skip the allotment result cache")
+
+    # Bulk check command
+    bulk_parser = subparsers.add_parser("bulk-check", help="Check a CSV/JSONL file of registrar, PAN and company rows")
+    bulk_parser.add_argument("--input", required=True, help="CSV with a header row, or .jsonl")
+    bulk_parser.add_argument("--output", help="Results JSONL (default: <input>.results.jsonl)")
+    bulk_parser.add_argument("--checkpoint", help="Resume checkpoint (default: <output>.checkpoint)")
+    bulk_parser.add_argument("--workers", type=int, default=DRIVER_POOL_SIZE, help="Company groups checked at once")
+    bulk_parser.add_argument("--restart", action="store_true", help="Ignore the checkpoint and overwrite the output")
+    bulk_parser.add_argument("--no-cache", action="store_true", help="Skip the allotment result cache")
+    bulk_parser.add_argument("--store", action="store_true", help="Also write results to RESULTS_DATABASE_URL")
+
+    # Lookup company command
+    lookup_parser = subparsers.add_parser("lookup-company", help="Find a company's registrar and dropdown value by name")
+    lookup_parser.add_argument("--name", required=True, help="Company name, a prefix or a misspelling")
+    lookup_parser.add_argument("--registrar", choices=SCRAPERS.keys(), help="Only this registrar's companies")
+    lookup_parser.add_argument("--limit", type=int, default=5, help="Matches to print")
+    lookup_parser.add_argument("--rebuild", action="store_true", help="Rebuild the index from the synced companies first")
+
+    # Watch command
+    watch_parser = subparsers.add_parser("watch", help="Scrape registrars only when their company lists change")
+    watch_parser.add_argument("--registrar", action="append", choices=SCRAPERS.keys(), help="Watch only this registrar")
+    watch_parser.add_argument("--once", action="store_true", help="Probe each registrar once and exit (for cron)")
+    watch_parser.add_argument("--force", action="store_true", help="With --once, scrape even if nothing changed")
+
+    # Refresh driver command
+    subparsers.add_parser("refresh-driver", help="Re-resolve chromedriver and update the cached path")
+
+    # Worker command
+    worker_parser = subparsers.add_parser("worker", help="Run jobs from the Redis work queue")
+    worker_parser.add_argument("--concurrency", type=int, default=WORKER_CONCURRENCY, help="Jobs run at once")
+
+    # Submit job command
+    submit_parser = subparsers.add_parser("submit-job", help="Queue a job for workers")
+    submit_parser.add_argument("--job", required=True, help="Job name, e.g. check-allotment")
+    submit_parser.add_argument("--params", default="{}", help="Job params as JSON")
+    submit_parser.add_argument("--lane", default="interactive", choices=["interactive", "batch", "background"])
+    submit_parser.add_argument("--wait", type=float, help="Seconds to wait for the result (default: print the job id)")
+    submit_parser.add_argument("--stats", action="store_true", help="Print queue lengths instead")
+
+    # Serve command
+    serve_parser = subparsers.add_parser("serve", help="Run the long-lived scraper service")
+    serve_parser.add_argument("--host", default=SERVER_HOST, help="Address to bind")
+    serve_parser.add_argument("--port", type=int, default=SERVER_PORT, help="Port to listen on")
 
     args = parser.parse_args()
 
     if args.command == "scrape-companies":
-        companies = scrape_companies(args.registrar)
-        print(json.dumps(companies, indent=2))
+        if args.changes:
+            companies = scrape_companies(args.registrar, store=False)
+            print(json.dumps(CompanySync().sync(args.registrar, companies), indent=2))
+        else:
+            companies = scrape_companies(args.registrar)
+            print(json.dumps(companies, indent=2))
+
+    elif args.command == "get-companies":
+        print(json.dumps(get_companies(args.registrar, cache_only=args.cache_only), indent=2))
 
     elif args.command == "scrape-all":
-        results = scrape_all_registrars()
-        print(json.dumps(results, indent=2))
+        if args.changes:
+            results = scrape_all_registrars(max_workers=args.workers, deadline=args.deadline, store=False)
+            print(json.dumps(CompanySync().sync_all(results), indent=2))
+        else:
+            results = scrape_all_registrars(max_workers=args.workers, deadline=args.deadline)
+            print(json.dumps(results, indent=2))
 
     elif args.command == "check-allotment":
-        kwargs = {}
-        if args.url:
-            kwargs["url"] = args.url
-        if args.company_value:
-            kwargs["company_value"] = args.company_value
-        if args.application_number:
-            kwargs["application_number"] = args.application_number
-        if args.dp_id:
-            kwargs["dp_id"] = args.dp_id
-        if args.client_id:
-            kwargs["client_id"] = args.client_id
-
-        result = check_allotment(args.registrar, args.pan, **kwargs)
+        kwargs = {key: getattr(args, key) for key in ALLOTMENT_OPTIONS if getattr(args, key)}
+
+        result = check_allotment(args.registrar, args.pan, use_cache=not args.no_cache, **kwargs)
         print(json.dumps(result, indent=2))
 
+    elif args.command == "check-allotment-batch":
+        kwargs = {"url": args.url} if args.url else {}
+        source = sys.stdin if args.pans_file == "-" else open(args.pans_file)
+        try:
+            for result in check_allotment_batch(
+                args.registrar, args.company_value, read_pans(source), use_cache=not args.no_cache, **kwargs
+            ):
+                print(json.dumps(result), flush=True)
+        finally:
+            if source is not sys.stdin:
+                source.close()
+
+    elif args.command == "bulk-check":
+        output = args.output or f"{args.input}.results.jsonl"
+        counts = bulk_check(
+            args.input, output, args.checkpoint or f"{output}.checkpoint", args.workers,
+            restart=args.restart, use_cache=not args.no_cache, store=args.store,
+        )
+        print(json.dumps({"output": output, "results": counts}, indent=2))
+
+    elif args.command == "lookup-company":
+        print(json.dumps(lookup_company(args.name, args.registrar, args.limit, args.rebuild), indent=2))
+
+    elif args.command == "watch":
+        summaries = watch(args.registrar or list(SCRAPERS), once=args.once, force=args.force)
+        if summaries is not None:
+            print(json.dumps(summaries, indent=2))
+
+    elif args.command == "refresh-driver":
+        from scrapers import chromedriver
+
+        print(json.dumps(chromedriver.refresh(), indent=2))
+
+    elif args.command == "worker":
+        run_worker(args.concurrency)
+
+    elif args.command == "submit-job":
+        from utils.work_queue import WorkQueue
+
+        queue = WorkQueue()
+        if args.stats:
+            print(json.dumps(queue.stats(), indent=2))
+        else:
+            job_id = queue.submit(args.job, json.loads(args.params), args.lane)
+            if args.wait is None:
+                print(json.dumps({"id": job_id}))
+            else:
+                print(json.dumps(queue.wait(job_id, args.wait), indent=2))
+
+    elif args.command == "serve":
+        serve(args.host, args.port)
+
     else:
         parser.print_help()
         sys.exit(1)
@@ -0,0 +1,229 @@
+"""
+Job scheduler for the scraper service
+An asyncio loop on its own thread queues scraper jobs per registrar. Each
+registrar has a fixed number of workers (its concurrency limit), a token
+bucket (its requests-per-second limit) and a priority queue, so interactive
+allotment checks overtake queued batch checks and cron scrapes. Jobs whose
+deadline passes while queued are dropped without running. The blocking
+scraper calls themselves run on a thread pool.
+"""
+
+import sys
+import time
+import asyncio
+import threading
+import itertools
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+from config import SCHEDULER_LIMITS, SCHEDULER_MAX_QUEUE, SCHEDULER_DEADLINES
+from utils.metrics import metrics
+
+# Lower runs first
+LANES = {"interactive": 0, "batch": 1, "background": 2}
+
+
+class QueueFull(RuntimeError):
+    """A registrar's queue is at capacity; the caller should retry later"""
+
+
+class DeadlineExceeded(TimeoutError):
+    """A job did not finish (or start) before its deadline"""
+
+
+class TokenBucket:
+    """Requests-per-second limiter; acquire() sleeps until a token is free"""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = max(burst, 1.0)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+
+    async def acquire(self):
+        if self.rate <= 0:
+            return
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class _Job:
+    def __init__(self, registrar: str, lane: str, fn: Callable[[], Any], deadline: float):
+        self.registrar = registrar
+        self.lane = lane
+        self.fn = fn
+        self.deadline = deadline
+        self.enqueued = time.monotonic()
+        self.future: Optional[asyncio.Future] = None
+
+
+class _RegistrarQueue:
+    """Priority queue, rate limiter and counters for one registrar"""
+
+    def __init__(self, registrar: str, limits: Dict[str, float]):
+        self.registrar = registrar
+        self.concurrency = int(limits["concurrency"])
+        self.queue: "asyncio.PriorityQueue" = asyncio.PriorityQueue()
+        self.bucket = TokenBucket(limits["rps"], limits["burst"])
+        self.running = 0
+        self.lanes = {
+            lane: {"queued": 0, "completed": 0, "failed": 0, "dropped": 0, "waitSum": 0.0, "waitMax": 0.0}
+            for lane in LANES
+        }
+
+
+class Scheduler:
+    """
+    Priority lanes with per-registrar concurrency, rate limits and deadlines
+
+    submit() may be called from any thread and returns a
+    concurrent.futures.Future; run() blocks for the result.
+    """
+
+    def __init__(
+        self,
+        limits: Optional[Dict[str, Dict[str, float]]] = None,
+        max_queue: int = SCHEDULER_MAX_QUEUE,
+        deadlines: Optional[Dict[str, float]] = None,
+    ):
+        self.limits = limits or SCHEDULER_LIMITS
+        self.max_queue = max_queue
+        self.deadlines = deadlines or SCHEDULER_DEADLINES
+        self.queues: Dict[str, _RegistrarQueue] = {}
+        self._workers: List[asyncio.Task] = []
+        self._seq = itertools.count()
+        self._executor = ThreadPoolExecutor(
+            max_workers=sum(int(limit["concurrency"]) for limit in self.limits.values()) or 1,
+            thread_name_prefix="job",
+        )
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="scheduler", daemon=True)
+        self._thread.start()
+
+    def _limits_for(self, registrar: str) -> Dict[str, float]:
+        return self.limits.get(registrar) or self.limits["default"]
+
+    def submit(self, registrar: str, lane: str, fn: Callable[[], Any], deadline: Optional[float] = None) -> Future:
+        """
+        Queue fn() for a registrar
+
+        Args:
+            lane: interactive, batch or background
+            deadline: Seconds from now; defaults to the lane's deadline
+
+        Raises (through the returned future):
+            QueueFull: The registrar already has max_queue jobs waiting
+            DeadlineExceeded: The deadline passed before the job finished
+        """
+        if lane not in LANES:
+            raise ValueError(f"Unknown lane: {lane}")
+        seconds = deadline if deadline is not None else self.deadlines[lane]
+        job = _Job(registrar, lane, fn, time.monotonic() + seconds)
+        return asyncio.run_coroutine_threadsafe(self._run(job), self._loop)
+
+    def run(self, registrar: str, lane: str, fn: Callable[[], Any], deadline: Optional[float] = None) -> Any:
+        """Queue fn() and wait for its result"""
+        return self.submit(registrar, lane, fn, deadline).result()
+
+    def _queue_for(self, registrar: str) -> _RegistrarQueue:
+        queue = self.queues.get(registrar)
+        if queue is None:
+            queue = self.queues[registrar] = _RegistrarQueue(registrar, self._limits_for(registrar))
+            for _ in range(queue.concurrency):
+                self._workers.append(self._loop.create_task(self._worker(queue)))
+        return queue
+
+    async def _run(self, job: _Job) -> Any:
+        queue = self._queue_for(job.registrar)
+        if queue.queue.qsize() >= self.max_queue:
+            metrics.increment("jobs_rejected", registrar=job.registrar, lane=job.lane)
+            raise QueueFull(f"{job.registrar} queue is full ({self.max_queue} jobs waiting)")
+
+        job.future = self._loop.create_future()
+        queue.lanes[job.lane]["queued"] += 1
+        queue.queue.put_nowait((LANES[job.lane], next(self._seq), job))
+
+        remaining = job.deadline - time.monotonic()
+        try:
+            return await asyncio.wait_for(asyncio.shield(job.future), max(remaining, 0))
+        except asyncio.TimeoutError:
+            raise DeadlineExceeded(f"{job.registrar} {job.lane} job missed its deadline") from None
+
+    async def _worker(self, queue: _RegistrarQueue):
+        while True:
+            _, _, job = await queue.queue.get()
+            stats = queue.lanes[job.lane]
+            stats["queued"] -= 1
+
+            if time.monotonic() >= job.deadline:
+                stats["dropped"] += 1
+                metrics.increment("jobs_dropped", registrar=job.registrar, lane=job.lane)
+                continue
+
+            await queue.bucket.acquire()
+            if time.monotonic() >= job.deadline:
+                stats["dropped"] += 1
+                metrics.increment("jobs_dropped", registrar=job.registrar, lane=job.lane)
+                continue
+
+            waited = time.monotonic() - job.enqueued
+            stats["waitSum"] += waited
+            stats["waitMax"] = max(stats["waitMax"], waited)
+            metrics.record_span(f"queue_wait_{job.lane}", job.registrar, waited)
+
+            queue.running += 1
+            try:
+                result = await self._loop.run_in_executor(self._executor, job.fn)
+                stats["completed"] += 1
+                if not job.future.done():
+                    job.future.set_result(result)
+            except Exception as e:
+                stats["failed"] += 1
+                if not job.future.done():
+                    job.future.set_exception(e)
+                else:
+                    print(f"{job.registrar} job failed after its deadline: {e}", file=sys.stderr)
+            finally:
+                queue.running -= 1
+
+    def stats(self) -> Dict[str, Dict]:
+        """Queue depth, running jobs and per-lane counters and wait times per registrar"""
+        async def collect():
+            return {
+                registrar: {
+                    "depth": queue.queue.qsize(),
+                    "running": queue.running,
+                    "concurrency": queue.concurrency,
+                    "rps": queue.bucket.rate,
+                    "lanes": {
+                        lane: {
+                            **{key: value for key, value in counters.items() if key != "waitSum"},
+                            "waitMax": round(counters["waitMax"], 3),
+                            "waitMean": round(counters["waitSum"] / (counters["completed"] + counters["failed"]), 3)
+                            if counters["completed"] + counters["failed"] else 0.0,
+                        }
+                        for lane, counters in queue.lanes.items()
+                    },
+                }
+                for registrar, queue in self.queues.items()
+            }
+
+        return asyncio.run_coroutine_threadsafe(collect(), self._loop).result()
+
+    def close(self):
+        """Stop the workers and the loop; running scraper calls finish on their threads"""
+        async def stop_workers():
+            for task in self._workers:
+                task.cancel()
+            await asyncio.gather(*self._workers, return_exceptions=True)
+
+        asyncio.run_coroutine_threadsafe(stop_workers(), self._loop).result(timeout=5)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+        self._loop.close()
+        self._executor.shutdown(wait=False)
@@ -1,53 +1,237 @@
+import sys
+import time
 from abc import ABC, abstractmethod
-from typing import Dict, List, Optional
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
 from selenium import webdriver
+from selenium.common.exceptions import SessionNotCreatedException, TimeoutException
+from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
-from config import HEADLESS, TIMEOUT, USER_AGENT
+from config import (
+    HEADLESS, TIMEOUT, USER_AGENT, FAST_PATH_ENABLED, DEFAULT_TIMING_PROFILE, TIMING_PROFILES, BROWSER_WINDOW_SIZE,
+    CHROMEDRIVER_OFFLINE,
+)
+from utils.metrics import metrics
+from . import chromedriver
+from .driver_pool import DriverPool
+from .form_sessions import FormSession, FormSessions
+from .parsing import SCOPE_HTML_SCRIPT, ResultDocument, ResultSelectors
+from .resources import apply_resource_policy, chrome_prefs, driver_rss_mb, launch_flags, rss_sample_due
+from .waits import Locator, any_result_present, network_idle, options_loaded
+
+
+def create_driver() -> webdriver.Chrome:
+    """Setup Chrome WebDriver with options"""
+    chrome_options = Options()
+
+    if HEADLESS:
+        chrome_options.add_argument("--headless")
+
+    chrome_options.add_argument("--no-sandbox")
+    chrome_options.add_argument("--disable-dev-shm-usage")
+    chrome_options.add_argument("--disable-gpu")
+    chrome_options.add_argument(f"user-agent={USER_AGENT}")
+    chrome_options.add_argument(f"--window-size={BROWSER_WINDOW_SIZE}")
+    chrome_options.add_argument("--disable-blink-features=AutomationControlled")
+    chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
+    chrome_options.add_experimental_option("useAutomationExtension", False)
+    for flag in launch_flags():
+        chrome_options.add_argument(flag)
+    prefs = chrome_prefs()
+    if prefs:
+        chrome_options.add_experimental_option("prefs", prefs)
+
+    try:
+        driver = webdriver.Chrome(service=Service(chromedriver.resolve_driver_path()), options=chrome_options)
+    except SessionNotCreatedException as e:
+        # Chrome auto-updated past the cached driver: re-resolve once
+        if not chromedriver.is_version_mismatch(e) or CHROMEDRIVER_OFFLINE:
+            raise
+        path = chromedriver.refresh()["path"]
+        driver = webdriver.Chrome(service=Service(path), options=chrome_options)
+    driver.set_page_load_timeout(TIMEOUT)
+
+    return driver
+
+
+# Whether the page still shows a usable allotment form with the company selected
+FORM_READY_SCRIPT = """
+var pan = document.querySelector(arguments[0]);
+var select = arguments[1] ? document.getElementById(arguments[1]) : null;
+return document.readyState === 'complete' && !!pan && !pan.disabled
+    && (!arguments[2] || (!!select && select.value === arguments[2]));
+"""
 
 
 class BaseScraper(ABC):
     """Base class for all registrar scrapers"""
 
-    def __init__(self, registrar_name: str, base_url: str):
+    # Elements that signal a submitted allotment form has produced an outcome
+    RESULT_LOCATORS: List[Locator] = []
+    # Result markup read by read_allotment_result
+    RESULT_SELECTORS: Optional[ResultSelectors] = None
+    # Form fields checked before reusing a warm form session
+    PAN_INPUT = ""
+    COMPANY_SELECT_ID = ""
+
+    def __init__(
+        self,
+        registrar_name: str,
+        base_url: str,
+        driver_pool: Optional[DriverPool] = None,
+        form_sessions: Optional[FormSessions] = None,
+    ):
         self.registrar_name = registrar_name
         self.base_url = base_url
         self.driver: Optional[webdriver.Chrome] = None
+        # When set, drivers are borrowed from the pool instead of launched
+        self.driver_pool = driver_pool
+        # When set (with a pool), hot companies' forms are kept open between checks
+        self.form_sessions = form_sessions if driver_pool else None
+        self.timing = {**DEFAULT_TIMING_PROFILE, **TIMING_PROFILES.get(registrar_name, {})}
+        # One entry per wait: {"wait": name, "seconds": elapsed, "timedOut": bool}
+        self.wait_timings: List[Dict] = []
 
     def setup_driver(self) -> webdriver.Chrome:
         """Setup Chrome WebDriver with options"""
-        chrome_options = Options()
+        return create_driver()
 
-        if HEADLESS:
-            chrome_options.add_argument("--headless")
+    def span(self, stage: str):
+        """Time a block as a metrics span for this registrar"""
+        return metrics.span(stage, self.registrar_name)
 
-        chrome_options.add_argument("--no-sandbox")
-        chrome_options.add_argument("--disable-dev-shm-usage")
-        chrome_options.add_argument("--disable-gpu")
-        chrome_options.add_argument(f"user-agent={USER_AGENT}")
-        chrome_options.add_argument("--window-size=1920,1080")
-        chrome_options.add_argument("--disable-blink-features=AutomationControlled")
-        chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
-        chrome_options.add_experimental_option("useAutomationExtension", False)
+    def _record_wait(self, name: str, started: float, timed_out: bool = False):
+        seconds = time.monotonic() - started
+        self.wait_timings.append({
+            "wait": name,
+            "seconds": round(seconds, 3),
+            "timedOut": timed_out,
+        })
+        metrics.record_span(name, self.registrar_name, seconds, ok=not timed_out)
 
-        service = Service(ChromeDriverManager().install())
-        driver = webdriver.Chrome(service=service, options=chrome_options)
-        driver.set_page_load_timeout(TIMEOUT)
+    def wait_for(self, condition: Callable, name: str, timeout_key: str = "element"):
+        """
+        Wait for a WebDriverWait condition using this registrar's timing profile
 
-        return driver
+        Args:
+            condition: Callable taking the driver, truthy once satisfied
+            name: Label recorded in wait_timings
+            timeout_key: Which timing profile entry to use as the timeout
+
+        Raises:
+            TimeoutException: If the condition is not met in time
+        """
+        started = time.monotonic()
+        try:
+            result = WebDriverWait(
+                self.driver, self.timing[timeout_key], poll_frequency=self.timing["poll"]
+            ).until(condition)
+        except TimeoutException:
+            self._record_wait(name, started, timed_out=True)
+            raise
+        self._record_wait(name, started)
+        return result
+
+    def load_page(self, url: str):
+        """Navigate to a page; driver.get() returns once the document has loaded"""
+        started = time.monotonic()
+        self.driver.get(url)
+        self._record_wait("page_load", started)
+
+    def wait_for_options(self, locator: Locator):
+        """Wait for a <select> to be populated, returning it even if it stays empty"""
+        try:
+            return self.wait_for(options_loaded(locator), "dropdown_options")
+        except TimeoutException:
+            return self.driver.find_element(*locator)
+
+    def wait_for_idle(self, name: str = "network_idle"):
+        """Wait for XHR/resource traffic to settle, e.g. after a postback-triggering select"""
+        try:
+            self.wait_for(network_idle(self.timing["idle"]), name)
+        except TimeoutException:
+            pass
+
+    def clear_results(self):
+        """Blank any result left by a previous submit so the next wait sees fresh output"""
+        for locator in self.RESULT_LOCATORS:
+            elements = self.driver.find_elements(*locator)
+            if elements:
+                self.driver.execute_script(
+                    "arguments[0].forEach(function (el) { el.textContent = ''; });", elements
+                )
+
+    def wait_for_result(self) -> Optional[Locator]:
+        """Wait for one of RESULT_LOCATORS to show an outcome; None on timeout"""
+        try:
+            return self.wait_for(any_result_present(self.RESULT_LOCATORS), "result", "result")
+        except TimeoutException:
+            return None
+
+    def check_allotment_http(self, pan: str, **kwargs) -> Optional[Dict]:
+        """
+        Check allotment by replaying the registrar's form request directly,
+        without a browser. Subclasses that support it return the same dict
+        as check_allotment(); the default returns None (not supported).
+        """
+        return None
+
+    def try_fast_path(self, pan: str, **kwargs) -> Optional[Dict]:
+        """Run the HTTP fast path, returning None so callers fall back to Selenium"""
+        if not FAST_PATH_ENABLED:
+            return None
+        try:
+            with self.span("http_check"):
+                return self.check_allotment_http(pan, **kwargs)
+        except Exception as e:
+            print(f"{self.registrar_name} fast path failed, falling back to browser: {e}", file=sys.stderr)
+            return None
 
     def start(self):
         """Initialize the WebDriver"""
         if not self.driver:
-            self.driver = self.setup_driver()
+            with self.span("driver_start"):
+                if self.driver_pool:
+                    self.driver = self.driver_pool.acquire()
+                else:
+                    self.driver = self.setup_driver()
+            apply_resource_policy(self.driver, self.registrar_name)
+
+    def wait_summary(self) -> Dict[str, float]:
+        """Total seconds spent per wait name"""
+        totals: Dict[str, float] = {}
+        for entry in self.wait_timings:
+            totals[entry["wait"]] = round(totals.get(entry["wait"], 0) + entry["seconds"], 3)
+        return totals
 
     def stop(self):
-        """Close the WebDriver"""
+        """Close the WebDriver, or hand it back to the pool"""
+        if self.wait_timings:
+            waits = " ".join(f"{name}={seconds}s" for name, seconds in self.wait_summary().items())
+            print(f"{self.registrar_name} waits: {waits}", file=sys.stderr)
+            self.wait_timings = []
         if self.driver:
-            self.driver.quit()
+            rss = driver_rss_mb(self.driver) if rss_sample_due() else None
+            if rss is not None:
+                metrics.observe("driver_rss_mb", rss, registrar=self.registrar_name)
+            if self.driver_pool:
+                self.driver_pool.release(self.driver)
+            else:
+                self.driver.quit()
             self.driver = None
 
+    def abort(self):
+        """Tear down the driver of an in-flight job from another thread so it fails fast"""
+        driver, self.driver = self.driver, None
+        if driver:
+            if self.driver_pool:
+                self.driver_pool.release(driver, discard=True)
+            else:
+                try:
+                    driver.quit()
+                except Exception:
+                    pass
+
     @abstractmethod
     def scrape_companies(self) -> List[Dict]:
         """
@@ -74,6 +258,136 @@ class BaseScraper(ABC):
         """
         pass
 
+    def open_allotment_form(self, company_url: str, **kwargs):
+        """Load the allotment form and select the company (used by batch checks)"""
+        raise NotImplementedError
+
+    def submit_pan(self, pan: str, **kwargs):
+        """Enter a PAN on the already loaded form and submit it"""
+        raise NotImplementedError
+
+    def form_ready(self, **kwargs) -> bool:
+        """Whether the loaded form can take another PAN without reloading"""
+        try:
+            return bool(self.driver.execute_script(
+                FORM_READY_SCRIPT, self.PAN_INPUT, self.COMPANY_SELECT_ID, kwargs.get("company_value")
+            ))
+        except Exception:
+            return False
+
+    def check_allotment_browser(self, company_url: str, pan: str, **kwargs) -> Dict:
+        """
+        Check one PAN through the allotment form in a browser
+
+        A warm form session for the company is used when one is idle, so
+        only PAN entry, submit and parse run. Otherwise the form is loaded
+        cold, and afterwards handed to the form sessions if the company is hot.
+        """
+        key = (self.registrar_name, company_url, kwargs.get("company_value"))
+        session = self.form_sessions.checkout(key) if self.form_sessions else None
+        if session is not None:
+            return self._check_in_session(session, pan, **kwargs)
+
+        self.start()
+        try:
+            with self.span("open_form"):
+                self.open_allotment_form(company_url, **kwargs)
+            with self.span("form_submit"):
+                self.submit_pan(pan, **kwargs)
+            with self.span("parse"):
+                result = self.read_allotment_result(**kwargs)
+            if self.form_sessions and self.form_sessions.adopt(key, self.driver):
+                # The session owns the driver now
+                self.driver = None
+            return result
+        finally:
+            self.stop()
+
+    def _check_in_session(self, session: FormSession, pan: str, **kwargs) -> Dict:
+        """Submit a PAN on a warm form, reloading it once if it went stale or expired"""
+        self.driver = session.driver
+        ok = False
+        try:
+            for attempt in range(2):
+                try:
+                    if attempt or not self.form_ready(**kwargs):
+                        metrics.increment("form_session_reloads", registrar=self.registrar_name)
+                        with self.span("open_form"):
+                            self.open_allotment_form(session.key[1], **kwargs)
+                    with self.span("form_submit"):
+                        self.submit_pan(pan, **kwargs)
+                    with self.span("parse"):
+                        result = self.read_allotment_result(**kwargs)
+                    ok = True
+                    return result
+                except Exception as e:
+                    if attempt:
+                        raise
+                    print(f"{self.registrar_name} warm form failed, reloading: {e}", file=sys.stderr)
+        finally:
+            metrics.increment("form_session_checks", registrar=self.registrar_name, ok=str(ok).lower())
+            self.driver = None
+            self.form_sessions.checkin(session, ok)
+            self.stop()
+
+    def result_document(self) -> ResultDocument:
+        """Parse just the RESULT_SELECTORS scope, pulled from the live DOM in one script call"""
+        html = self.driver.execute_script(SCOPE_HTML_SCRIPT, self.RESULT_SELECTORS.scope)
+        return self.RESULT_SELECTORS.parse(html or "")
+
+    def read_allotment_result(self, **kwargs) -> Dict:
+        """Parse the result of the last submitted PAN"""
+        return self.parse_allotment_result(self.result_document(), **kwargs)
+
+    def parse_allotment_result(self, document: ResultDocument, **kwargs) -> Dict:
+        """Build the allotment result dict from a parsed result fragment"""
+        raise NotImplementedError
+
+    def check_allotment_batch(self, company_value: str, pans: Iterable[str], **kwargs) -> Iterator[Dict]:
+        """
+        Check many PANs for one company in a single browser session
+
+        The form is loaded and the company selected once; only PAN entry,
+        submit and parse repeat per PAN. If the form goes stale it is
+        reloaded and the PAN retried once. Once the HTTP fast path fails it
+        is not retried for the rest of the batch.
+
+        Yields:
+            The check_allotment() result dict for each PAN, plus its "pan"
+        """
+        kwargs["company_value"] = company_value
+        company_url = kwargs.pop("url", self.base_url)
+        form_ready = False
+        fast_path = True
+
+        try:
+            for pan in pans:
+                result = self.try_fast_path(pan, **kwargs) if fast_path else None
+                fast_path = result is not None
+
+                attempts = 2 if form_ready else 1
+                while result is None and attempts:
+                    attempts -= 1
+                    try:
+                        if not form_ready:
+                            self.start()
+                            with self.span("open_form"):
+                                self.open_allotment_form(company_url, **kwargs)
+                            form_ready = True
+                        with self.span("form_submit"):
+                            self.submit_pan(pan, **kwargs)
+                        with self.span("parse"):
+                            result = self.read_allotment_result(**kwargs)
+                    except Exception as e:
+                        print(f"Error checking {self.registrar_name} allotment for batch PAN: {e}", file=sys.stderr)
+                        form_ready = False
+                        if not attempts:
+                            result = {"status": "error", "message": str(e)}
+
+                yield {"pan": pan, **result}
+        finally:
+            self.stop()
+
     def __enter__(self):
         """Context manager entry"""
         self.start()
@@ -1,19 +1,34 @@
 import sys
-import time
-from typing import Dict, List
+from typing import Dict, List, Optional
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait, Select
+from selenium.webdriver.support.ui import Select
 from selenium.webdriver.support import expected_conditions as EC
-from bs4 import BeautifulSoup
 from .base_scraper import BaseScraper
-from config import REGISTRAR_URLS
+from .driver_pool import DriverPool
+from .form_sessions import FormSessions
+from .parsing import ResultDocument, ResultSelectors
+from config import REGISTRAR_URLS, FAST_PATH_URLS, HTTP_TIMEOUT
+from utils.http_client import get_session
 
 
 class BigshareScraper(BaseScraper):
     """Scraper for Bigshare Services"""
 
-    def __init__(self):
-        super().__init__("bigshare", REGISTRAR_URLS["bigshare"])
+    RESULT_LOCATORS = [
+        (By.ID, "gvAllotmentDetails"),
+        (By.CSS_SELECTOR, "div.alert, div.error-message"),
+    ]
+    RESULT_SELECTORS = ResultSelectors(
+        scope="#gvAllotmentDetails, div.alert, div.error-message",
+        rows="table#gvAllotmentDetails tr",
+        message="div.alert, div.error-message",
+    )
+
+    PAN_INPUT = "#txtPanNo"
+    COMPANY_SELECT_ID = "ddlCompany"
+
+    def __init__(self, driver_pool: Optional[DriverPool] = None, form_sessions: Optional[FormSessions] = None):
+        super().__init__("bigshare", REGISTRAR_URLS["bigshare"], driver_pool, form_sessions)
 
     def scrape_companies(self) -> List[Dict]:
         """Scrape active IPOs from Bigshare"""
@@ -21,13 +36,8 @@ class BigshareScraper(BaseScraper):
         companies = []
 
         try:
-            self.driver.get(self.base_url)
-            time.sleep(2)
-
-            wait = WebDriverWait(self.driver, 10)
-            ipo_dropdown = wait.until(
-                EC.presence_of_element_located((By.ID, "ddlCompany"))
-            )
+            self.load_page(self.base_url)
+            ipo_dropdown = self.wait_for_options((By.ID, "ddlCompany"))
 
             select = Select(ipo_dropdown)
             options = select.options
@@ -53,68 +63,116 @@ class BigshareScraper(BaseScraper):
 
         return companies
 
+    def check_allotment_http(self, pan: str, **kwargs) -> Optional[Dict]:
+        """Check allotment through the JSON endpoint behind ipo_status.html"""
+        if "company_value" not in kwargs:
+            return None
+
+        payload = {
+            "Applicationno": kwargs.get("application_number", ""),
+            "Company": kwargs["company_value"],
+            "SelectionType": "PN",
+            "PanNo": pan,
+            "txtcsdl": "",
+            "txtDPID": kwargs.get("dp_id", ""),
+            "txtClId": kwargs.get("client_id", ""),
+            "ddlType": "0",
+        }
+        response = get_session().post(
+            FAST_PATH_URLS["bigshare"],
+            json=payload,
+            headers={"Referer": self.base_url, "X-Requested-With": "XMLHttpRequest"},
+            timeout=HTTP_TIMEOUT,
+        )
+        response.raise_for_status()
+
+        data = response.json().get("d")
+        if not isinstance(data, dict):
+            raise ValueError(f"Unexpected Bigshare response: {str(data)[:100]}")
+
+        record = {key.upper(): str(value or "").strip() for key, value in data.items()}
+        if not record.get("NAME") and not record.get("APPLIED"):
+            return {"status": "pending", "message": "Status not available"}
+
+        # A payload without the field is unfamiliar, not a "not allotted"
+        field = next((key for key in ("ALLOTED", "ALLOTTED") if key in record), None)
+        if field is None:
+            raise ValueError(f"No allotment field in Bigshare response: {', '.join(sorted(record))}")
+        allotted = record[field]
+        if not allotted.replace(".", "", 1).isdigit():
+            raise ValueError(f"Unexpected Bigshare allotment value: {allotted}")
+
+        shares = int(float(allotted))
+        if shares == 0:
+            return {"status": "not_allotted", "message": record.get("MESSAGE") or "Not allotted"}
+
+        return {
+            "status": "allotted",
+            "shares": shares,
+            "amount": record.get("AMOUNT") or "₹0",
+            "refundAmount": "₹0",
+            "applicationNumber": kwargs.get("application_number", "N/A"),
+        }
+
     def check_allotment(self, company_url: str, pan: str, **kwargs) -> Dict:
         """Check allotment status on Bigshare"""
-        self.start()
+        result = self.try_fast_path(pan, **kwargs)
+        if result is not None:
+            return result
 
         try:
-            self.driver.get(company_url)
-            time.sleep(2)
-
-            wait = WebDriverWait(self.driver, 10)
-
-            if "company_value" in kwargs:
-                ipo_dropdown = wait.until(
-                    EC.presence_of_element_located((By.ID, "ddlCompany"))
-                )
-                select = Select(ipo_dropdown)
-                select.select_by_value(kwargs["company_value"])
-                time.sleep(1)
-
-            pan_input = wait.until(
-                EC.presence_of_element_located((By.ID, "txtPanNo"))
-            )
-            pan_input.clear()
-            pan_input.send_keys(pan)
-
-            submit_btn = self.driver.find_element(By.ID, "btnSubmit")
-            submit_btn.click()
-
-            time.sleep(3)
-
-            soup = BeautifulSoup(self.driver.page_source, 'html.parser')
-            allotment_table = soup.find('table', {'id': 'gvAllotmentDetails'})
-
-            if allotment_table:
-                rows = allotment_table.find_all('tr')
-                if len(rows) > 1:
-                    shares = 0
-                    amount = "₹0"
-
-                    for row in rows[1:]:
-                        cells = row.find_all('td')
-                        if len(cells) >= 2:
-                            shares = int(cells[0].text.strip() or 0)
-                            amount = cells[1].text.strip() or "₹0"
-
-                    return {
-                        "status": "allotted",
-                        "shares": shares,
-                        "amount": amount,
-                        "refundAmount": "₹0",
-                        "applicationNumber": kwargs.get("application_number", "N/A"),
-                    }
-
-            error_div = soup.find('div', class_=['alert', 'error-message'])
-            if error_div:
-                message = error_div.text.strip()
-                if "not allotted" in message.lower():
-                    return {"status": "not_allotted", "message": message}
-
-            return {"status": "pending", "message": "Status not available"}
-
+            return self.check_allotment_browser(company_url, pan, **kwargs)
         except Exception as e:
             print(f"Error checking Bigshare allotment: {e}", file=sys.stderr)
             return {"status": "error", "message": str(e)}
-        finally:
-            self.stop()
+
+    def open_allotment_form(self, company_url: str, **kwargs):
+        """Load ipo_status.html and select the company"""
+        self.load_page(company_url)
+
+        if "company_value" in kwargs:
+            ipo_dropdown = self.wait_for_options((By.ID, "ddlCompany"))
+            select = Select(ipo_dropdown)
+            select.select_by_value(kwargs["company_value"])
+            self.wait_for_idle("company_select")
+
+    def submit_pan(self, pan: str, **kwargs):
+        """Enter the PAN on the loaded form and submit it"""
+        pan_input = self.wait_for(
+            EC.presence_of_element_located((By.ID, "txtPanNo")), "pan_input"
+        )
+        pan_input.clear()
+        pan_input.send_keys(pan)
+
+        self.clear_results()
+        submit_btn = self.driver.find_element(By.ID, "btnSubmit")
+        submit_btn.click()
+
+        self.wait_for_result()
+
+    def parse_allotment_result(self, document: ResultDocument, **kwargs) -> Dict:
+        """Parse the allotment table or the not-allotted alert"""
+        rows = document.rows("rows")
+
+        if len(rows) > 1:
+            shares = 0
+            amount = "₹0"
+
+            for cells in rows[1:]:
+                if len(cells) >= 2:
+                    shares = int(cells[0] or 0)
+                    amount = cells[1] or "₹0"
+
+            return {
+                "status": "allotted",
+                "shares": shares,
+                "amount": amount,
+                "refundAmount": "₹0",
+                "applicationNumber": kwargs.get("application_number", "N/A"),
+            }
+
+        message = document.text("message")
+        if message and "not allotted" in message.lower():
+            return {"status": "not_allotted", "message": message}
+
+        return {"status": "pending", "message": "Status not available"}
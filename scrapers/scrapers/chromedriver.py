@@ -0,0 +1,117 @@
+"""
+chromedriver resolution
+ChromeDriverManager().install() resolves the Chrome version and checks for
+a download on every call. The resolved binary is instead recorded once, with
+the Chrome version it matches, in a small JSON cache file that later starts
+read without any lookup. `python main.py refresh-driver` re-resolves it.
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import threading
+from typing import Dict, Optional
+from config import CHROMEDRIVER_PATH, CHROMEDRIVER_CACHE_FILE, CHROMEDRIVER_OFFLINE
+
+_resolved: Optional[str] = None
+_lock = threading.Lock()
+
+
+def _is_executable(path: Optional[str]) -> bool:
+    return bool(path) and os.path.isfile(path) and os.access(path, os.X_OK)
+
+
+def load_cache(cache_file: str = CHROMEDRIVER_CACHE_FILE) -> Optional[Dict]:
+    """The cached record, or None if missing, unreadable or pointing at a deleted binary"""
+    try:
+        with open(cache_file) as f:
+            record = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return record if _is_executable(record.get("path")) else None
+
+
+def _write_cache(record: Dict, cache_file: str = CHROMEDRIVER_CACHE_FILE):
+    directory = os.path.dirname(cache_file)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp = f"{cache_file}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(record, f, indent=2)
+    os.replace(tmp, cache_file)
+
+
+def refresh(cache_file: str = CHROMEDRIVER_CACHE_FILE) -> Dict:
+    """
+    Resolve chromedriver through webdriver-manager and rewrite the cache
+
+    Raises:
+        RuntimeError: In offline mode, where no lookup is allowed
+    """
+    global _resolved
+    if CHROMEDRIVER_OFFLINE:
+        raise RuntimeError("chromedriver refresh needs network access (CHROMEDRIVER_OFFLINE is set)")
+
+    from webdriver_manager.chrome import ChromeDriverManager
+
+    manager = ChromeDriverManager()
+    path = manager.install()
+    try:
+        chrome_version = manager.driver.get_browser_version_from_os()
+    except Exception:
+        chrome_version = None
+
+    record = {"path": path, "chromeVersion": chrome_version, "resolvedAt": int(time.time())}
+    try:
+        _write_cache(record, cache_file)
+    except OSError as e:
+        print(f"Could not write chromedriver cache {cache_file}: {e}", file=sys.stderr)
+
+    with _lock:
+        _resolved = path
+    print(f"Resolved chromedriver {path} (Chrome {chrome_version})", file=sys.stderr)
+    return record
+
+
+def resolve_driver_path() -> str:
+    """
+    Path of the chromedriver binary to launch
+
+    Order: CHROMEDRIVER_PATH, this process's earlier answer, the cache file,
+    chromedriver on PATH when offline, and finally a webdriver-manager
+    lookup whose answer is cached.
+
+    Raises:
+        RuntimeError: Offline with no cached or installed chromedriver
+    """
+    global _resolved
+    if CHROMEDRIVER_PATH:
+        return CHROMEDRIVER_PATH
+
+    with _lock:
+        if _resolved:
+            return _resolved
+        record = load_cache()
+        if record:
+            _resolved = record["path"]
+            return _resolved
+
+    if CHROMEDRIVER_OFFLINE:
+        path = shutil.which("chromedriver")
+        if not path:
+            raise RuntimeError(
+                "No cached chromedriver and none on PATH; run `python main.py refresh-driver` with network access"
+            )
+        with _lock:
+            _resolved = path
+        return path
+
+    return refresh()["path"]
+
+
+def is_version_mismatch(error: Exception) -> bool:
+    """Whether a session failed because Chrome was updated past the cached driver"""
+    message = str(error).lower()
+    return "only supports chrome version" in message or "version of chromedriver" in message
@@ -0,0 +1,183 @@
+import sys
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+from selenium import webdriver
+from config import DRIVER_POOL_SIZE, DRIVER_MAX_USES, DRIVER_ACQUIRE_TIMEOUT
+
+
+class PooledDriver:
+    """A WebDriver plus the bookkeeping the pool needs to recycle it"""
+
+    def __init__(self, driver: webdriver.Chrome):
+        self.driver = driver
+        self.uses = 0
+        self.created_at = time.time()
+
+
+class DriverPool:
+    """
+    Bounded pool of Chrome WebDrivers shared by all registrar scrapers
+
+    Drivers are checked out with acquire() and handed back with release(),
+    which clears cookies and storage before the driver is reused. A driver
+    is retired after max_uses checkouts or as soon as it stops responding.
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[], webdriver.Chrome],
+        max_size: int = DRIVER_POOL_SIZE,
+        max_uses: int = DRIVER_MAX_USES,
+    ):
+        self.factory = factory
+        self.max_size = max_size
+        self.max_uses = max_uses
+
+        self._idle: List[PooledDriver] = []
+        self._busy: Dict[int, PooledDriver] = {}
+        self._size = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+        self.created = 0
+        self.retired = 0
+        # Called when the pool is exhausted to free a driver held elsewhere
+        # (idle warm form sessions); returns whether one was released
+        self.reclaim: Optional[Callable[[], bool]] = None
+
+    def acquire(self, timeout: Optional[float] = DRIVER_ACQUIRE_TIMEOUT) -> webdriver.Chrome:
+        """Check out a healthy driver, creating one if the pool has room"""
+        deadline = time.monotonic() + timeout if timeout is not None else None
+
+        while True:
+            if self.reclaim is not None and self._exhausted():
+                self.reclaim()
+            with self._cond:
+                pooled = self._checkout(deadline, timeout)
+            if pooled is None:
+                break
+            if self._is_healthy(pooled.driver):
+                return pooled.driver
+            # Crashed while idle; drop it and try again
+            self.release(pooled.driver, discard=True)
+
+        try:
+            driver = self.factory()
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+
+        with self._cond:
+            self.created += 1
+            self._busy[id(driver)] = PooledDriver(driver)
+        return driver
+
+    def _exhausted(self) -> bool:
+        with self._cond:
+            return not self._idle and self._size >= self.max_size
+
+    def _checkout(self, deadline: Optional[float], timeout: Optional[float]) -> Optional[PooledDriver]:
+        """
+        Take an idle driver, or reserve a slot for a new one and return None
+        (caller holds the lock)
+        """
+        while True:
+            if self._closed:
+                raise RuntimeError("Driver pool is closed")
+
+            if self._idle:
+                pooled = self._idle.pop()
+                self._busy[id(pooled.driver)] = pooled
+                return pooled
+
+            if self._size < self.max_size:
+                # Reserve the slot; Chrome is launched outside the lock
+                self._size += 1
+                return None
+
+            remaining = deadline - time.monotonic() if deadline is not None else None
+            if remaining is not None and remaining <= 0:
+                raise TimeoutError(f"No driver available after {timeout}s")
+            self._cond.wait(remaining)
+
+    def release(self, driver: webdriver.Chrome, discard: bool = False):
+        """Return a driver to the pool, retiring it if worn out or broken"""
+        with self._cond:
+            pooled = self._busy.pop(id(driver), None)
+        if pooled is None:
+            return
+
+        pooled.uses += 1
+        keep = (
+            not discard
+            and not self._closed
+            and pooled.uses < self.max_uses
+            and self._reset(driver)
+        )
+
+        with self._cond:
+            if keep:
+                self._idle.append(pooled)
+            else:
+                self._size -= 1
+                self.retired += 1
+            self._cond.notify()
+
+        if not keep:
+            self._quit(driver)
+
+    def stats(self) -> Dict:
+        """Pool size and usage counters"""
+        with self._cond:
+            return {
+                "size": self._size,
+                "busy": len(self._busy),
+                "idle": len(self._idle),
+                "maxSize": self.max_size,
+                "maxUses": self.max_uses,
+                "created": self.created,
+                "retired": self.retired,
+            }
+
+    def close(self):
+        """Quit idle drivers; busy drivers are quit when released"""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+            self.retired += len(idle)
+            self._cond.notify_all()
+
+        for pooled in idle:
+            self._quit(pooled.driver)
+
+    @staticmethod
+    def _quit(driver: webdriver.Chrome):
+        try:
+            driver.quit()
+        except Exception as e:
+            print(f"Error quitting pooled driver: {e}", file=sys.stderr)
+
+    @staticmethod
+    def _is_healthy(driver: webdriver.Chrome) -> bool:
+        try:
+            driver.window_handles
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def _reset(driver: webdriver.Chrome) -> bool:
+        """Clear cookies and web storage so the next job starts clean"""
+        try:
+            driver.delete_all_cookies()
+            driver.execute_script(
+                "try { window.localStorage.clear(); window.sessionStorage.clear(); } catch (e) {}"
+            )
+            driver.get("about:blank")
+            return True
+        except Exception:
+            return False
@@ -0,0 +1,203 @@
+import sys
+import time
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from selenium import webdriver
+from config import (
+    FORM_SESSION_MAX, FORM_SESSION_HOT_THRESHOLD, FORM_SESSION_HOT_WINDOW, FORM_SESSION_IDLE, FORM_SESSION_MAX_AGE,
+    FORM_SESSION_MAX_CHECKS,
+)
+from .driver_pool import DriverPool
+
+# (registrar, company url, company value)
+SessionKey = Tuple[str, str, Optional[str]]
+
+
+class FormSession:
+    """A pooled driver with one company's allotment form loaded and selected"""
+
+    def __init__(self, key: SessionKey, driver: webdriver.Chrome):
+        self.key = key
+        self.driver = driver
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        self.checks = 1
+
+
+class FormSessions:
+    """
+    LRU of warm form sessions for hot companies
+
+    A cold check of a company that has been asked for at least
+    hot_threshold times within hot_window seconds hands its driver, form
+    still open, to adopt(). Later checks of that company checkout() the
+    session, submit just the PAN and checkin() the session again. Sessions
+    hold drivers borrowed from the pool: they are bounded by max_sessions,
+    retired when idle, old or heavily used, and reclaim() gives the least
+    recently used one back when the pool runs dry.
+    """
+
+    def __init__(
+        self,
+        pool: DriverPool,
+        max_sessions: int = FORM_SESSION_MAX,
+        hot_threshold: int = FORM_SESSION_HOT_THRESHOLD,
+        hot_window: float = FORM_SESSION_HOT_WINDOW,
+        idle_timeout: float = FORM_SESSION_IDLE,
+        max_age: float = FORM_SESSION_MAX_AGE,
+        max_checks: int = FORM_SESSION_MAX_CHECKS,
+    ):
+        self.pool = pool
+        self.max_sessions = max_sessions
+        self.hot_threshold = hot_threshold
+        self.hot_window = hot_window
+        self.idle_timeout = idle_timeout
+        self.max_age = max_age
+        self.max_checks = max_checks
+
+        self._idle: "OrderedDict[SessionKey, List[FormSession]]" = OrderedDict()
+        self._busy = 0
+        # Key -> [window start, checks in window]
+        self._demand: Dict[SessionKey, List[float]] = {}
+        self._closed = False
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.adopted = 0
+        self.retired = 0
+
+    def _idle_count(self) -> int:
+        return sum(len(sessions) for sessions in self._idle.values())
+
+    def _expired(self, session: FormSession, now: float) -> bool:
+        return (
+            now - session.created_at > self.max_age
+            or now - session.last_used > self.idle_timeout
+            or session.checks >= self.max_checks
+        )
+
+    def _note_demand(self, key: SessionKey, now: float):
+        window = self._demand.get(key)
+        if window is None or now - window[0] > self.hot_window:
+            if len(self._demand) >= 1000:
+                cutoff = now - self.hot_window
+                self._demand = {k: w for k, w in self._demand.items() if w[0] >= cutoff}
+            self._demand[key] = [now, 1]
+        else:
+            window[1] += 1
+
+    def _sweep(self, now: float) -> List[FormSession]:
+        """Remove expired idle sessions (caller holds the lock)"""
+        expired = []
+        for key in list(self._idle):
+            sessions = self._idle[key]
+            expired += [session for session in sessions if self._expired(session, now)]
+            sessions[:] = [session for session in sessions if not self._expired(session, now)]
+            if not sessions:
+                del self._idle[key]
+        return expired
+
+    def _pop_lru(self) -> Optional[FormSession]:
+        """Remove the least recently used idle session (caller holds the lock)"""
+        if not self._idle:
+            return None
+        key = next(iter(self._idle))
+        sessions = self._idle[key]
+        session = sessions.pop(0)
+        if not sessions:
+            del self._idle[key]
+        return session
+
+    def _retire(self, sessions: List[FormSession]):
+        for session in sessions:
+            self.retired += 1
+            self.pool.release(session.driver)
+
+    def checkout(self, key: SessionKey) -> Optional[FormSession]:
+        """An idle session for this company, or None (and note the demand)"""
+        now = time.monotonic()
+        with self._lock:
+            self._note_demand(key, now)
+            expired = self._sweep(now)
+            sessions = self._idle.get(key)
+            session = None
+            if sessions and not self._closed:
+                session = sessions.pop()
+                if not sessions:
+                    del self._idle[key]
+                self._busy += 1
+                self.hits += 1
+            else:
+                self.misses += 1
+        self._retire(expired)
+        return session
+
+    def checkin(self, session: FormSession, ok: bool):
+        """Return a session after a check; failed or worn-out sessions give their driver back"""
+        now = time.monotonic()
+        with self._lock:
+            self._busy -= 1
+            session.checks += 1
+            session.last_used = now
+            keep = ok and not self._closed and not self._expired(session, now)
+            if keep:
+                self._idle.setdefault(session.key, []).append(session)
+                self._idle.move_to_end(session.key)
+        if not keep:
+            self._retire([session])
+
+    def adopt(self, key: SessionKey, driver: webdriver.Chrome) -> bool:
+        """
+        Keep a cold check's driver as a session if the company is hot
+
+        Returns:
+            True if the session now owns the driver
+        """
+        with self._lock:
+            window = self._demand.get(key)
+            if self._closed or not window or window[1] < self.hot_threshold or self.max_sessions <= 0:
+                return False
+            evicted = []
+            while self._idle_count() + self._busy >= self.max_sessions:
+                session = self._pop_lru()
+                if session is None:
+                    return False
+                evicted.append(session)
+            self._idle.setdefault(key, []).append(FormSession(key, driver))
+            self._idle.move_to_end(key)
+            self.adopted += 1
+        self._retire(evicted)
+        print(f"Keeping a warm {key[0]} form for {key[2] or key[1]}", file=sys.stderr)
+        return True
+
+    def reclaim(self) -> bool:
+        """Give the least recently used idle session's driver back to the pool"""
+        with self._lock:
+            session = self._pop_lru()
+        if session is None:
+            return False
+        self._retire([session])
+        return True
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "idle": self._idle_count(),
+                "busy": self._busy,
+                "maxSessions": self.max_sessions,
+                "companies": [f"{key[0]}:{key[2] or key[1]}" for key in self._idle],
+                "hits": self.hits,
+                "misses": self.misses,
+                "adopted": self.adopted,
+                "retired": self.retired,
+            }
+
+    def close(self):
+        """Release idle sessions; busy ones are released at checkin"""
+        with self._lock:
+            self._closed = True
+            sessions = [session for sessions in self._idle.values() for session in sessions]
+            self._idle.clear()
+        self._retire(sessions)
@@ -1,80 +1,84 @@
 import sys
-import time
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait, Select
+from selenium.webdriver.support.ui import Select
 from selenium.webdriver.support import expected_conditions as EC
-from bs4 import BeautifulSoup
 from .base_scraper import BaseScraper
+from .driver_pool import DriverPool
+from .form_sessions import FormSessions
+from .parsing import ResultDocument, ResultSelectors, is_not_allotted
 from config import REGISTRAR_URLS
 
+# Every rendered option's label and data-value in one round trip
+OPTIONS_SCRIPT = """
+return Array.prototype.map.call(document.querySelectorAll("li[role='option']"), function (li) {
+    return [li.textContent.trim(), li.getAttribute('data-value')];
+});
+"""
+
+
+def ipo_type_for(company_name: str) -> str:
+    """bond for NCD/debenture/bond issues, sme for SME issues, mainboard otherwise"""
+    name = company_name.upper()
+    if any(word in name for word in ['NCD', 'DEBENTURE', 'BOND']):
+        return "bond"
+    if 'SME' in name:
+        return "sme"
+    return "mainboard"
+
 
 class KFinScraper(BaseScraper):
     """Scraper for KFin Technologies"""
 
-    def __init__(self):
-        super().__init__("kfin", REGISTRAR_URLS["kfin"])
+    RESULT_LOCATORS = [
+        (By.CSS_SELECTOR, "div.status-result"),
+    ]
+    RESULT_SELECTORS = ResultSelectors(
+        scope="div.status-result, .shares, .amount",
+        status="div.status-result",
+        shares=".shares",
+        amount=".amount",
+    )
+
+    PAN_INPUT = "#txtPAN"
+    COMPANY_SELECT_ID = "ddlIssue"
+
+    def __init__(self, driver_pool: Optional[DriverPool] = None, form_sessions: Optional[FormSessions] = None):
+        super().__init__("kfin", REGISTRAR_URLS["kfin"], driver_pool, form_sessions)
 
     def scrape_companies(self) -> List[Dict]:
-        """Scrape active IPOs from KFin"""
+        """
+        Scrape active IPOs from KFin's rendered Material-UI dropdown
+
+        Reading the JSON endpoint the React app loads its issues from would
+        skip the render, but its URL and payload are not recorded anywhere
+        yet, so the list still comes from the DOM.
+        """
         self.start()
-        companies = []
+        options = []
 
         try:
             print("Accessing KFin website...", file=sys.stderr)
-            self.driver.get(self.base_url)
-
-            # KFin uses Material-UI, wait for React to render
-            wait = WebDriverWait(self.driver, 20)
-            time.sleep(10)
+            self.load_page(self.base_url)
 
             try:
-                # Find and click the Material-UI dropdown
+                # KFin uses Material-UI; wait for React to render the dropdown
                 print("Looking for Material-UI dropdown...", file=sys.stderr)
-                dropdown = wait.until(
-                    EC.element_to_be_clickable((By.ID, "demo-multiple-name"))
+                dropdown = self.wait_for(
+                    EC.element_to_be_clickable((By.ID, "demo-multiple-name")), "company_dropdown"
                 )
 
                 print("Clicking dropdown...", file=sys.stderr)
                 dropdown.click()
-                time.sleep(2)
 
-                # Wait for options to appear
-                options = wait.until(
-                    EC.presence_of_all_elements_located((By.XPATH, "//li[@role='option']"))
+                # Wait for options to appear, then read them all in one call
+                self.wait_for(
+                    EC.presence_of_element_located((By.XPATH, "//li[@role='option']")), "dropdown_options"
                 )
+                options = [tuple(option) for option in self.driver.execute_script(OPTIONS_SCRIPT)]
 
                 print(f"Found {len(options)} options", file=sys.stderr)
 
-                for option in options:
-                    try:
-                        company_name = option.text.strip()
-                        company_value = option.get_attribute("data-value")
-
-                        if company_name and len(company_name) > 5:
-                            # Determine IPO type based on name
-                            ipo_type = "sme"
-                            if any(word in company_name.upper() for word in ['NCD', 'DEBENTURE', 'BOND']):
-                                ipo_type = "bond"
-                            elif not any(word in company_name.upper() for word in ['SME']):
-                                ipo_type = "mainboard"
-
-                            companies.append({
-                                "name": company_name,
-                                "registrar": "kfin",
-                                "ipoType": ipo_type,
-                                "status": "active",
-                                "url": self.base_url,
-                                "companyValue": company_value
-                            })
-                            print(f"Found company: {company_name}", file=sys.stderr)
-
-                    except Exception as opt_error:
-                        print(f"Error processing option: {opt_error}", file=sys.stderr)
-                        continue
-
-                print(f"Scraped {len(companies)} companies from KFin", file=sys.stderr)
-
             except Exception as e:
                 print(f"KFin scraping error: {e}", file=sys.stderr)
 
@@ -83,69 +87,80 @@ class KFinScraper(BaseScraper):
         finally:
             self.stop()
 
-        # Remove duplicates
-        seen = set()
-        unique_companies = []
-        for company in companies:
-            if company['name'] not in seen:
-                seen.add(company['name'])
-                unique_companies.append(company)
+        companies = self.build_companies(options)
+        print(f"Scraped {len(companies)} companies from KFin", file=sys.stderr)
+        return companies
 
-        return unique_companies
+    def build_companies(self, options: List[Tuple[str, Optional[str]]]) -> List[Dict]:
+        """Company records from (name, value) pairs, skipping placeholders and duplicate names"""
+        seen = set()
+        companies = []
+        for company_name, company_value in options:
+            if not company_name or len(company_name) <= 5 or company_name in seen:
+                continue
+            seen.add(company_name)
+            companies.append({
+                "name": company_name,
+                "registrar": "kfin",
+                "ipoType": ipo_type_for(company_name),
+                "status": "active",
+                "url": self.base_url,
+                "companyValue": company_value
+            })
+        return companies
 
     def check_allotment(self, company_url: str, pan: str, **kwargs) -> Dict:
         """Check allotment status on KFin"""
-        self.start()
-
         try:
-            self.driver.get(company_url)
-            time.sleep(2)
-
-            wait = WebDriverWait(self.driver, 10)
-
-            if "company_value" in kwargs:
-                company_select = wait.until(
-                    EC.presence_of_element_located((By.ID, "ddlIssue"))
-                )
-                select = Select(company_select)
-                select.select_by_value(kwargs["company_value"])
-                time.sleep(1)
-
-            pan_input = wait.until(
-                EC.presence_of_element_located((By.ID, "txtPAN"))
-            )
-            pan_input.clear()
-            pan_input.send_keys(pan)
-
-            submit_btn = self.driver.find_element(By.ID, "btnSubmit")
-            submit_btn.click()
-
-            time.sleep(3)
-
-            soup = BeautifulSoup(self.driver.page_source, 'html.parser')
-            status_div = soup.find('div', class_='status-result')
-
-            if status_div:
-                status_text = status_div.text.lower()
-
-                if "allotted" in status_text or "allot" in status_text:
-                    shares_elem = soup.find(class_='shares')
-                    amount_elem = soup.find(class_='amount')
-
-                    return {
-                        "status": "allotted",
-                        "shares": int(shares_elem.text.strip() or 0) if shares_elem else 0,
-                        "amount": amount_elem.text.strip() if amount_elem else "₹0",
-                        "refundAmount": "₹0",
-                        "applicationNumber": kwargs.get("application_number", "N/A"),
-                    }
-                elif "not" in status_text:
-                    return {"status": "not_allotted", "message": "IPO not allotted"}
-
-            return {"status": "pending", "message": "Status pending"}
-
+            return self.check_allotment_browser(company_url, pan, **kwargs)
         except Exception as e:
             print(f"Error checking KFin allotment: {e}", file=sys.stderr)
             return {"status": "error", "message": str(e)}
-        finally:
-            self.stop()
+
+    def open_allotment_form(self, company_url: str, **kwargs):
+        """Load the allotment form and select the issue"""
+        self.load_page(company_url)
+
+        if "company_value" in kwargs:
+            company_select = self.wait_for_options((By.ID, "ddlIssue"))
+            select = Select(company_select)
+            select.select_by_value(kwargs["company_value"])
+            self.wait_for_idle("company_select")
+
+    def submit_pan(self, pan: str, **kwargs):
+        """Enter the PAN on the loaded form and submit it"""
+        pan_input = self.wait_for(
+            EC.presence_of_element_located((By.ID, "txtPAN")), "pan_input"
+        )
+        pan_input.clear()
+        pan_input.send_keys(pan)
+
+        self.clear_results()
+        submit_btn = self.driver.find_element(By.ID, "btnSubmit")
+        submit_btn.click()
+
+        self.wait_for_result()
+
+    def parse_allotment_result(self, document: ResultDocument, **kwargs) -> Dict:
+        """Parse the status-result block"""
+        status_text = document.text("status")
+
+        if status_text:
+            status_text = status_text.lower()
+
+            # "Not Allotted" also contains "allotted", so check it first
+            if is_not_allotted(status_text):
+                return {"status": "not_allotted", "message": "IPO not allotted"}
+            elif "allot" in status_text:
+                shares = document.text("shares")
+                amount = document.text("amount")
+
+                return {
+                    "status": "allotted",
+                    "shares": int(shares or 0),
+                    "amount": amount or "₹0",
+                    "refundAmount": "₹0",
+                    "applicationNumber": kwargs.get("application_number", "N/A"),
+                }
+
+        return {"status": "pending", "message": "Status pending"}
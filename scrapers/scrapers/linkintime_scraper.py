@@ -1,19 +1,35 @@
 import sys
-import time
-from typing import Dict, List
+import xml.etree.ElementTree as ET
+from typing import Dict, List, Optional
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support.ui import Select
 from selenium.webdriver.support import expected_conditions as EC
-from bs4 import BeautifulSoup
 from .base_scraper import BaseScraper
-from config import REGISTRAR_URLS
+from .driver_pool import DriverPool
+from .form_sessions import FormSessions
+from .parsing import ResultDocument, ResultSelectors, is_not_allotted
+from config import REGISTRAR_URLS, FAST_PATH_URLS, HTTP_TIMEOUT
+from utils.http_client import get_session
 
 
 class LinkIntimeScraper(BaseScraper):
     """Scraper for Link Intime"""
 
-    def __init__(self):
-        super().__init__("linkintime", REGISTRAR_URLS["linkintime"])
+    RESULT_LOCATORS = [
+        (By.CSS_SELECTOR, "div.result-container, div.allotment-status"),
+    ]
+    RESULT_SELECTORS = ResultSelectors(
+        scope="div.result-container, div.allotment-status, .shares-allotted, .amount-paid",
+        status="div.result-container, div.allotment-status",
+        shares=".shares-allotted",
+        amount=".amount-paid",
+    )
+
+    PAN_INPUT = "input[name='pan']"
+    COMPANY_SELECT_ID = "ddlCompany"
+
+    def __init__(self, driver_pool: Optional[DriverPool] = None, form_sessions: Optional[FormSessions] = None):
+        super().__init__("linkintime", REGISTRAR_URLS["linkintime"], driver_pool, form_sessions)
 
     def scrape_companies(self) -> List[Dict]:
         """Scrape active IPOs from Link Intime"""
@@ -21,18 +37,11 @@ class LinkIntimeScraper(BaseScraper):
         companies = []
 
         try:
-            self.driver.get(self.base_url)
-            time.sleep(4)
-
-            wait = WebDriverWait(self.driver, 10)
+            self.load_page(self.base_url)
 
             # Link Intime uses a dropdown with ID "ddlCompany"
             try:
-                from selenium.webdriver.support.ui import Select
-
-                company_dropdown = wait.until(
-                    EC.presence_of_element_located((By.ID, "ddlCompany"))
-                )
+                company_dropdown = self.wait_for_options((By.ID, "ddlCompany"))
 
                 select = Select(company_dropdown)
                 options = select.options
@@ -70,56 +79,124 @@ class LinkIntimeScraper(BaseScraper):
 
         return companies
 
+    def check_allotment_http(self, pan: str, **kwargs) -> Optional[Dict]:
+        """Check allotment through the page-method XHRs the public-issues form uses"""
+        if "company_value" not in kwargs:
+            return None
+
+        session = get_session()
+        headers = {"Referer": self.base_url, "X-Requested-With": "XMLHttpRequest"}
+
+        token_response = session.post(FAST_PATH_URLS["linkintime_token"], json={}, headers=headers, timeout=HTTP_TIMEOUT)
+        token_response.raise_for_status()
+        token = token_response.json().get("d", "")
+
+        response = session.post(
+            FAST_PATH_URLS["linkintime"],
+            json={
+                "clientid": kwargs["company_value"],
+                "PAN": pan,
+                "IFSC": "",
+                "CHKVAL": "1",
+                "token": token,
+            },
+            headers=headers,
+            timeout=HTTP_TIMEOUT,
+        )
+        response.raise_for_status()
+
+        data = response.json().get("d")
+        if not isinstance(data, str) or not data.strip().startswith("<"):
+            raise ValueError(f"Unexpected Link Intime response: {str(data)[:100]}")
+
+        # Results come back as an ADO.NET DataSet serialized to XML
+        table = ET.fromstring(data).find("Table")
+        if table is None:
+            return {"status": "pending", "message": "Status pending"}
+
+        record = {child.tag.upper(): (child.text or "").strip() for child in table}
+        # A payload without the field is unfamiliar, not a "not allotted"
+        field = next((key for key in ("ALLOT", "ALLOTED") if key in record), None)
+        if field is None:
+            raise ValueError(f"No allotment field in Link Intime response: {', '.join(sorted(record))}")
+        allotted = record[field]
+        if not allotted.replace(".", "", 1).isdigit():
+            raise ValueError(f"Unexpected Link Intime allotment value: {allotted}")
+
+        shares = int(float(allotted))
+        if shares == 0:
+            return {"status": "not_allotted", "message": "IPO not allotted"}
+
+        amount = record.get("AMTADJ") or record.get("AMOUNT")
+        return {
+            "status": "allotted",
+            "shares": shares,
+            "amount": f"₹{amount}" if amount else "₹0",
+            "refundAmount": "₹0",
+            "applicationNumber": kwargs.get("application_number", "N/A"),
+        }
+
     def check_allotment(self, company_url: str, pan: str, **kwargs) -> Dict:
         """Check allotment status on Link Intime"""
-        self.start()
+        result = self.try_fast_path(pan, **kwargs)
+        if result is not None:
+            return result
 
         try:
-            self.driver.get(company_url)
-            time.sleep(2)
-
-            wait = WebDriverWait(self.driver, 10)
-
-            pan_input = wait.until(
-                EC.presence_of_element_located((By.NAME, "pan"))
-            )
-            pan_input.clear()
-            pan_input.send_keys(pan)
-
-            if "application_number" in kwargs:
-                app_input = self.driver.find_element(By.NAME, "appno")
-                app_input.clear()
-                app_input.send_keys(kwargs["application_number"])
-
-            submit_btn = self.driver.find_element(By.CSS_SELECTOR, "button[type='submit']")
-            submit_btn.click()
-
-            time.sleep(3)
-
-            soup = BeautifulSoup(self.driver.page_source, 'html.parser')
-            result_div = soup.find('div', class_=['result-container', 'allotment-status'])
-
-            if result_div:
-                status_text = result_div.text.lower()
-
-                if "allotted" in status_text or "successful" in status_text:
-                    shares_elem = soup.find(class_=['shares-allotted'])
-                    amount_elem = soup.find(class_=['amount-paid'])
-
-                    return {
-                        "status": "allotted",
-                        "shares": int(shares_elem.text.strip() or 0) if shares_elem else 0,
-                        "amount": amount_elem.text.strip() if amount_elem else "₹0",
-                        "refundAmount": "₹0",
-                        "applicationNumber": kwargs.get("application_number", "N/A"),
-                    }
-                elif "not" in status_text or "unsuccessful" in status_text:
-                    return {"status": "not_allotted", "message": "IPO not allotted"}
-
-            return {"status": "pending", "message": "Status pending"}
-
+            return self.check_allotment_browser(company_url, pan, **kwargs)
         except Exception as e:
             print(f"Error checking Link Intime allotment: {e}", file=sys.stderr)
             return {"status": "error", "message": str(e)}
-        finally:
-            self.stop()
+
+    def open_allotment_form(self, company_url: str, **kwargs):
+        """Load the public-issues form and select the company"""
+        self.load_page(company_url)
+
+        if "company_value" in kwargs:
+            company_dropdown = self.wait_for_options((By.ID, "ddlCompany"))
+            Select(company_dropdown).select_by_value(kwargs["company_value"])
+            self.wait_for_idle("company_select")
+
+    def submit_pan(self, pan: str, **kwargs):
+        """Enter the PAN (and application number) and submit the form"""
+        pan_input = self.wait_for(
+            EC.presence_of_element_located((By.NAME, "pan")), "pan_input"
+        )
+        pan_input.clear()
+        pan_input.send_keys(pan)
+
+        if "application_number" in kwargs:
+            app_input = self.driver.find_element(By.NAME, "appno")
+            app_input.clear()
+            app_input.send_keys(kwargs["application_number"])
+
+        self.clear_results()
+        submit_btn = self.driver.find_element(By.CSS_SELECTOR, "button[type='submit']")
+        submit_btn.click()
+
+        self.wait_for_result()
+
+    def parse_allotment_result(self, document: ResultDocument, **kwargs) -> Dict:
+        """Parse the result container"""
+        status_text = document.text("status")
+
+        if status_text:
+            status_text = status_text.lower()
+
+            # Negative outcomes contain the positive words ("not allotted",
+            # "unsuccessful"), so check them first
+            if is_not_allotted(status_text):
+                return {"status": "not_allotted", "message": "IPO not allotted"}
+            elif "allotted" in status_text or "successful" in status_text:
+                shares = document.text("shares")
+                amount = document.text("amount")
+
+                return {
+                    "status": "allotted",
+                    "shares": int(shares or 0),
+                    "amount": amount or "₹0",
+                    "refundAmount": "₹0",
+                    "applicationNumber": kwargs.get("application_number", "N/A"),
+                }
+
+        return {"status": "pending", "message": "Status pending"}
@@ -0,0 +1,246 @@
+"""
+Result parsing backends
+Scrapers pull only the result elements out of the live DOM (one
+execute_script call returning their outerHTML) and query that fragment with
+named selectors compiled once per backend, instead of serializing the whole
+page and building a BeautifulSoup tree with html.parser on every check.
+
+Backends, fastest first: selectolax and lxml (C parsers, both optional) and
+BeautifulSoup. SCRAPER_HTML_PARSER picks one; "auto" uses the fastest one
+installed.
+"""
+
+import re
+import sys
+from typing import Any, Dict, List, Optional
+from config import HTML_PARSER
+
+try:
+    from selectolax.parser import HTMLParser as SelectolaxHTMLParser
+except ImportError:
+    SelectolaxHTMLParser = None
+
+try:
+    import lxml.html
+    from lxml import etree
+except ImportError:
+    lxml = None
+
+from bs4 import BeautifulSoup
+
+
+# Returns the outerHTML of every element matching a selector list, skipping
+# elements nested inside another match so nothing is serialized twice
+SCOPE_HTML_SCRIPT = """
+    var matched = Array.prototype.slice.call(document.querySelectorAll(arguments[0]));
+    return matched.filter(function (el) {
+        return !matched.some(function (other) { return other !== el && other.contains(el); });
+    }).map(function (el) { return el.outerHTML; }).join('');
+"""
+
+_COMPOUND = re.compile(r"^(?P<tag>[A-Za-z][\w-]*|\*)?(?P<rest>(?:[#.][\w-]+)*)$")
+_SIMPLE = re.compile(r"([#.])([\w-]+)")
+
+# Negative allotment outcomes; they contain the positive words ("allotted",
+# "successful"), so status text is checked against these first
+_NOT_ALLOTTED = re.compile(r"\bnot\s+(?:been\s+)?allotted\b|\bunsuccessful\b")
+
+
+def is_not_allotted(status_text: str) -> bool:
+    """True for "Not Allotted", "not been allotted" and "Unsuccessful"; other text with "not" is not a negative outcome"""
+    return bool(_NOT_ALLOTTED.search(status_text.lower()))
+
+
+def css_to_xpath(css: str) -> str:
+    """
+    Translate the CSS subset used by result selectors to XPath
+
+    Supports type, #id and .class selectors, descendant combinators and
+    comma-separated lists, e.g. "table#gvAllotmentDetails tr, div.alert".
+
+    Raises:
+        ValueError: For anything outside that subset
+    """
+    alternatives = []
+    for selector in css.split(","):
+        steps = []
+        for compound in selector.split():
+            match = _COMPOUND.match(compound)
+            if not match or not (match.group("tag") or match.group("rest")):
+                raise ValueError(f"Unsupported selector: {css}")
+            step = match.group("tag") or "*"
+            for kind, value in _SIMPLE.findall(match.group("rest")):
+                if kind == "#":
+                    step += f"[@id='{value}']"
+                else:
+                    step += f"[contains(concat(' ', normalize-space(@class), ' '), ' {value} ')]"
+            steps.append(step)
+        if not steps:
+            raise ValueError(f"Unsupported selector: {css}")
+        alternatives.append("descendant-or-self::" + "/descendant::".join(steps))
+    return " | ".join(alternatives)
+
+
+class ParserBackend:
+    """Parses HTML and evaluates compiled selectors"""
+
+    name = ""
+
+    def compile(self, css: str) -> Any:
+        return css
+
+    def parse(self, html: str) -> Any:
+        raise NotImplementedError
+
+    def select(self, document: Any, compiled: Any) -> List[Any]:
+        raise NotImplementedError
+
+    def text(self, node: Any) -> str:
+        raise NotImplementedError
+
+    def cells(self, node: Any) -> List[str]:
+        """Text of a row's <td> children"""
+        raise NotImplementedError
+
+
+class SelectolaxBackend(ParserBackend):
+    name = "selectolax"
+
+    def parse(self, html: str):
+        return SelectolaxHTMLParser(html)
+
+    def select(self, document, compiled):
+        return document.css(compiled)
+
+    def text(self, node) -> str:
+        return node.text()
+
+    def cells(self, node) -> List[str]:
+        return [self.text(cell).strip() for cell in node.css("td")]
+
+
+class LxmlBackend(ParserBackend):
+    name = "lxml"
+
+    def __init__(self):
+        self._td = etree.XPath("./td")
+
+    def compile(self, css: str):
+        return etree.XPath(css_to_xpath(css))
+
+    def parse(self, html: str):
+        if not html.strip():
+            return None
+        return lxml.html.fragment_fromstring(html, create_parent="div")
+
+    def select(self, document, compiled):
+        return compiled(document) if document is not None else []
+
+    def text(self, node) -> str:
+        return node.text_content()
+
+    def cells(self, node) -> List[str]:
+        return [self.text(cell).strip() for cell in self._td(node)]
+
+
+class SoupBackend(ParserBackend):
+    name = "bs4"
+
+    def __init__(self):
+        self.features = "lxml" if lxml is not None else "html.parser"
+
+    def parse(self, html: str):
+        return BeautifulSoup(html, self.features)
+
+    def select(self, document, compiled):
+        return document.select(compiled)
+
+    def text(self, node) -> str:
+        return node.get_text()
+
+    def cells(self, node) -> List[str]:
+        return [self.text(cell).strip() for cell in node.find_all("td", recursive=False)]
+
+
+BACKENDS = {
+    "selectolax": SelectolaxBackend,
+    "lxml": LxmlBackend,
+    "bs4": SoupBackend,
+}
+
+_backends: Dict[str, ParserBackend] = {}
+
+
+def available_backends() -> List[str]:
+    """Installed backends, fastest first"""
+    names = []
+    if SelectolaxHTMLParser is not None:
+        names.append("selectolax")
+    if lxml is not None:
+        names.append("lxml")
+    names.append("bs4")
+    return names
+
+
+def get_backend(name: str = HTML_PARSER) -> ParserBackend:
+    """Backend by name; "auto" or an uninstalled one falls back to the fastest available"""
+    available = available_backends()
+    if name not in available:
+        if name != "auto":
+            print(f"HTML parser '{name}' not available, using {available[0]}", file=sys.stderr)
+        name = available[0]
+    if name not in _backends:
+        _backends[name] = BACKENDS[name]()
+    return _backends[name]
+
+
+class ResultDocument:
+    """A parsed result fragment queried by selector name"""
+
+    def __init__(self, backend: ParserBackend, compiled: Dict[str, Any], html: str):
+        self.backend = backend
+        self.compiled = compiled
+        self.document = backend.parse(html)
+
+    def select(self, name: str) -> List[Any]:
+        return self.backend.select(self.document, self.compiled[name])
+
+    def exists(self, name: str) -> bool:
+        return bool(self.select(name))
+
+    def text(self, name: str) -> Optional[str]:
+        """Stripped text of the first match, or None when nothing matches"""
+        nodes = self.select(name)
+        return self.backend.text(nodes[0]).strip() if nodes else None
+
+    def rows(self, name: str) -> List[List[str]]:
+        """Cell texts of each matched row; header rows come back empty"""
+        return [self.backend.cells(node) for node in self.select(name)]
+
+
+class ResultSelectors:
+    """
+    Named CSS selectors for one registrar's result markup
+
+    Args:
+        scope: Selector list for the elements pulled from the page; the
+            named selectors are evaluated inside them
+        **selectors: Name -> selector, compiled once per backend
+    """
+
+    def __init__(self, scope: str, **selectors: str):
+        self.scope = scope
+        self.selectors = selectors
+        self._compiled: Dict[str, Dict[str, Any]] = {}
+
+    def compiled(self, backend: ParserBackend) -> Dict[str, Any]:
+        if backend.name not in self._compiled:
+            self._compiled[backend.name] = {
+                name: backend.compile(css) for name, css in self.selectors.items()
+            }
+        return self._compiled[backend.name]
+
+    def parse(self, html: str, backend: Optional[ParserBackend] = None) -> ResultDocument:
+        """Parse a result fragment (or a full page) for querying by name"""
+        backend = backend or get_backend()
+        return ResultDocument(backend, self.compiled(backend), html)
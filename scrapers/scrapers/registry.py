@@ -0,0 +1,31 @@
+"""
+Registrar scraper registry
+Scraper classes are named by dotted path and imported on first use, so code
+paths that never launch a browser (cache hits, Redis reads) don't pay for
+importing selenium and the parsing stack.
+"""
+
+import importlib
+import threading
+from typing import Dict
+
+SCRAPERS = {
+    "bigshare": "scrapers.bigshare_scraper.BigshareScraper",
+    "kfin": "scrapers.kfin_scraper.KFinScraper",
+    "linkintime": "scrapers.linkintime_scraper.LinkIntimeScraper",
+}
+
+_classes: Dict[str, type] = {}
+_lock = threading.Lock()
+
+
+def get_scraper_class(registrar: str) -> type:
+    """Import and return the scraper class for a registrar"""
+    if registrar not in SCRAPERS:
+        raise ValueError(f"Unknown registrar: {registrar}")
+
+    with _lock:
+        if registrar not in _classes:
+            module_name, class_name = SCRAPERS[registrar].rsplit(".", 1)
+            _classes[registrar] = getattr(importlib.import_module(module_name), class_name)
+        return _classes[registrar]
@@ -0,0 +1,139 @@
+"""
+Chrome resource policy
+Per-registrar blocking of resource types and URL patterns through CDP
+Network.setBlockedURLs, launch flags that trim Chrome's memory use, and
+per-driver RSS measurement from /proc, sampled every RSS_SAMPLE_EVERY stops.
+"""
+
+import os
+import sys
+import itertools
+from typing import Dict, List, Optional
+from config import (
+    RESOURCE_POLICY_ENABLED, BROWSER_LOW_MEMORY, DEFAULT_RESOURCE_POLICY, RESOURCE_POLICIES, RSS_SAMPLE_EVERY,
+)
+
+# URL patterns standing in for resource types (CDP blocking matches URLs
+# only); the trailing * also covers query strings
+TYPE_PATTERNS = {
+    "image": ["*.png*", "*.jpg*", "*.jpeg*", "*.gif*", "*.webp*", "*.svg*", "*.ico*", "*.bmp*"],
+    "font": ["*.woff*", "*.ttf*", "*.otf*", "*.eot*", "*fonts.googleapis.com*", "*fonts.gstatic.com*"],
+    "media": ["*.mp4*", "*.webm*", "*.mp3*", "*.ogg*"],
+    "stylesheet": ["*.css*"],
+}
+
+LOW_MEMORY_FLAGS = [
+    "--disable-extensions",
+    "--disable-background-networking",
+    "--disable-component-update",
+    "--disable-default-apps",
+    "--disable-sync",
+    "--no-first-run",
+    "--mute-audio",
+    "--renderer-process-limit=1",
+    "--disk-cache-size=1",
+    "--disable-features=Translate,MediaRouter,OptimizationHints,AutofillServerCommunication",
+]
+
+
+def resource_policy(registrar: str) -> Dict[str, List[str]]:
+    return {**DEFAULT_RESOURCE_POLICY, **RESOURCE_POLICIES.get(registrar, {})}
+
+
+def blocked_url_patterns(registrar: str) -> List[str]:
+    """URL patterns blocked for a registrar's pages"""
+    if not RESOURCE_POLICY_ENABLED:
+        return []
+    policy = resource_policy(registrar)
+    patterns = []
+    for resource_type in policy.get("block_types", []):
+        patterns += TYPE_PATTERNS.get(resource_type, [])
+    return patterns + list(policy.get("block_urls", []))
+
+
+def chrome_prefs() -> Dict[str, int]:
+    """
+    Content-setting prefs for a new driver
+
+    Drivers are shared between registrars, so only types every registrar
+    blocks are disabled at launch; the rest is blocked per checkout.
+    """
+    if not RESOURCE_POLICY_ENABLED:
+        return {}
+    registrars = list(RESOURCE_POLICIES) or [""]
+    if all("image" in resource_policy(registrar).get("block_types", []) for registrar in registrars):
+        return {"profile.managed_default_content_settings.images": 2}
+    return {}
+
+
+def launch_flags() -> List[str]:
+    return LOW_MEMORY_FLAGS if BROWSER_LOW_MEMORY else []
+
+
+def apply_resource_policy(driver, registrar: str):
+    """Block this registrar's unneeded requests for the driver's session"""
+    patterns = blocked_url_patterns(registrar)
+    if getattr(driver, "blocked_urls", None) == patterns:
+        return
+    try:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": patterns})
+        driver.blocked_urls = patterns
+    except Exception as e:
+        print(f"Could not apply resource policy for {registrar}: {e}", file=sys.stderr)
+
+
+_stops = itertools.count()
+
+
+def rss_sample_due() -> bool:
+    """True on every RSS_SAMPLE_EVERY-th call, starting with the first"""
+    return RSS_SAMPLE_EVERY > 0 and next(_stops) % RSS_SAMPLE_EVERY == 0
+
+
+def _child_map() -> Dict[int, List[int]]:
+    """Parent pid -> child pids, from /proc/<pid>/stat"""
+    children: Dict[int, List[int]] = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # The command name may contain spaces; fields resume after ")"
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+    return children
+
+
+def _rss_kb(pid: int) -> int:
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+def driver_rss_mb(driver) -> Optional[float]:
+    """
+    Resident memory of chromedriver plus every Chrome process under it, in MB
+
+    Returns None where /proc is unavailable (non-Linux) or the driver has
+    no local service process.
+    """
+    process = getattr(getattr(driver, "service", None), "process", None)
+    if process is None or not os.path.isdir("/proc"):
+        return None
+
+    children = _child_map()
+    total_kb = 0
+    pending = [process.pid]
+    while pending:
+        pid = pending.pop()
+        total_kb += _rss_kb(pid)
+        pending += children.get(pid, [])
+    return round(total_kb / 1024.0, 1)
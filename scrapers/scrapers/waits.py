@@ -0,0 +1,79 @@
+"""
+WebDriverWait conditions used in place of fixed sleeps
+Each condition is a callable taking the driver and returning a truthy
+value once satisfied, as expected by WebDriverWait.until().
+"""
+
+import time
+from typing import List, Tuple
+from selenium.common.exceptions import StaleElementReferenceException
+
+Locator = Tuple[str, str]
+
+
+class options_loaded:
+    """A <select> is present and has options beyond the placeholder"""
+
+    def __init__(self, locator: Locator, min_options: int = 2):
+        self.locator = locator
+        self.min_options = min_options
+
+    def __call__(self, driver):
+        elements = driver.find_elements(*self.locator)
+        if not elements:
+            return False
+        try:
+            options = elements[0].find_elements("tag name", "option")
+        except StaleElementReferenceException:
+            return False
+        return elements[0] if len(options) >= self.min_options else False
+
+
+class any_result_present:
+    """
+    One of several result elements is present with non-empty text
+    Returns the locator that matched so callers know which outcome arrived.
+    """
+
+    def __init__(self, locators: List[Locator]):
+        self.locators = locators
+
+    def __call__(self, driver):
+        for locator in self.locators:
+            for element in driver.find_elements(*locator):
+                try:
+                    if element.text.strip():
+                        return locator
+                except StaleElementReferenceException:
+                    continue
+        return False
+
+
+class network_idle:
+    """
+    No new resource requests and no active jQuery XHRs for idle_time seconds
+    Resource Timing entries are counted between polls as a proxy for traffic.
+    """
+
+    SCRIPT = """
+        return [
+            document.readyState,
+            performance.getEntriesByType('resource').length,
+            (window.jQuery && window.jQuery.active) || 0
+        ];
+    """
+
+    def __init__(self, idle_time: float = 0.5):
+        self.idle_time = idle_time
+        self.last_count = -1
+        self.quiet_since = 0.0
+
+    def __call__(self, driver):
+        ready_state, count, active = driver.execute_script(self.SCRIPT)
+        now = time.monotonic()
+        if ready_state != "complete" or active or count != self.last_count:
+            self.last_count = count
+            self.quiet_since = now
+            return False
+        return now - self.quiet_since >= self.idle_time
+
@@ -0,0 +1,122 @@
+"""
+Long-lived scraper service
+Keeps warm scrapers in one process and accepts jobs over local HTTP so
+callers skip interpreter startup, imports and Chrome launch per request.
+Scrapers borrow Chrome instances from a shared driver pool.
+
+  POST /scrape-companies   {"registrar": "bigshare"}
+  POST /scrape-all         {}
+  POST /check-allotment    {"registrar": "bigshare", "pan": "ABCDE1234F", ...}
+  POST /pool-stats         {}
+  POST /scheduler-stats    {}
+  GET  /health
+  GET  /metrics            Prometheus text
+
+Responses carry the same JSON the CLI prints for the matching command.
+Job params may also set "lane" (interactive, batch, background) and
+"deadline" in seconds; a full queue answers 503, a missed deadline 504.
+"""
+
+import sys
+import json
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Optional
+from scheduler import DeadlineExceeded, QueueFull
+
+
+Job = Callable[[Dict], Any]
+
+
+class JobRequestHandler(BaseHTTPRequestHandler):
+    """Dispatch JSON job requests to the server's job table"""
+
+    server: "ScraperServer"
+
+    def do_GET(self):
+        path = self.path.rstrip("/")
+        if path == "/health":
+            self._send_json(200, {"status": "ok", "jobs": sorted(self.server.jobs)})
+        elif path in self.server.text_routes:
+            body = self.server.text_routes[path]().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        else:
+            self._send_json(404, {"error": f"Unknown path: {self.path}"})
+
+    def do_POST(self):
+        job_name = self.path.strip("/")
+        job = self.server.jobs.get(job_name)
+        if job is None:
+            self._send_json(404, {"error": f"Unknown job: {job_name}"})
+            return
+
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            params = json.loads(self.rfile.read(length) or b"{}")
+        except (ValueError, json.JSONDecodeError) as e:
+            self._send_json(400, {"error": f"Invalid JSON body: {e}"})
+            return
+
+        try:
+            result = job(params)
+        except (KeyError, ValueError) as e:
+            self._send_json(400, {"error": str(e)})
+            return
+        except QueueFull as e:
+            self._send_json(503, {"error": str(e)})
+            return
+        except DeadlineExceeded as e:
+            self._send_json(504, {"error": str(e)})
+            return
+        except Exception as e:
+            print(f"Error running job {job_name}: {e}", file=sys.stderr)
+            self._send_json(500, {"error": str(e)})
+            return
+
+        self._send_json(200, result)
+
+    def _send_json(self, status: int, payload: Any):
+        body = json.dumps(payload, indent=2).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        print(f"[serve] {self.address_string()} {format % args}", file=sys.stderr)
+
+
+class ScraperServer(ThreadingHTTPServer):
+    """Threaded HTTP server holding a table of named jobs"""
+
+    daemon_threads = True
+
+    def __init__(self, host: str, port: int, jobs: Dict[str, Job], text_routes: Optional[Dict[str, Callable[[], str]]] = None):
+        super().__init__((host, port), JobRequestHandler)
+        self.jobs = jobs
+        self.text_routes = text_routes or {}
+
+
+def run_server(
+    host: str,
+    port: int,
+    jobs: Dict[str, Job],
+    text_routes: Optional[Dict[str, Callable[[], str]]] = None,
+    on_shutdown: Optional[Callable[[], None]] = None,
+):
+    """Serve jobs (and plain-text GET routes such as /metrics) until interrupted"""
+    server = ScraperServer(host, port, jobs, text_routes)
+    print(f"Scraper service listening on http://{host}:{port}", file=sys.stderr)
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if on_shutdown:
+            on_shutdown()
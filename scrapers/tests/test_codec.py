@@ -0,0 +1,79 @@
+"""
+Compact Redis encodings
+
+fixtures/codec_values.json holds values encoded here in every compact
+encoding; lib/redis-codec.test.ts decodes the same strings, so the Python
+writer and the Node reader are checked against one another. Regenerate it
+from scrapers/ with `PYTHONPATH=. python tests/test_codec.py` after
+changing the format.
+"""
+
+import os
+import json
+import pytest
+
+pytest.importorskip("msgpack")
+
+from utils import codec
+
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "codec_values.json")
+
+COMPANIES = [
+    {"name": "Alpha Ltd", "registrar": "bigshare", "ipoType": "mainboard", "status": "active",
+     "url": "https://ipo.bigshareonline.com/ipo_status.html", "companyValue": "101"},
+    {"name": "Beta SME Ltd", "registrar": "bigshare", "ipoType": "sme", "status": "active",
+     "url": "https://ipo.bigshareonline.com/ipo_status.html", "companyValue": "102"},
+    {"name": "Kappa Ltd", "registrar": "kfin", "ipoType": "mainboard", "status": "active",
+     "url": "https://ipostatus.kfintech.com", "companyValue": None},
+    # Unusual values in interned fields must survive the table too
+    {"name": "Odd Ltd", "registrar": "kfin", "ipoType": None, "status": {"code": 2, "label": "closed"},
+     "url": ["https://a.example", "https://b.example"]},
+    {"name": "Odder Ltd", "registrar": "kfin", "ipoType": 1, "status": True, "url": 1.5},
+]
+
+
+def available(encoding: str) -> bool:
+    return codec.available_encoding(encoding) == encoding
+
+
+@pytest.mark.parametrize("encoding", list(codec.TAGS))
+def test_company_list_round_trip(encoding):
+    if not available(encoding):
+        pytest.skip(f"{encoding} needs a package that is not installed")
+    encoded = codec.encode(COMPANIES, encoding)
+
+    assert encoded.startswith(codec.PREFIX + codec.TAGS[encoding] + ":")
+    assert codec.decode(encoded) == COMPANIES
+
+
+def test_interned_columns_hold_only_indexes():
+    table = codec.pack_companies(COMPANIES)
+    for row in table["r"]:
+        fields = table["k"][row[0]]
+        for field, value in zip(fields, row[1:]):
+            if field in codec.INTERNED_FIELDS:
+                assert isinstance(value, int) and 0 <= value < len(table["v"])
+    # 1, 1.5 and True stay distinct from one another
+    assert codec.unpack_companies(table) == COMPANIES
+
+
+def test_small_values_stay_json():
+    result = {"status": "not_allotted", "message": "IPO not allotted"}
+    assert codec.encode(result, "msgpack+zlib") == json.dumps(result)
+
+
+@pytest.mark.parametrize("encoding", list(codec.TAGS))
+def test_fixture_decodes(encoding):
+    if encoding == "msgpack+zstd" and codec.zstandard is None:
+        pytest.skip("zstandard is not installed")
+    with open(FIXTURE) as f:
+        fixture = json.load(f)
+    assert codec.decode(fixture["encoded"][encoding]) == fixture["value"] == COMPANIES
+
+
+if __name__ == "__main__":
+    with open(FIXTURE, "w") as f:
+        encoded = {encoding: codec.encode(COMPANIES, encoding) for encoding in codec.TAGS}
+        json.dump({"value": COMPANIES, "encoded": encoded}, f, indent=2)
+        f.write("\n")
+    print(f"Wrote {FIXTURE}")
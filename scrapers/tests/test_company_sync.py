@@ -0,0 +1,60 @@
+"""
+Combined company list upkeep across single-registrar and scrape-all syncs
+
+Runs against a native Redis given by REDIS_DIRECT_URL (a local, disposable
+one: the ipo:companies keys are fixed names); skipped when it is not set.
+"""
+
+import os
+import pytest
+
+pytest.importorskip("redis")
+if not os.getenv("REDIS_DIRECT_URL"):
+    pytest.skip("REDIS_DIRECT_URL is not set", allow_module_level=True)
+
+from utils.company_sync import ACTIVE_KEY, CompanySync
+from utils.redis_client import DirectRedisClient
+
+
+def company(name: str, registrar: str) -> dict:
+    return {"name": name, "registrar": registrar, "companyValue": name.split()[0].lower()}
+
+
+@pytest.fixture
+def sync():
+    client = DirectRedisClient(os.environ["REDIS_DIRECT_URL"])
+    keys = client.execute("KEYS", "ipo:companies*")
+    if keys:
+        client.execute("DEL", *keys)
+    yield CompanySync(client)
+    keys = client.execute("KEYS", "ipo:companies*")
+    if keys:
+        client.execute("DEL", *keys)
+
+
+def active_names(sync):
+    return sorted(company["name"] for company in sync.redis.get(ACTIVE_KEY))
+
+
+def test_single_registrar_sync_rebuilds_combined_list(sync):
+    bigshare = [company("Alpha Ltd", "bigshare")]
+    kfin = [company("Kappa Ltd", "kfin")]
+    linkintime = [company("Lima Ltd", "linkintime")]
+    sync.sync_all({"bigshare": bigshare, "kfin": kfin, "linkintime": linkintime})
+
+    bigshare = bigshare + [company("Beta Ltd", "bigshare")]
+    changes = sync.sync("bigshare", bigshare)
+    assert [added["name"] for added in changes["added"]] == ["Beta Ltd"]
+    assert active_names(sync) == ["Alpha Ltd", "Beta Ltd", "Kappa Ltd", "Lima Ltd"]
+
+    # Nothing new since the single-registrar sync; the combined list must stay current
+    sync.sync_all({"bigshare": bigshare, "kfin": kfin, "linkintime": linkintime})
+    assert active_names(sync) == ["Alpha Ltd", "Beta Ltd", "Kappa Ltd", "Lima Ltd"]
+
+
+def test_unchanged_single_registrar_sync_leaves_combined_list(sync):
+    sync.sync_all({"bigshare": [company("Alpha Ltd", "bigshare")], "kfin": [company("Kappa Ltd", "kfin")]})
+    sync.redis.execute("SET", ACTIVE_KEY, '[{"name": "Sentinel"}]')
+
+    sync.sync("bigshare", [company("Alpha Ltd", "bigshare")])
+    assert active_names(sync) == ["Sentinel"]
@@ -0,0 +1,29 @@
+"""Allotment status rules shared by the Link Intime and KFin parsers"""
+
+import pytest
+
+pytest.importorskip("bs4")
+
+from scrapers.parsing import is_not_allotted
+
+
+@pytest.mark.parametrize("text", [
+    "Not Allotted",
+    "Sorry, you have not been allotted any shares",
+    "Unsuccessful",
+])
+def test_negative_outcomes(text):
+    assert is_not_allotted(text)
+
+
+@pytest.mark.parametrize("text", [
+    "Allotted",
+    "Successful",
+    "Allotment not yet finalised",
+    "Allotted. Note: refund will be processed",
+    "Notice: shares allotted",
+    "Cannot display the result",
+    "Nothing to show",
+])
+def test_other_text_is_not_negative(text):
+    assert not is_not_allotted(text)
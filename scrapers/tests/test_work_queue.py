@@ -0,0 +1,127 @@
+"""
+Lease handling of the Redis work queue
+
+Runs against a native Redis given by REDIS_DIRECT_URL (a local one, e.g.
+redis://localhost:6379/15); skipped when it is not set. Every test uses its
+own key prefix and deletes its keys afterwards.
+"""
+
+import os
+import uuid
+import pytest
+
+pytest.importorskip("redis")
+if not os.getenv("REDIS_DIRECT_URL"):
+    pytest.skip("REDIS_DIRECT_URL is not set", allow_module_level=True)
+
+from utils.redis_client import DirectRedisClient
+from utils.work_queue import WorkQueue
+
+
+@pytest.fixture
+def queue():
+    client = DirectRedisClient(os.environ["REDIS_DIRECT_URL"])
+    queue = WorkQueue(client, prefix=f"test:queue:{uuid.uuid4().hex}", visibility_timeout=30, max_attempts=2)
+    yield queue
+    keys = client.execute("KEYS", f"{queue.prefix}:*")
+    if keys:
+        client.execute("DEL", *keys)
+
+
+def lose_lease(queue, record):
+    """What a lapsed visibility timeout leaves behind"""
+    queue.redis.execute("DEL", queue.key("lease", record["id"]))
+
+
+def test_claim_and_complete(queue):
+    job_id = queue.submit("check-allotment", {"pan": "ABCDE1234F"})
+    record = queue.claim("worker-a")
+
+    assert record["id"] == job_id
+    assert queue.redis.execute("GET", queue.key("lease", job_id)) == record["lease"]
+    assert queue.complete(record, {"status": "allotted"})
+    assert queue.result(job_id) == {"ok": True, "result": {"status": "allotted"}}
+    assert queue.stats()["processing"] == 0
+    assert queue.redis.execute("EXISTS", queue.key("lease", job_id)) == 0
+
+
+def test_lanes_claimed_by_priority(queue):
+    background = queue.submit("scrape-companies", {}, "background")
+    interactive = queue.submit("check-allotment", {}, "interactive")
+
+    assert queue.claim("worker-a")["id"] == interactive
+    assert queue.claim("worker-a")["id"] == background
+    assert queue.claim("worker-a") is None
+
+
+def test_renew_extends_only_a_held_lease(queue):
+    queue.submit("check-allotment", {})
+    record = queue.claim("worker-a")
+    queue.redis.execute("EXPIRE", queue.key("lease", record["id"]), 5)
+
+    assert queue.renew(record)
+    assert queue.redis.execute("TTL", queue.key("lease", record["id"])) > 5
+    assert not queue.renew({**record, "lease": "worker-b:stale"})
+
+
+def test_reaper_requeues_lapsed_job_and_drops_stale_outcome(queue):
+    job_id = queue.submit("check-allotment", {})
+    stale = queue.claim("worker-a")
+    lose_lease(queue, stale)
+
+    assert not queue.renew(stale)
+    assert queue.reap(grace=0) == 1
+    assert queue.stats()["pending:interactive"] == 1
+
+    fresh = queue.claim("worker-b")
+    assert fresh["id"] == job_id
+    assert fresh["attempts"] == 1
+    assert fresh["lease"] != stale["lease"]
+
+    # The first worker finishing late must not release the second's job
+    assert not queue.complete(stale, "stale")
+    assert queue.result(job_id) is None
+    assert queue.stats()["processing"] == 1
+
+    assert queue.complete(fresh, "fresh")
+    assert queue.result(job_id) == {"ok": True, "result": "fresh"}
+
+
+def test_reaper_waits_out_grace(queue):
+    queue.submit("check-allotment", {})
+    lose_lease(queue, queue.claim("worker-a"))
+
+    assert queue.reap(grace=60) == 0
+    assert queue.stats()["processing"] == 1
+
+
+def test_reaper_leaves_leased_jobs(queue):
+    queue.submit("check-allotment", {})
+    queue.claim("worker-a")
+
+    assert queue.reap(grace=0) == 0
+    assert queue.stats()["processing"] == 1
+
+
+def test_failures_retry_then_dead_letter(queue):
+    job_id = queue.submit("check-allotment", {})
+
+    assert queue.fail(queue.claim("worker-a"), "timeout")
+    assert queue.result(job_id) is None
+    assert queue.fail(queue.claim("worker-a"), "timeout")
+
+    assert queue.result(job_id) == {"ok": False, "error": "timeout", "attempts": 2}
+    assert queue.stats() == {
+        "pending:interactive": 0, "pending:batch": 0, "pending:background": 0, "processing": 0, "dead": 1,
+    }
+
+
+def test_failed_release_after_lost_lease_changes_nothing(queue):
+    queue.submit("check-allotment", {})
+    stale = queue.claim("worker-a")
+    lose_lease(queue, stale)
+
+    assert not queue.fail(stale, "timeout")
+    assert not queue.reject(stale, "bad params")
+    assert queue.stats()["processing"] == 1
+    assert queue.stats()["dead"] == 0
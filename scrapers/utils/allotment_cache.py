@@ -0,0 +1,173 @@
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+from config import ALLOTMENT_CACHE_TTLS, ALLOTMENT_CACHE_SIZE, ALLOTMENT_CACHE_SALT, REDIS_ENCODING
+from .redis_client import RedisClient, get_redis_client
+
+
+class _InFlight:
+    """A check that is currently running, shared by identical callers"""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result: Optional[Dict] = None
+
+
+class AllotmentCache:
+    """
+    Cache of check_allotment results
+
+    An in-process LRU sits in front of Redis. Entries live for a TTL chosen
+    by result status: final outcomes (allotted / not_allotted) for days,
+    pending and error results for seconds. Concurrent identical checks are
+    coalesced so only one scrape runs per key. Without a configured Redis
+    only the in-process LRU is used.
+
+    The key covers registrar, company and PAN only, so the application
+    number an allotted result echoes back is not stored; results are handed
+    out with the asking request's application_number instead.
+    """
+
+    def __init__(self, redis_client: Optional[RedisClient] = None, max_entries: int = ALLOTMENT_CACHE_SIZE):
+        self.redis = redis_client or get_redis_client()
+        self.shared = self.redis.configured
+        self.max_entries = max_entries
+        self._local: "OrderedDict[str, Tuple[float, Dict]]" = OrderedDict()
+        self._inflight: Dict[str, _InFlight] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def cache_key(registrar: str, company_value: str, pan: str) -> str:
+        """Redis key for one check; the PAN is stored only as a salted hash"""
+        digest = hashlib.sha256(f"{ALLOTMENT_CACHE_SALT}:{pan.strip().upper()}".encode("utf-8")).hexdigest()
+        return f"ipo:allotment:{registrar}:{company_value}:{digest[:32]}"
+
+    @staticmethod
+    def for_request(result: Dict, application_number: Optional[str] = None) -> Dict:
+        """A shared result as this request's own check would have returned it"""
+        result = {k: v for k, v in result.items() if k != "applicationNumber"}
+        if result.get("status") == "allotted":
+            result["applicationNumber"] = application_number if application_number is not None else "N/A"
+        return result
+
+    @staticmethod
+    def ttl_for(result: Dict) -> int:
+        return ALLOTMENT_CACHE_TTLS.get(result.get("status"), ALLOTMENT_CACHE_TTLS["error"])
+
+    def _get_local(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            entry = self._local.get(key)
+            if entry is None:
+                return None
+            expires_at, result = entry
+            if expires_at <= time.monotonic():
+                del self._local[key]
+                return None
+            self._local.move_to_end(key)
+            return result
+
+    def _put_local(self, key: str, result: Dict, ttl: int):
+        with self._lock:
+            self._local[key] = (time.monotonic() + ttl, result)
+            self._local.move_to_end(key)
+            while len(self._local) > self.max_entries:
+                self._local.popitem(last=False)
+
+    def get(
+        self, registrar: str, company_value: str, pan: str, application_number: Optional[str] = None
+    ) -> Optional[Dict]:
+        """Cached result for a check, or None"""
+        key = self.cache_key(registrar, company_value, pan)
+        result = self._get_local(key)
+        if result is not None:
+            return self.for_request(result, application_number)
+
+        result = self.redis.get(key) if self.shared else None
+        if isinstance(result, dict):
+            self._put_local(key, result, self.ttl_for(result))
+            return self.for_request(result, application_number)
+        return None
+
+    def put(self, registrar: str, company_value: str, pan: str, result: Dict):
+        """Store a result with its status-dependent TTL"""
+        ttl = self.ttl_for(result)
+        if ttl <= 0:
+            return
+        key = self.cache_key(registrar, company_value, pan)
+        result = {k: v for k, v in result.items() if k != "applicationNumber"}
+        self._put_local(key, result, ttl)
+        if self.shared:
+            self.redis.set(key, result, ex=ttl, encoding=REDIS_ENCODING)
+
+    def get_or_check(
+        self,
+        registrar: str,
+        company_value: str,
+        pan: str,
+        check: Callable[[], Dict],
+        application_number: Optional[str] = None,
+    ) -> Dict:
+        """Return the cached result, or run check() and cache what it returns"""
+        cached = self.get(registrar, company_value, pan, application_number)
+        if cached is not None:
+            return cached
+        return self.run_check(registrar, company_value, pan, check, application_number)
+
+    def run_check(
+        self,
+        registrar: str,
+        company_value: str,
+        pan: str,
+        check: Callable[[], Dict],
+        application_number: Optional[str] = None,
+    ) -> Dict:
+        """
+        Run check() for a key the caller just missed and cache what it returns
+
+        Callers asking for the same key while a check is running wait for
+        that check instead of starting their own. Only the in-process LRU is
+        consulted again, for a check that finished since the caller's get().
+        """
+        key = self.cache_key(registrar, company_value, pan)
+        result = self._get_local(key)
+        if result is not None:
+            return self.for_request(result, application_number)
+
+        with self._lock:
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = _InFlight()
+                self._inflight[key] = flight
+
+        if not leader:
+            flight.event.wait()
+            return self.for_request(flight.result, application_number)
+
+        try:
+            flight.result = check()
+            self.put(registrar, company_value, pan, flight.result)
+            return flight.result
+        except Exception as e:
+            flight.result = {"status": "error", "message": str(e)}
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            flight.event.set()
+
+
+_cache: Optional[AllotmentCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_allotment_cache() -> AllotmentCache:
+    """Process-wide cache so the LRU and in-flight table are shared"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = AllotmentCache()
+    return _cache
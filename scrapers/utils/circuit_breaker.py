@@ -0,0 +1,218 @@
+"""
+Per-registrar circuit breaker shared through Redis
+
+Keys:
+  ipo:circuit:{registrar}                 open-circuit record (JSON), while open
+  ipo:circuit:{registrar}:probe           held by the one half-open probe
+  ipo:circuit:{registrar}:opens           consecutive opens, for the backoff
+  ipo:circuit:{registrar}:{bucket}:total  checks in a time bucket
+  ipo:circuit:{registrar}:{bucket}:fail   errors and slow calls in a time bucket
+
+Every node counts its outcomes into the shared buckets and reads the shared
+open record, so a registrar that is down is skipped everywhere, not just on
+the node that noticed. Redis problems never block checks: the breaker then
+behaves as closed, and without a configured Redis it is disabled.
+"""
+
+import sys
+import json
+import time
+import random
+import threading
+from typing import Dict, Optional, Tuple
+from config import (
+    CIRCUIT_ENABLED, CIRCUIT_WINDOW, CIRCUIT_BUCKET, CIRCUIT_MIN_REQUESTS, CIRCUIT_ERROR_RATE,
+    CIRCUIT_SLOW_CALL, CIRCUIT_OPEN_BASE, CIRCUIT_OPEN_MAX, CIRCUIT_PROBE_TIMEOUT, CIRCUIT_STATE_CACHE,
+)
+from .metrics import metrics
+from .redis_client import RedisClient, RedisError, get_redis_client
+
+# After a Redis error the breaker stays out of the way (closed) this many
+# seconds before touching Redis again, so an outage costs one failed request
+# per interval rather than one per check
+UNAVAILABLE_BACKOFF = 30.0
+
+_warned = set()
+
+
+def backoff_delay(attempt: int, base: float, cap: float, full_jitter: bool = True) -> float:
+    """
+    Exponential backoff with jitter for the given attempt (0-based)
+
+    Full jitter picks uniformly in [0, delay]; otherwise half the delay is
+    kept fixed ("equal jitter") so the wait never collapses to zero.
+    """
+    delay = min(cap, base * (2 ** attempt))
+    if full_jitter:
+        return random.uniform(0, delay)
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+class CircuitBreaker:
+    """Closed -> open on a high error/slow rate -> half-open probe -> closed or open again"""
+
+    def __init__(self, redis_client: Optional[RedisClient] = None, enabled: bool = CIRCUIT_ENABLED):
+        self.redis = redis_client or get_redis_client()
+        self.enabled = enabled and self.redis.configured
+        self._unavailable_until = 0.0
+        # registrar -> (fetched at, open record or None)
+        self._state_cache: Dict[str, Tuple[float, Optional[Dict]]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(registrar: str, *parts) -> str:
+        return ":".join(["ipo:circuit", registrar] + [str(part) for part in parts])
+
+    def _active(self) -> bool:
+        return self.enabled and time.monotonic() >= self._unavailable_until
+
+    def _unavailable(self, registrar: str, action: str, error: Exception):
+        """Back off from Redis for a while; warn once per registrar and action"""
+        self._unavailable_until = time.monotonic() + UNAVAILABLE_BACKOFF
+        metrics.increment("circuit_errors", registrar=registrar)
+        if (registrar, action) not in _warned:
+            _warned.add((registrar, action))
+            print(f"Circuit breaker {action} failed for {registrar}, treating it as closed: {error}", file=sys.stderr)
+
+    def state(self, registrar: str) -> Optional[Dict]:
+        """The shared open record, cached locally for CIRCUIT_STATE_CACHE seconds"""
+        now = time.monotonic()
+        with self._lock:
+            cached = self._state_cache.get(registrar)
+        if cached and now - cached[0] < CIRCUIT_STATE_CACHE:
+            return cached[1]
+
+        record = self.redis._decode(self.redis.execute("GET", self.key(registrar)))
+        record = record if isinstance(record, dict) else None
+        with self._lock:
+            self._state_cache[registrar] = (now, record)
+        return record
+
+    def retry_after(self, registrar: str) -> float:
+        """Seconds until the circuit may be probed; 0 when closed or ready for a probe"""
+        if not self._active():
+            return 0.0
+        try:
+            record = self.state(registrar)
+        except Exception as e:
+            self._unavailable(registrar, "read", e)
+            return 0.0
+        return max(record["openUntil"] - time.time(), 0.0) if record else 0.0
+
+    def allow(self, registrar: str) -> Tuple[bool, bool, float]:
+        """
+        Whether a check may run now
+
+        Returns:
+            (allowed, is_probe, retry_after_seconds)
+        """
+        if not self._active():
+            return True, False, 0.0
+        try:
+            record = self.state(registrar)
+            if record is None:
+                return True, False, 0.0
+
+            retry_after = record["openUntil"] - time.time()
+            if retry_after > 0:
+                return False, False, retry_after
+
+            # Half-open: one probe at a time across all nodes
+            if self.redis.execute("SET", self.key(registrar, "probe"), "1", "NX", "EX", CIRCUIT_PROBE_TIMEOUT) == "OK":
+                metrics.increment("circuit_probes", registrar=registrar)
+                return True, True, 0.0
+            return False, False, float(CIRCUIT_OPEN_BASE)
+        except Exception as e:
+            self._unavailable(registrar, "read", e)
+            return True, False, 0.0
+
+    def release(self, registrar: str):
+        """Give up a granted probe that ended without reaching the registrar"""
+        try:
+            self.redis.execute("DEL", self.key(registrar, "probe"))
+        except Exception as e:
+            self._unavailable(registrar, "release", e)
+
+    def record(self, registrar: str, ok: bool, seconds: float, probe: bool = False):
+        """Count one outcome; open, reopen or close the circuit as needed"""
+        if not self._active():
+            return
+        failed = not ok or seconds >= CIRCUIT_SLOW_CALL
+        try:
+            if probe:
+                if failed:
+                    self._open(registrar, "probe failed")
+                else:
+                    self._close(registrar)
+                return
+
+            bucket = int(time.time()) // CIRCUIT_BUCKET
+            commands = [
+                ["INCR", self.key(registrar, bucket, "total")],
+                ["EXPIRE", self.key(registrar, bucket, "total"), CIRCUIT_WINDOW + CIRCUIT_BUCKET],
+            ]
+            if failed:
+                commands += [
+                    ["INCR", self.key(registrar, bucket, "fail")],
+                    ["EXPIRE", self.key(registrar, bucket, "fail"), CIRCUIT_WINDOW + CIRCUIT_BUCKET],
+                ]
+            self.redis.pipeline(commands)
+
+            if failed:
+                total, failures = self.window(registrar)
+                if total >= CIRCUIT_MIN_REQUESTS and failures / total >= CIRCUIT_ERROR_RATE:
+                    self._open(registrar, f"{failures}/{total} failed or slow in {CIRCUIT_WINDOW}s")
+        except Exception as e:
+            self._unavailable(registrar, "record", e)
+
+    def window(self, registrar: str) -> Tuple[int, int]:
+        """(checks, failures) over the last CIRCUIT_WINDOW seconds"""
+        current = int(time.time()) // CIRCUIT_BUCKET
+        buckets = range(current - CIRCUIT_WINDOW // CIRCUIT_BUCKET + 1, current + 1)
+        commands = [["GET", self.key(registrar, bucket, kind)] for bucket in buckets for kind in ("total", "fail")]
+        values = [int(value) if value and not isinstance(value, RedisError) else 0 for value in self.redis.pipeline(commands)]
+        return sum(values[0::2]), sum(values[1::2])
+
+    def _open(self, registrar: str, reason: str):
+        opens = int(self.redis.execute("INCR", self.key(registrar, "opens")) or 1)
+        open_for = backoff_delay(opens - 1, CIRCUIT_OPEN_BASE, CIRCUIT_OPEN_MAX, full_jitter=False)
+        record = {"openedAt": time.time(), "openUntil": time.time() + open_for, "opens": opens, "reason": reason}
+        self.redis.pipeline([
+            ["SET", self.key(registrar), json.dumps(record), "EX", int(open_for + CIRCUIT_OPEN_MAX)],
+            ["EXPIRE", self.key(registrar, "opens"), int(CIRCUIT_OPEN_MAX * 4)],
+            ["DEL", self.key(registrar, "probe")],
+        ])
+        with self._lock:
+            self._state_cache[registrar] = (time.monotonic(), record)
+        metrics.increment("circuit_opened", registrar=registrar)
+        print(f"Circuit for {registrar} open for {open_for:.0f}s: {reason}", file=sys.stderr)
+
+    def _close(self, registrar: str):
+        # Forget the window too: its failures are the ones that opened the
+        # circuit and would reopen it on the next error
+        current = int(time.time()) // CIRCUIT_BUCKET
+        buckets = range(current - CIRCUIT_WINDOW // CIRCUIT_BUCKET - 1, current + 1)
+        self.redis.pipeline([
+            ["DEL", self.key(registrar)],
+            ["DEL", self.key(registrar, "opens")],
+            ["DEL", self.key(registrar, "probe")],
+            ["DEL", *[self.key(registrar, bucket, kind) for bucket in buckets for kind in ("total", "fail")]],
+        ])
+        with self._lock:
+            self._state_cache[registrar] = (time.monotonic(), None)
+        metrics.increment("circuit_closed", registrar=registrar)
+        print(f"Circuit for {registrar} closed: probe succeeded", file=sys.stderr)
+
+
+_breaker: Optional[CircuitBreaker] = None
+_breaker_lock = threading.Lock()
+
+
+def get_circuit_breaker() -> CircuitBreaker:
+    """Process-wide breaker so the state cache is shared"""
+    global _breaker
+    if _breaker is None:
+        with _breaker_lock:
+            if _breaker is None:
+                _breaker = CircuitBreaker()
+    return _breaker
@@ -0,0 +1,182 @@
+"""
+Compact value encodings for Redis
+
+  json          plain JSON (the default)
+  msgpack       "bv1:m:" + base64(msgpack)
+  msgpack+zlib  "bv1:mz:" + base64(zlib(msgpack))
+  msgpack+zstd  "bv1:mzs:" + base64(zstd(msgpack)), needs the zstandard package
+
+Values stay text (base64) because the Upstash REST API and the Node client
+carry strings. Readers tell the encodings apart by the prefix, so keys
+written before a switch keep decoding. lib/redis-codec.ts decodes all but
+zstd, so keys the Next.js routes read are written with node_encoding().
+Company lists are packed as a table: each distinct set of fields is listed
+once and the values that repeat from company to company (registrar, url,
+status, ipoType) are interned.
+"""
+
+import sys
+import json
+import zlib
+import base64
+from typing import Any, Dict, List, Tuple
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+PREFIX = "bv1:"
+TAGS = {"msgpack": "m", "msgpack+zlib": "mz", "msgpack+zstd": "mzs"}
+ENCODINGS = ["json"] + list(TAGS)
+# What lib/redis-codec.ts can decode
+NODE_ENCODINGS = {"json", "msgpack", "msgpack+zlib"}
+
+COMPANY_TABLE = "companies/1"
+INTERNED_FIELDS = {"registrar", "url", "status", "ipoType"}
+
+_warned = set()
+
+
+def _warn_once(message: str):
+    if message not in _warned:
+        _warned.add(message)
+        print(message, file=sys.stderr)
+
+
+def available_encoding(encoding: str) -> str:
+    """The requested encoding, or the nearest one whose packages are installed"""
+    if encoding not in ENCODINGS:
+        raise ValueError(f"Unknown Redis encoding: {encoding} (expected one of {', '.join(ENCODINGS)})")
+    if encoding != "json" and msgpack is None:
+        _warn_once(f"Redis encoding {encoding} needs the msgpack package; writing JSON")
+        return "json"
+    if encoding == "msgpack+zstd" and zstandard is None:
+        _warn_once("Redis encoding msgpack+zstd needs the zstandard package; writing msgpack+zlib")
+        return "msgpack+zlib"
+    return encoding
+
+
+def node_encoding(encoding: str) -> str:
+    """The encoding to use for keys the Next.js routes read: zstd becomes zlib"""
+    if encoding in NODE_ENCODINGS or encoding not in ENCODINGS:
+        return encoding
+    _warn_once(f"Redis encoding {encoding} is not readable by the Next.js routes; company lists use msgpack+zlib")
+    return "msgpack+zlib"
+
+
+def _is_company_list(value: Any) -> bool:
+    return (
+        isinstance(value, list) and bool(value)
+        and all(isinstance(item, dict) and "name" in item and "registrar" in item for item in value)
+    )
+
+
+def pack_companies(companies: List[Dict]) -> Dict:
+    """
+    Table form of a company list
+
+    {"$t": "companies/1", "k": [[field, ...], ...], "v": [interned value, ...],
+     "r": [[shape index, value, ...], ...]}
+    """
+    shapes: Dict[Tuple[str, ...], int] = {}
+    interned: Dict[str, int] = {}
+    values: List[Any] = []
+    rows = []
+    for company in companies:
+        fields = tuple(company)
+        shape = shapes.setdefault(fields, len(shapes))
+        row: List[Any] = [shape]
+        for field in fields:
+            value = company[field]
+            if field in INTERNED_FIELDS:
+                # Every value of an interned field goes through the table, so
+                # readers can always treat its column as an index
+                token = json.dumps(value, sort_keys=True, default=str)
+                if token not in interned:
+                    interned[token] = len(values)
+                    values.append(value)
+                row.append(interned[token])
+            else:
+                row.append(value)
+        rows.append(row)
+    return {"$t": COMPANY_TABLE, "k": [list(fields) for fields in shapes], "v": values, "r": rows}
+
+
+def unpack_companies(table: Dict) -> List[Dict]:
+    values = table["v"]
+    shapes = [(fields, [field in INTERNED_FIELDS for field in fields]) for fields in table["k"]]
+    companies = []
+    for row in table["r"]:
+        fields, interned = shapes[row[0]]
+        companies.append({
+            field: values[value] if is_interned else value
+            for field, is_interned, value in zip(fields, interned, row[1:])
+        })
+    return companies
+
+
+def encode(value: Any, encoding: str = "json") -> str:
+    """
+    Serialize a value for SET
+
+    Values other than company lists fall back to JSON when the compact form
+    (with its base64 overhead) would not be smaller, e.g. single allotment
+    results.
+    """
+    encoding = available_encoding(encoding)
+    if encoding == "json":
+        return json.dumps(value)
+
+    is_company_list = _is_company_list(value)
+    payload = msgpack.packb(pack_companies(value) if is_company_list else value, use_bin_type=True)
+    if encoding == "msgpack+zlib":
+        payload = zlib.compress(payload, 6)
+    elif encoding == "msgpack+zstd":
+        payload = zstandard.ZstdCompressor(level=6).compress(payload)
+    encoded = PREFIX + TAGS[encoding] + ":" + base64.b64encode(payload).decode("ascii")
+    if not is_company_list:
+        plain = json.dumps(value)
+        if len(plain) <= len(encoded):
+            return plain
+    return encoded
+
+
+def is_encoded(raw: Any) -> bool:
+    return isinstance(raw, str) and raw.startswith(PREFIX)
+
+
+def decode(raw: str) -> Any:
+    """
+    Inverse of encode() for the prefixed encodings
+
+    Raises:
+        RuntimeError: The package the value was written with is not installed
+        ValueError: Unknown tag or corrupt payload
+    """
+    tag, _, body = raw[len(PREFIX):].partition(":")
+    if tag not in TAGS.values():
+        raise ValueError(f"Unknown encoded value tag: {tag}")
+    if msgpack is None:
+        raise RuntimeError("msgpack-encoded value found but the msgpack package is not installed")
+
+    try:
+        payload = base64.b64decode(body, validate=True)
+        if tag == "mz":
+            payload = zlib.decompress(payload)
+        elif tag == "mzs":
+            if zstandard is None:
+                raise RuntimeError("zstd-compressed value found but the zstandard package is not installed")
+            payload = zstandard.ZstdDecompressor().decompress(payload)
+        value = msgpack.unpackb(payload, raw=False)
+    except (ValueError, zlib.error, msgpack.UnpackException) as e:
+        raise ValueError(f"Corrupt {tag} value: {e}") from e
+
+    if isinstance(value, dict) and value.get("$t") == COMPANY_TABLE:
+        return unpack_companies(value)
+    return value
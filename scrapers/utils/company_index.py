@@ -0,0 +1,298 @@
+"""
+Cross-registrar company index
+
+Resolves a company name to (registrar, companyValue, url) without scanning
+ipo:companies:active. Names are normalized (case, punctuation, "&", and
+suffixes such as " - SME IPO" or "Limited"), then indexed three ways:
+exact normalized name, a trie over every word start for prefix search, and
+character trigrams for fuzzy search (Dice similarity).
+
+The companies behind the index are persisted under ipo:companies:index with
+the CompanySync version of each registrar they reflect. Each sync applies its
+change set to the stored index instead of rebuilding it; a registrar whose
+versions no longer line up is replaced wholesale from its scrape.
+"""
+
+import re
+import sys
+import json
+import time
+import threading
+import unicodedata
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from config import (
+    COMPANY_INDEX_FUZZY_THRESHOLD, COMPANY_INDEX_REFRESH, COMPANY_SNAPSHOT_TTL, REDIS_ENCODING, REGISTRAR_URLS,
+)
+from . import company_sync
+from .redis_client import RedisClient, get_redis_client
+
+INDEX_KEY = "ipo:companies:index"
+# Serializes read-modify-write updates from syncs running on parallel threads
+_update_lock = threading.Lock()
+
+# (registrar, company id within the registrar)
+EntryKey = Tuple[str, str]
+
+_SUFFIX = re.compile(r"\s+-\s+.*\bipo\b.*$")
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+# Words that say nothing about which company is meant
+NOISE_WORDS = {"ipo", "sme", "limited", "ltd", "the", "fpo", "nse", "bse", "emerge"}
+
+
+def normalize_name(name: str) -> str:
+    """
+    Comparable form of a company name
+
+    "Tata Technologies Limited - SME IPO" -> "tata technologies"
+    """
+    text = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode("ascii").lower()
+    text = _SUFFIX.sub("", text).replace("&", " and ")
+    words = [word for word in _NON_WORD.sub(" ", text).split() if word not in NOISE_WORDS]
+    return " ".join(words)
+
+
+def trigrams(text: str) -> Set[str]:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class _TrieNode:
+    __slots__ = ("children", "keys")
+
+    def __init__(self):
+        self.children: Dict[str, "_TrieNode"] = {}
+        self.keys: Set[EntryKey] = set()
+
+
+class CompanyIndex:
+    """In-memory index over the companies of every registrar"""
+
+    def __init__(self):
+        self.companies: Dict[EntryKey, Dict] = {}
+        self.versions: Dict[str, int] = {}
+        self._names: Dict[EntryKey, str] = {}
+        self._exact: Dict[str, Set[EntryKey]] = {}
+        self._grams: Dict[str, Set[EntryKey]] = {}
+        self._trie = _TrieNode()
+
+    def __len__(self) -> int:
+        return len(self.companies)
+
+    @classmethod
+    def build(cls, companies: Iterable[Dict], versions: Optional[Dict[str, int]] = None) -> "CompanyIndex":
+        index = cls()
+        for company in companies:
+            index.add(company)
+        index.versions = dict(versions or {})
+        return index
+
+    def _trie_paths(self, name: str) -> List[str]:
+        """The name from each word start, so "tech" finds "tata technologies" """
+        starts = [0] + [i + 1 for i, char in enumerate(name) if char == " "]
+        return [name[start:] for start in starts]
+
+    def add(self, company: Dict):
+        """Insert or replace a company"""
+        key = (company["registrar"], company_sync.company_id(company))
+        if key in self.companies:
+            self.remove(*key)
+        name = normalize_name(company["name"])
+        self.companies[key] = company
+        self._names[key] = name
+        self._exact.setdefault(name, set()).add(key)
+        for gram in trigrams(name):
+            self._grams.setdefault(gram, set()).add(key)
+        for path in self._trie_paths(name):
+            node = self._trie
+            for char in path:
+                node = node.children.setdefault(char, _TrieNode())
+                node.keys.add(key)
+
+    def remove(self, registrar: str, company_id: str):
+        key = (registrar, company_id)
+        if key not in self.companies:
+            return
+        del self.companies[key]
+        name = self._names.pop(key)
+        self._exact[name].discard(key)
+        if not self._exact[name]:
+            del self._exact[name]
+        for gram in trigrams(name):
+            self._grams[gram].discard(key)
+            if not self._grams[gram]:
+                del self._grams[gram]
+        for path in self._trie_paths(name):
+            node = self._trie
+            for char in path:
+                child = node.children.get(char)
+                if child is None:
+                    break
+                child.keys.discard(key)
+                if not child.keys:
+                    del node.children[char]
+                    break
+                node = child
+
+    def replace_registrar(self, registrar: str, companies: List[Dict], version: int):
+        """Swap in a registrar's full company list"""
+        for key in [key for key in self.companies if key[0] == registrar]:
+            self.remove(*key)
+        for company in companies:
+            self.add(company)
+        self.versions[registrar] = version
+
+    def apply(self, changes: Dict) -> bool:
+        """
+        Apply a CompanySync change set
+
+        Returns:
+            False (and changes nothing) when the change set does not follow
+            the registrar's indexed version
+        """
+        registrar, version = changes["registrar"], changes["version"]
+        current = self.versions.get(registrar, 0)
+        if version == current:
+            return True
+        if version != current + 1:
+            return False
+        for company_id in changes["removed"]:
+            self.remove(registrar, company_id)
+        for company in changes["added"] + changes["changed"]:
+            self.add(company)
+        self.versions[registrar] = version
+        return True
+
+    def _match(self, key: EntryKey, match: str, score: float) -> Dict:
+        company = self.companies[key]
+        return {
+            "name": company["name"],
+            "registrar": company["registrar"],
+            "companyValue": company.get("companyValue"),
+            "url": company.get("url"),
+            "ipoType": company.get("ipoType"),
+            "match": match,
+            "score": round(score, 3),
+        }
+
+    def search(self, query: str, limit: int = 5, registrar: Optional[str] = None) -> List[Dict]:
+        """
+        Best matches for a name: exact normalized matches, then prefix
+        matches (shortest names first), then fuzzy trigram matches
+        """
+        name = normalize_name(query)
+        if not name:
+            return []
+        wanted = (lambda key: key[0] == registrar) if registrar else (lambda key: True)
+        seen: Set[EntryKey] = set()
+        matches = []
+
+        def take(keys: Iterable[EntryKey], match: str, score) -> bool:
+            for key in sorted(keys, key=lambda key: (len(self._names[key]), self._names[key], key)):
+                if key not in seen and wanted(key):
+                    seen.add(key)
+                    matches.append(self._match(key, match, score(key)))
+                    if len(matches) >= limit:
+                        return True
+            return False
+
+        if take(self._exact.get(name, ()), "exact", lambda key: 1.0):
+            return matches
+
+        node = self._trie
+        for char in name:
+            node = node.children.get(char)
+            if node is None:
+                break
+        if node is not None and take(node.keys, "prefix", lambda key: len(name) / len(self._names[key])):
+            return matches
+
+        query_grams = trigrams(name)
+        shared: Dict[EntryKey, int] = {}
+        for gram in query_grams:
+            for key in self._grams.get(gram, ()):
+                shared[key] = shared.get(key, 0) + 1
+        scored = []
+        for key, count in shared.items():
+            if key in seen or not wanted(key):
+                continue
+            score = 2 * count / (len(query_grams) + len(trigrams(self._names[key])))
+            if score >= COMPANY_INDEX_FUZZY_THRESHOLD:
+                scored.append((score, key))
+        for score, key in sorted(scored, key=lambda item: (-item[0], self._names[item[1]]))[:limit - len(matches)]:
+            matches.append(self._match(key, "fuzzy", score))
+        return matches
+
+    def resolve(self, query: str, registrar: Optional[str] = None) -> Optional[Tuple[str, str, str]]:
+        """(registrar, companyValue, url) of the best match, or None"""
+        matches = self.search(query, limit=1, registrar=registrar)
+        if not matches:
+            return None
+        return matches[0]["registrar"], matches[0]["companyValue"], matches[0]["url"]
+
+
+class CompanyIndexStore:
+    """Persists the index in Redis and keeps a process-local copy fresh"""
+
+    def __init__(self, redis: Optional[RedisClient] = None, refresh: float = COMPANY_INDEX_REFRESH):
+        self.redis = redis or get_redis_client()
+        self.refresh = refresh
+        self._index: Optional[CompanyIndex] = None
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    def load(self) -> Optional[CompanyIndex]:
+        """The stored index, or None if there is none"""
+        stored = self.redis.get(INDEX_KEY)
+        if not stored:
+            return None
+        return CompanyIndex.build(stored["companies"], stored["versions"])
+
+    def save(self, index: CompanyIndex):
+        value = {"versions": index.versions, "companies": list(index.companies.values())}
+        self.redis.set(INDEX_KEY, value, ex=COMPANY_SNAPSHOT_TTL, encoding=REDIS_ENCODING)
+
+    def rebuild(self) -> CompanyIndex:
+        """Build the index from every registrar's synced company entries"""
+        snapshots, _ = company_sync.CompanySync(self.redis).load_snapshots(list(REGISTRAR_URLS))
+        index = CompanyIndex()
+        for registrar, snapshot in snapshots.items():
+            companies = [json.loads(entry) for entry in snapshot["entries"].values()]
+            index.replace_registrar(registrar, companies, snapshot["version"]["version"])
+        self.save(index)
+        return index
+
+    def current(self) -> CompanyIndex:
+        """Process-local index, reloaded from Redis every refresh seconds"""
+        with self._lock:
+            if self._index is None or time.monotonic() - self._loaded_at >= self.refresh:
+                self._index = self.load() or self.rebuild()
+                self._loaded_at = time.monotonic()
+            return self._index
+
+    def update(self, changesets: Dict[str, Dict], results: Dict[str, List[Dict]]):
+        """
+        Apply a sync's change sets to the stored index
+
+        A registrar whose change set does not follow the indexed version is
+        replaced with its scraped list; a missing index is rebuilt from the
+        synced entries.
+        """
+        with _update_lock:
+            index = self.load()
+            if index is None:
+                index = self.rebuild()
+                print(f"Company index rebuilt: {len(index)} companies", file=sys.stderr)
+                changesets = {}
+            dirty = False
+            for registrar, changes in changesets.items():
+                if index.versions.get(registrar) == changes["version"]:
+                    continue
+                if not index.apply(changes):
+                    index.replace_registrar(registrar, results[registrar], changes["version"])
+                dirty = True
+            if dirty:
+                self.save(index)
+                print(f"Company index: {len(index)} companies", file=sys.stderr)
+        with self._lock:
+            self._index = index
+            self._loaded_at = time.monotonic()
@@ -0,0 +1,251 @@
+import sys
+import json
+import hashlib
+import threading
+from typing import Dict, List, Optional, Tuple
+from config import COMPANY_LIST_TTL, COMPANY_SNAPSHOT_TTL, REDIS_ENCODING, REGISTRAR_URLS
+from . import codec
+from .redis_client import RedisClient, RedisError, get_redis_client
+
+
+ACTIVE_KEY = "ipo:companies:active"
+# The full lists are read by the Next.js routes too
+LIST_ENCODING = codec.node_encoding(REDIS_ENCODING)
+# Serializes rebuilds of the combined list from syncs running on parallel threads
+_active_lock = threading.Lock()
+
+
+def company_id(company: Dict) -> str:
+    """Stable identity of a company within its registrar"""
+    return str(company.get("companyValue") or company["name"])
+
+
+def encode_company(company: Dict) -> str:
+    return json.dumps(company, sort_keys=True, ensure_ascii=False)
+
+
+def snapshot_etag(entries: Dict[str, str]) -> str:
+    """Content hash of a registrar's company entries, independent of order"""
+    digest = hashlib.sha1()
+    for key in sorted(entries):
+        digest.update(key.encode("utf-8"))
+        digest.update(entries[key].encode("utf-8"))
+    return digest.hexdigest()
+
+
+def diff_companies(previous: Dict[str, str], current: Dict[str, str]) -> Dict[str, List]:
+    """
+    Compare two snapshots of {company id: encoded company}
+
+    Returns:
+        {"added": [company], "changed": [company], "removed": [company id]}
+    """
+    return {
+        "added": [json.loads(current[key]) for key in current if key not in previous],
+        "changed": [json.loads(current[key]) for key in current if key in previous and previous[key] != current[key]],
+        "removed": [key for key in previous if key not in current],
+    }
+
+
+class CompanySync:
+    """
+    Incremental sync of scraped company lists into Redis
+
+    Each registrar's companies are kept as a hash of per-company entries
+    (ipo:companies:{registrar}:entries) with a version/etag record. A sync
+    diffs the fresh scrape against that snapshot and writes only the added,
+    changed and removed entries, plus the change set itself under
+    ipo:companies:{registrar}:changes for downstream consumers. The full
+    JSON lists the Next.js routes read are rewritten only when something
+    changed; otherwise just their TTL is refreshed.
+    """
+
+    def __init__(self, redis_client: Optional[RedisClient] = None):
+        self.redis = redis_client or get_redis_client()
+
+    @staticmethod
+    def keys(registrar: str) -> Dict[str, str]:
+        base = f"ipo:companies:{registrar}"
+        return {
+            "list": base,
+            "entries": f"{base}:entries",
+            "version": f"{base}:version",
+            "changes": f"{base}:changes",
+        }
+
+    def load_snapshots(self, registrars: List[str]) -> Tuple[Dict[str, Dict], bool]:
+        """
+        Previous entries, version record and whether the full list key still
+        exists, per registrar, plus whether the combined key exists; all in
+        one round trip
+        """
+        commands = []
+        for registrar in registrars:
+            keys = self.keys(registrar)
+            commands.append(["HGETALL", keys["entries"]])
+            commands.append(["GET", keys["version"]])
+            commands.append(["EXISTS", keys["list"]])
+        commands.append(["EXISTS", ACTIVE_KEY])
+
+        replies = self.redis.pipeline(commands)
+        for reply in replies:
+            if isinstance(reply, RedisError):
+                raise reply
+
+        snapshots = {}
+        for index, registrar in enumerate(registrars):
+            flat, version, list_exists = replies[3 * index:3 * index + 3]
+            snapshots[registrar] = {
+                "entries": dict(zip(flat[::2], flat[1::2])) if flat else {},
+                "version": json.loads(version) if version else {"version": 0, "etag": ""},
+                "listExists": bool(list_exists),
+            }
+        return snapshots, bool(replies[-1])
+
+    def plan(self, registrar: str, companies: List[Dict], snapshot: Dict) -> Tuple[Dict, List[List]]:
+        """Diff one registrar's scrape against its snapshot and build the write commands"""
+        keys = self.keys(registrar)
+        entries, version = snapshot["entries"], snapshot["version"]
+        current = {company_id(company): encode_company(company) for company in companies}
+        etag = snapshot_etag(current)
+
+        if etag == version.get("etag"):
+            diff = {"added": [], "changed": [], "removed": []}
+            commands = [
+                ["EXPIRE", keys["entries"], COMPANY_SNAPSHOT_TTL],
+                ["EXPIRE", keys["version"], COMPANY_SNAPSHOT_TTL],
+            ]
+            if snapshot["listExists"]:
+                commands.append(["EXPIRE", keys["list"], COMPANY_LIST_TTL])
+            else:
+                commands.append(["SET", keys["list"], codec.encode(companies, LIST_ENCODING), "EX", COMPANY_LIST_TTL])
+            return {"registrar": registrar, "version": version["version"], "etag": etag, **diff}, commands
+
+        diff = diff_companies(entries, current)
+        new_version = {"version": version.get("version", 0) + 1, "etag": etag}
+        changes = {"registrar": registrar, **new_version, **diff}
+
+        commands = []
+        upserts = diff["added"] + diff["changed"]
+        if upserts:
+            command = ["HSET", keys["entries"]]
+            for company in upserts:
+                key = company_id(company)
+                command += [key, current[key]]
+            commands.append(command)
+        if diff["removed"]:
+            commands.append(["HDEL", keys["entries"], *diff["removed"]])
+        commands += [
+            ["EXPIRE", keys["entries"], COMPANY_SNAPSHOT_TTL],
+            ["SET", keys["version"], json.dumps(new_version), "EX", COMPANY_SNAPSHOT_TTL],
+            ["SET", keys["changes"], json.dumps(changes, ensure_ascii=False), "EX", COMPANY_SNAPSHOT_TTL],
+            ["SET", keys["list"], codec.encode(companies, LIST_ENCODING), "EX", COMPANY_LIST_TTL],
+        ]
+        return changes, commands
+
+    def sync_all(self, results: Dict[str, List[Dict]], write_active: bool = True) -> Dict[str, Dict]:
+        """
+        Sync several registrars at once and return each registrar's change set
+
+        An empty scrape for a registrar that previously had companies is
+        treated as a failed scrape: its snapshot is left untouched and its
+        stored companies are kept in the combined list.
+        """
+        registrars = list(results)
+        snapshots, active_exists = self.load_snapshots(registrars)
+
+        commands = []
+        changesets = {}
+        active = []
+        for registrar in registrars:
+            snapshot = snapshots[registrar]
+            companies = results[registrar]
+
+            if not companies and snapshot["entries"]:
+                print(f"No companies scraped from {registrar}; keeping previous snapshot", file=sys.stderr)
+                active += [json.loads(entry) for entry in snapshot["entries"].values()]
+                continue
+
+            changes, registrar_commands = self.plan(registrar, companies, snapshot)
+            changesets[registrar] = changes
+            commands += registrar_commands
+            active += companies
+
+            print(
+                f"{registrar} v{changes['version']}: +{len(changes['added'])} "
+                f"~{len(changes['changed'])} -{len(changes['removed'])}",
+                file=sys.stderr,
+            )
+
+        if write_active:
+            changed = any(changes["added"] or changes["changed"] or changes["removed"] for changes in changesets.values())
+            if changed or not active_exists:
+                commands.append(["SET", ACTIVE_KEY, codec.encode(active, LIST_ENCODING), "EX", COMPANY_LIST_TTL])
+            else:
+                commands.append(["EXPIRE", ACTIVE_KEY, COMPANY_LIST_TTL])
+
+        failed = False
+        for reply in self.redis.pipeline(commands):
+            if isinstance(reply, RedisError):
+                failed = True
+                print(f"Redis sync error: {reply}", file=sys.stderr)
+
+        if changesets and not failed:
+            # company_index builds on this module, so it is imported here
+            from .company_index import CompanyIndexStore
+
+            try:
+                CompanyIndexStore(self.redis).update(changesets, results)
+            except Exception as e:
+                print(f"Error updating company index: {e}", file=sys.stderr)
+
+        return changesets
+
+    def write_active(self, registrars: List[str]):
+        """Rebuild the combined list from every registrar's stored entries, e.g. after single-registrar syncs"""
+        with _active_lock:
+            snapshots, _ = self.load_snapshots(registrars)
+            active = [json.loads(entry) for snapshot in snapshots.values() for entry in snapshot["entries"].values()]
+            self.redis.set(ACTIVE_KEY, active, ex=COMPANY_LIST_TTL, encoding=LIST_ENCODING)
+
+    def refresh_lists(self, registrars: List[str]):
+        """
+        Refresh the TTL of the full lists the Next.js routes read, so they
+        outlive rounds in which nothing was scraped; a list that already
+        expired is rebuilt from the stored entries
+        """
+        commands = [["EXPIRE", self.keys(registrar)["list"], COMPANY_LIST_TTL] for registrar in registrars]
+        commands.append(["EXPIRE", ACTIVE_KEY, COMPANY_LIST_TTL])
+        replies = self.redis.pipeline(commands)
+        for reply in replies:
+            if isinstance(reply, RedisError):
+                raise reply
+
+        missing = [registrar for registrar, reply in zip(registrars, replies) if not reply]
+        if missing:
+            snapshots, _ = self.load_snapshots(missing)
+            commands = []
+            for registrar, snapshot in snapshots.items():
+                if snapshot["entries"]:
+                    companies = [json.loads(entry) for entry in snapshot["entries"].values()]
+                    commands.append(
+                        ["SET", self.keys(registrar)["list"], codec.encode(companies, LIST_ENCODING), "EX", COMPANY_LIST_TTL]
+                    )
+            for reply in self.redis.pipeline(commands):
+                if isinstance(reply, RedisError):
+                    raise reply
+        if not replies[-1]:
+            self.write_active(registrars)
+
+    def sync(self, registrar: str, companies: List[Dict]) -> Optional[Dict]:
+        """
+        Sync one registrar; None when the scrape was treated as failed
+
+        When the registrar's list changed, the combined list is rebuilt from
+        every registrar's stored entries, so a later scrape-all that finds
+        nothing new does not keep the stale one alive.
+        """
+        changes = self.sync_all({registrar: companies}, write_active=False).get(registrar)
+        if changes and (changes["added"] or changes["changed"] or changes["removed"]):
+            self.write_active(list(REGISTRAR_URLS))
+        return changes
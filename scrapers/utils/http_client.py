@@ -0,0 +1,24 @@
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from typing import Optional
+from config import HTTP_POOL_SIZE, USER_AGENT
+
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """Shared keep-alive session for direct registrar requests"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                session.headers.update({"User-Agent": USER_AGENT})
+                _session = session
+    return _session
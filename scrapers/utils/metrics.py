@@ -0,0 +1,176 @@
+"""
+In-process scraper metrics
+Timing spans per registrar and stage (driver start, page load, waits, form
+submit, parse...) plus labelled counters such as allotment outcomes and
+sampled values such as per-driver RSS.
+Exported as JSON lines or as Prometheus text exposition format.
+"""
+
+import json
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+from typing import Deque, Dict, Iterator, List, Tuple
+from config import METRICS_MAX_SPANS
+
+LabelSet = Tuple[Tuple[str, str], ...]
+
+
+def _labels(**labels) -> LabelSet:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _format_labels(labels: LabelSet) -> str:
+    if not labels:
+        return ""
+    escaped = (
+        key + '="' + value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+        for key, value in labels
+    )
+    return "{" + ",".join(escaped) + "}"
+
+
+class Metrics:
+    """Thread-safe registry of timing spans and counters"""
+
+    def __init__(self, max_spans: int = METRICS_MAX_SPANS):
+        self._lock = threading.Lock()
+        self.spans: Deque[Dict] = deque(maxlen=max_spans)
+        # (registrar, stage) -> {"count", "sum", "max", "errors"}
+        self.stage_stats: Dict[Tuple[str, str], Dict[str, float]] = {}
+        self.counters: Dict[Tuple[str, LabelSet], int] = {}
+        # (name, labels) -> {"count", "sum", "max", "last"}
+        self.observations: Dict[Tuple[str, LabelSet], Dict[str, float]] = {}
+
+    def record_span(self, stage: str, registrar: str, seconds: float, ok: bool = True):
+        """Record one completed span"""
+        with self._lock:
+            self.spans.append({
+                "type": "span",
+                "ts": round(time.time(), 3),
+                "registrar": registrar,
+                "stage": stage,
+                "seconds": round(seconds, 4),
+                "ok": ok,
+            })
+            stats = self.stage_stats.setdefault(
+                (registrar, stage), {"count": 0, "sum": 0.0, "max": 0.0, "errors": 0}
+            )
+            stats["count"] += 1
+            stats["sum"] += seconds
+            stats["max"] = max(stats["max"], seconds)
+            if not ok:
+                stats["errors"] += 1
+
+    @contextmanager
+    def span(self, stage: str, registrar: str) -> Iterator[None]:
+        """Time a block; the span is marked not ok if the block raises"""
+        started = time.monotonic()
+        ok = False
+        try:
+            yield
+            ok = True
+        finally:
+            self.record_span(stage, registrar, time.monotonic() - started, ok)
+
+    def increment(self, name: str, value: int = 1, **labels):
+        """Add to a labelled counter, e.g. increment("allotment_results", registrar="kfin", status="allotted")"""
+        key = (name, _labels(**labels))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        """Record a sampled value, e.g. observe("driver_rss_mb", 180.5, registrar="kfin")"""
+        key = (name, _labels(**labels))
+        with self._lock:
+            stats = self.observations.setdefault(key, {"count": 0, "sum": 0.0, "max": 0.0, "last": 0.0})
+            stats["count"] += 1
+            stats["sum"] += value
+            stats["max"] = max(stats["max"], value)
+            stats["last"] = value
+
+    def reset(self):
+        """Drop everything recorded so far"""
+        with self._lock:
+            self.spans.clear()
+            self.stage_stats.clear()
+            self.counters.clear()
+            self.observations.clear()
+
+    def json_lines(self) -> List[str]:
+        """Recorded spans followed by current counter values, one JSON object per line"""
+        with self._lock:
+            lines = [json.dumps(span) for span in self.spans]
+            for (name, labels), value in sorted(self.counters.items()):
+                lines.append(json.dumps({"type": "counter", "name": name, "labels": dict(labels), "value": value}))
+            for (name, labels), stats in sorted(self.observations.items()):
+                lines.append(json.dumps({"type": "observation", "name": name, "labels": dict(labels), **stats}))
+        return lines
+
+    def write_json_lines(self, path: str):
+        """Append spans and counters to a JSON lines file"""
+        lines = self.json_lines()
+        if lines:
+            with open(path, "a") as f:
+                f.write("\n".join(lines) + "\n")
+
+    def prometheus(self) -> str:
+        """Stage timings and counters in Prometheus text exposition format"""
+        with self._lock:
+            stage_stats = sorted(self.stage_stats.items())
+            counters = sorted(self.counters.items())
+            observations = sorted((key, dict(stats)) for key, stats in self.observations.items())
+
+        out = [
+            "# HELP scraper_stage_seconds Time spent per scraper stage",
+            "# TYPE scraper_stage_seconds summary",
+        ]
+        for (registrar, stage), stats in stage_stats:
+            labels = _format_labels(_labels(registrar=registrar, stage=stage))
+            out.append(f"scraper_stage_seconds_sum{labels} {stats['sum']:.6f}")
+            out.append(f"scraper_stage_seconds_count{labels} {stats['count']}")
+
+        out += [
+            "# HELP scraper_stage_seconds_max Slowest observation per scraper stage",
+            "# TYPE scraper_stage_seconds_max gauge",
+        ]
+        for (registrar, stage), stats in stage_stats:
+            labels = _format_labels(_labels(registrar=registrar, stage=stage))
+            out.append(f"scraper_stage_seconds_max{labels} {stats['max']:.6f}")
+
+        out += [
+            "# HELP scraper_stage_errors_total Stages that raised or timed out",
+            "# TYPE scraper_stage_errors_total counter",
+        ]
+        for (registrar, stage), stats in stage_stats:
+            labels = _format_labels(_labels(registrar=registrar, stage=stage))
+            out.append(f"scraper_stage_errors_total{labels} {stats['errors']}")
+
+        seen = set()
+        for (name, labels), value in counters:
+            metric = f"scraper_{name}_total"
+            if metric not in seen:
+                seen.add(metric)
+                out.append(f"# TYPE {metric} counter")
+            out.append(f"{metric}{_format_labels(labels)} {value}")
+
+        for name in sorted({name for (name, _), _ in observations}):
+            metric = f"scraper_{name}"
+            samples = [
+                (_format_labels(labels), stats)
+                for (sample_name, labels), stats in observations if sample_name == name
+            ]
+            out.append(f"# TYPE {metric} summary")
+            for labels, stats in samples:
+                out.append(f"{metric}_sum{labels} {stats['sum']:.6f}")
+                out.append(f"{metric}_count{labels} {stats['count']}")
+            out.append(f"# TYPE {metric}_max gauge")
+            for labels, stats in samples:
+                out.append(f"{metric}_max{labels} {stats['max']:.6f}")
+
+        return "\n".join(out) + "\n"
+
+
+# Process-wide registry
+metrics = Metrics()
@@ -1,55 +1,227 @@
+import sys
 import json
+import threading
 import requests
-from typing import Any, Optional
-from config import REDIS_URL, REDIS_TOKEN
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from typing import Any, Dict, List, Optional
+from config import REDIS_URL, REDIS_TOKEN, REDIS_TIMEOUT, REDIS_RETRIES, REDIS_POOL_SIZE, REDIS_DIRECT_URL
+from . import codec
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+
+class RedisError(Exception):
+    """Raised when Upstash returns an error for a command"""
 
 
 class RedisClient:
-    """Simple Redis client using Upstash REST API"""
+    """
+    Redis client using the Upstash REST API
 
-    def __init__(self):
+    Commands go over one keep-alive session with timeouts. Only failed
+    connections are retried: every command is a POST and many (INCR, LPUSH,
+    LMOVE) are not idempotent, so a request that may have reached Redis is
+    never sent twice. pipeline() and multi_exec() send many commands in a
+    single round trip.
+    """
+
+    def __init__(self, timeout: float = REDIS_TIMEOUT, retries: int = REDIS_RETRIES):
         self.base_url = REDIS_URL.rstrip("/")
         self.headers = {"Authorization": f"Bearer {REDIS_TOKEN}"}
+        self.timeout = timeout
+
+        retry = Retry(total=retries, connect=retries, read=0, status=0, other=0, backoff_factor=0.2)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=REDIS_POOL_SIZE, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update(self.headers)
+
+    @property
+    def configured(self) -> bool:
+        """Whether a Redis endpoint is set at all"""
+        return bool(self.base_url)
 
-    def set(self, key: str, value: Any, ex: Optional[int] = None) -> bool:
-        """Set a key-value pair in Redis with optional expiration"""
+    @staticmethod
+    def _encode(value: Any, encoding: str = "json") -> str:
+        return codec.encode(value, encoding) if not isinstance(value, str) else value
+
+    @staticmethod
+    def _decode(result: Any) -> Optional[Any]:
+        if not result:
+            return None
+        if codec.is_encoded(result):
+            return codec.decode(result)
         try:
-            data = json.dumps(value) if not isinstance(value, str) else value
-            url = f"{self.base_url}/set/{key}"
-            params = {}
-            if ex:
-                params["EX"] = ex
+            return json.loads(result)
+        except (json.JSONDecodeError, TypeError):
+            return result
+
+    def _post(self, path: str, body: Any) -> Any:
+        response = self.session.post(f"{self.base_url}{path}", json=body, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    @staticmethod
+    def _unwrap(reply: Dict) -> Any:
+        if "error" in reply:
+            raise RedisError(reply["error"])
+        return reply.get("result")
+
+    def execute(self, *command: Any) -> Any:
+        """Run a single Redis command, e.g. execute("SET", "key", "value", "EX", 60)"""
+        return self._unwrap(self._post("", [str(part) for part in command]))
 
-            response = requests.post(url, headers=self.headers, data=data, params=params)
-            return response.status_code == 200
+    def pipeline(self, commands: List[List[Any]]) -> List[Any]:
+        """
+        Run several commands in one round trip (not atomic)
+
+        Returns:
+            One result per command; a failed command yields a RedisError
+            instance in its slot instead of raising
+        """
+        if not commands:
+            return []
+        replies = self._post("/pipeline", [[str(part) for part in command] for command in commands])
+        return [RedisError(reply["error"]) if "error" in reply else reply.get("result") for reply in replies]
+
+    def multi_exec(self, commands: List[List[Any]]) -> List[Any]:
+        """Run several commands atomically in one round trip (MULTI/EXEC)"""
+        if not commands:
+            return []
+        replies = self._post("/multi-exec", [[str(part) for part in command] for command in commands])
+        return [self._unwrap(reply) for reply in replies]
+
+    def set(self, key: str, value: Any, ex: Optional[int] = None, encoding: str = "json") -> bool:
+        """Set a key-value pair in Redis with optional expiration and encoding (see utils/codec.py)"""
+        try:
+            command = ["SET", key, self._encode(value, encoding)]
+            if ex:
+                command += ["EX", ex]
+            return self.execute(*command) == "OK"
         except Exception as e:
-            print(f"Redis SET error: {e}")
+            print(f"Redis SET error: {e}", file=sys.stderr)
             return False
 
     def get(self, key: str) -> Optional[Any]:
         """Get a value from Redis by key"""
         try:
-            url = f"{self.base_url}/get/{key}"
-            response = requests.get(url, headers=self.headers)
-
-            if response.status_code == 200:
-                result = response.json().get("result")
-                if result:
-                    try:
-                        return json.loads(result)
-                    except json.JSONDecodeError:
-                        return result
-            return None
+            return self._decode(self.execute("GET", key))
         except Exception as e:
-            print(f"Redis GET error: {e}")
+            print(f"Redis GET error: {e}", file=sys.stderr)
             return None
 
     def delete(self, key: str) -> bool:
         """Delete a key from Redis"""
         try:
-            url = f"{self.base_url}/del/{key}"
-            response = requests.post(url, headers=self.headers)
-            return response.status_code == 200
+            self.execute("DEL", key)
+            return True
+        except Exception as e:
+            print(f"Redis DELETE error: {e}", file=sys.stderr)
+            return False
+
+    def set_many(self, items: Dict[str, Any], ex: Optional[int] = None, atomic: bool = False) -> bool:
+        """Set many keys (each with the same optional expiration) in one round trip"""
+        commands = []
+        for key, value in items.items():
+            command = ["SET", key, self._encode(value)]
+            if ex:
+                command += ["EX", ex]
+            commands.append(command)
+
+        try:
+            results = self.multi_exec(commands) if atomic else self.pipeline(commands)
+            return all(result == "OK" for result in results)
+        except Exception as e:
+            print(f"Redis SET error: {e}", file=sys.stderr)
+            return False
+
+    def mset(self, items: Dict[str, Any], ex: Optional[int] = None) -> bool:
+        """Set many keys atomically; MSET when there is no expiration"""
+        if ex:
+            return self.set_many(items, ex=ex, atomic=True)
+        try:
+            command = ["MSET"]
+            for key, value in items.items():
+                command += [key, self._encode(value)]
+            return self.execute(*command) == "OK"
         except Exception as e:
-            print(f"Redis DELETE error: {e}")
+            print(f"Redis MSET error: {e}", file=sys.stderr)
             return False
+
+    def mget(self, keys: List[str]) -> List[Optional[Any]]:
+        """Get many keys in one round trip; missing keys come back as None"""
+        if not keys:
+            return []
+        try:
+            return [self._decode(result) for result in self.execute("MGET", *keys)]
+        except Exception as e:
+            print(f"Redis MGET error: {e}", file=sys.stderr)
+            return [None] * len(keys)
+
+
+class DirectRedisClient(RedisClient):
+    """
+    Same interface over a native Redis connection (redis-py)
+
+    Replies are left raw (response callbacks disabled) so they match what
+    the REST API returns: "OK" for SET, flat lists for HGETALL, ints for
+    EXPIRE and so on.
+    """
+
+    def __init__(self, url: str = REDIS_DIRECT_URL, timeout: float = REDIS_TIMEOUT):
+        if redis is None:
+            raise RuntimeError("REDIS_DIRECT_URL is set but the redis package is not installed")
+        self.timeout = timeout
+        self.client = redis.Redis.from_url(
+            url, decode_responses=True, socket_timeout=timeout, max_connections=REDIS_POOL_SIZE
+        )
+        self.client.response_callbacks.clear()
+
+    @property
+    def configured(self) -> bool:
+        return True
+
+    def execute(self, *command: Any) -> Any:
+        try:
+            return self.client.execute_command(*command)
+        except redis.ResponseError as e:
+            raise RedisError(str(e)) from e
+
+    def pipeline(self, commands: List[List[Any]]) -> List[Any]:
+        if not commands:
+            return []
+        pipe = self.client.pipeline(transaction=False)
+        for command in commands:
+            pipe.execute_command(*command)
+        replies = pipe.execute(raise_on_error=False)
+        return [RedisError(str(reply)) if isinstance(reply, Exception) else reply for reply in replies]
+
+    def multi_exec(self, commands: List[List[Any]]) -> List[Any]:
+        if not commands:
+            return []
+        pipe = self.client.pipeline(transaction=True)
+        for command in commands:
+            pipe.execute_command(*command)
+        try:
+            return pipe.execute()
+        except redis.ResponseError as e:
+            raise RedisError(str(e)) from e
+
+
+_client: Optional[RedisClient] = None
+_client_lock = threading.Lock()
+
+
+def get_redis_client() -> RedisClient:
+    """Process-wide client so every caller shares one connection pool"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = DirectRedisClient() if REDIS_DIRECT_URL else RedisClient()
+    return _client
@@ -0,0 +1,332 @@
+"""
+Buffered writer of allotment results into the Prisma AllotmentCheck table
+
+Results are mapped to AllotmentCheck rows (amount strings such as "₹7,450.00"
+become floats) and written in batches: one transaction per batch, as a
+multi-row INSERT or COPY on Postgres and executemany on SQLite. The SQLite
+backend creates the two tables it needs, so a local file works as a test
+database. Rows need the company's IPOCompany id; rows that only carry the
+company name are resolved with one query per batch. The backends also read
+IPOCompany allotment and listing dates for the change watcher.
+"""
+
+import re
+import sys
+import time
+import uuid
+import sqlite3
+import threading
+from datetime import date, datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from config import RESULTS_DATABASE_URL, SINK_BATCH_SIZE, SINK_FLUSH_INTERVAL, SINK_PG_MODE
+from .metrics import metrics
+
+try:
+    import psycopg
+except ImportError:
+    psycopg = None
+
+COLUMNS = [
+    "id", "companyId", "panNumber", "applicationNumber", "dpId", "clientId", "status", "sharesAllotted",
+    "amountPaid", "refundAmount", "listingGains", "gainPercentage", "checkedAt", "createdAt", "updatedAt",
+]
+# Outcomes the table records; errors are not checks
+STORED_STATUSES = {"allotted", "not_allotted", "pending"}
+
+_NUMBER = re.compile(r"-?\d+(?:\.\d+)?")
+
+
+def parse_amount(value: Any) -> Optional[float]:
+    """"₹7,450.00", "14250" or 14250 -> 7450.0 / 14250.0; None when there is no number"""
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = _NUMBER.search(str(value).replace(",", ""))
+    return float(match.group()) if match else None
+
+
+def to_row(result: Dict, pan: str, company_id: str, **options) -> Dict:
+    """
+    AllotmentCheck columns for one check_allotment() result
+
+    Args:
+        options: application_number, dp_id, client_id as passed to the check
+    """
+    status = result.get("status")
+    if "shares" in result:
+        shares = int(parse_amount(result["shares"]) or 0)
+    else:
+        shares = 0 if status == "not_allotted" else None
+    application_number = options.get("application_number") or result.get("applicationNumber")
+    # Prisma DateTime columns are timestamp(3) without time zone, holding UTC
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    return {
+        "id": "c" + uuid.uuid4().hex[:24],
+        "companyId": company_id,
+        "panNumber": pan,
+        "applicationNumber": application_number if application_number not in (None, "", "N/A") else None,
+        "dpId": options.get("dp_id"),
+        "clientId": options.get("client_id"),
+        "status": status,
+        "sharesAllotted": shares,
+        "amountPaid": parse_amount(result.get("amount")),
+        "refundAmount": parse_amount(result.get("refundAmount")),
+        "listingGains": None,
+        "gainPercentage": None,
+        "checkedAt": now,
+        "createdAt": now,
+        "updatedAt": now,
+    }
+
+
+class SinkBackend:
+    """Writes batches of AllotmentCheck rows and resolves company names to ids"""
+
+    def write(self, rows: List[Dict]):
+        raise NotImplementedError
+
+    def company_ids(self, names: Iterable[str]) -> Dict[str, str]:
+        raise NotImplementedError
+
+    def key_dates(self, registrar: str, since: date) -> List[date]:
+        """Allotment and listing dates on or after since of the registrar's IPOCompany rows"""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class SqliteBackend(SinkBackend):
+    """Local file database with the same tables and column names as the Prisma schema"""
+
+    SCHEMA = [
+        """CREATE TABLE IF NOT EXISTS "IPOCompany" (
+            "id" TEXT PRIMARY KEY, "name" TEXT UNIQUE NOT NULL, "sector" TEXT NOT NULL DEFAULT '',
+            "registrar" TEXT NOT NULL, "status" TEXT NOT NULL DEFAULT 'active',
+            "allotmentDate" TEXT, "listingDate" TEXT
+        )""",
+        """CREATE TABLE IF NOT EXISTS "AllotmentCheck" (
+            "id" TEXT PRIMARY KEY, "companyId" TEXT NOT NULL REFERENCES "IPOCompany" ("id"),
+            "panNumber" TEXT NOT NULL, "applicationNumber" TEXT, "dpId" TEXT, "clientId" TEXT,
+            "status" TEXT NOT NULL, "sharesAllotted" INTEGER, "amountPaid" REAL, "refundAmount" REAL,
+            "listingGains" REAL, "gainPercentage" REAL,
+            "checkedAt" TEXT NOT NULL, "createdAt" TEXT NOT NULL, "updatedAt" TEXT NOT NULL
+        )""",
+        'CREATE INDEX IF NOT EXISTS "AllotmentCheck_panNumber_idx" ON "AllotmentCheck" ("panNumber")',
+    ]
+
+    def __init__(self, path: str):
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self.conn:
+            for statement in self.SCHEMA:
+                self.conn.execute(statement)
+
+    def write(self, rows: List[Dict]):
+        placeholders = ", ".join("?" for _ in COLUMNS)
+        columns = ", ".join(f'"{column}"' for column in COLUMNS)
+        values = [
+            tuple(row[column].isoformat() if isinstance(row[column], datetime) else row[column] for column in COLUMNS)
+            for row in rows
+        ]
+        with self._lock, self.conn:
+            self.conn.executemany(f'INSERT INTO "AllotmentCheck" ({columns}) VALUES ({placeholders})', values)
+
+    def company_ids(self, names: Iterable[str]) -> Dict[str, str]:
+        names = list(names)
+        if not names:
+            return {}
+        with self._lock:
+            cursor = self.conn.execute(
+                f'SELECT "name", "id" FROM "IPOCompany" WHERE "name" IN ({", ".join("?" for _ in names)})', names
+            )
+            return dict(cursor.fetchall())
+
+    def key_dates(self, registrar: str, since: date) -> List[date]:
+        with self._lock:
+            cursor = self.conn.execute(
+                'SELECT "allotmentDate", "listingDate" FROM "IPOCompany" WHERE "registrar" = ?', [registrar]
+            )
+            rows = cursor.fetchall()
+        found = [date.fromisoformat(str(value)[:10]) for row in rows for value in row if value]
+        return [day for day in found if day >= since]
+
+    def close(self):
+        self.conn.close()
+
+
+class PostgresBackend(SinkBackend):
+    """The app's Postgres database through psycopg 3: COPY or multi-row INSERT per batch"""
+
+    def __init__(self, url: str, mode: str = SINK_PG_MODE):
+        if psycopg is None:
+            raise RuntimeError("A Postgres results database is configured but the psycopg package is not installed")
+        if mode not in ("copy", "insert"):
+            raise ValueError(f"Unknown SINK_PG_MODE: {mode}")
+        self.mode = mode
+        self.conn = psycopg.connect(url)
+        self._lock = threading.Lock()
+
+    def write(self, rows: List[Dict]):
+        columns = ", ".join(f'"{column}"' for column in COLUMNS)
+        values = [tuple(row[column] for column in COLUMNS) for row in rows]
+        with self._lock, self.conn.transaction(), self.conn.cursor() as cursor:
+            if self.mode == "copy":
+                with cursor.copy(f'COPY "AllotmentCheck" ({columns}) FROM STDIN') as copy:
+                    for value in values:
+                        copy.write_row(value)
+            else:
+                row_placeholders = "(" + ", ".join("%s" for _ in COLUMNS) + ")"
+                cursor.execute(
+                    f'INSERT INTO "AllotmentCheck" ({columns}) VALUES ' + ", ".join(row_placeholders for _ in values),
+                    [item for value in values for item in value],
+                )
+
+    def company_ids(self, names: Iterable[str]) -> Dict[str, str]:
+        names = list(names)
+        if not names:
+            return {}
+        with self._lock, self.conn.transaction(), self.conn.cursor() as cursor:
+            cursor.execute('SELECT "name", "id" FROM "IPOCompany" WHERE "name" = ANY(%s)', [names])
+            return dict(cursor.fetchall())
+
+    def key_dates(self, registrar: str, since: date) -> List[date]:
+        with self._lock, self.conn.transaction(), self.conn.cursor() as cursor:
+            cursor.execute(
+                'SELECT "allotmentDate", "listingDate" FROM "IPOCompany" '
+                'WHERE "registrar" = %s AND ("allotmentDate" >= %s OR "listingDate" >= %s)',
+                [registrar, since, since],
+            )
+            return [value.date() for row in cursor.fetchall() for value in row if value and value.date() >= since]
+
+    def close(self):
+        self.conn.close()
+
+
+def get_backend(url: str = RESULTS_DATABASE_URL) -> SinkBackend:
+    """sqlite:///path/to/file.db or postgresql://..."""
+    if url.startswith("sqlite:///"):
+        return SqliteBackend(url[len("sqlite:///"):])
+    if url.startswith(("postgres://", "postgresql://")):
+        return PostgresBackend(url)
+    raise ValueError(f"Unsupported results database URL: {url or '(not set)'}")
+
+
+class ResultSink:
+    """
+    Buffers results and writes them in batches
+
+    add() may be called from any thread. A batch is written once
+    batch_size rows are buffered or flush_interval seconds have passed since
+    the last write, and by flush() / close(). Rows a write failed on stay
+    buffered for the next flush; add() raises once max_buffered rows are
+    waiting, so a caller stops instead of outrunning the database.
+    """
+
+    def __init__(
+        self,
+        backend: SinkBackend,
+        batch_size: int = SINK_BATCH_SIZE,
+        flush_interval: float = SINK_FLUSH_INTERVAL,
+        max_buffered: Optional[int] = None,
+    ):
+        self.backend = backend
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_buffered = max_buffered or batch_size * 10
+        self._buffer: List[Tuple[Dict, Optional[str]]] = []
+        self._company_ids: Dict[str, Optional[str]] = {}
+        self._flushed_at = time.monotonic()
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self.counts = {"written": 0, "skipped": 0, "unmatched": 0, "failed": 0}
+
+    def add(
+        self,
+        result: Dict,
+        pan: str,
+        company_id: Optional[str] = None,
+        company_name: Optional[str] = None,
+        **options
+    ):
+        """Buffer one result; error results and rows with no company are skipped"""
+        if result.get("status") not in STORED_STATUSES or not (company_id or company_name):
+            with self._lock:
+                self.counts["skipped"] += 1
+            return
+
+        row = to_row(result, pan, company_id or "", **options)
+        with self._lock:
+            if len(self._buffer) >= self.max_buffered:
+                raise RuntimeError(f"{len(self._buffer)} allotment results are waiting for a failed database write")
+            self._buffer.append((row, None if company_id else company_name))
+            due = len(self._buffer) >= self.batch_size or time.monotonic() - self._flushed_at >= self.flush_interval
+        if due:
+            self.flush()
+
+    def _resolve(self, pending: List[Tuple[Dict, Optional[str]]]) -> List[Dict]:
+        """Fill in companyId for rows that only have a company name"""
+        unknown = {name for _, name in pending if name and name not in self._company_ids}
+        if unknown:
+            found = self.backend.company_ids(unknown)
+            for name in unknown:
+                self._company_ids[name] = found.get(name)
+                if name not in found:
+                    print(f"No IPOCompany named {name!r}; its results are not stored", file=sys.stderr)
+
+        rows = []
+        for row, name in pending:
+            if name:
+                row["companyId"] = self._company_ids.get(name)
+            if row["companyId"]:
+                rows.append(row)
+            else:
+                self.counts["unmatched"] += 1
+        return rows
+
+    def flush(self, raise_errors: bool = False):
+        """
+        Write everything buffered, as one batch per batch_size rows
+
+        Rows that were not written go back to the buffer.
+
+        Args:
+            raise_errors: Re-raise a failed write, e.g. so a checkpoint is not
+                saved past rows that are not stored
+        """
+        with self._write_lock:
+            with self._lock:
+                pending, self._buffer = self._buffer, []
+                self._flushed_at = time.monotonic()
+            if not pending:
+                return
+
+            unwritten = pending
+            try:
+                rows = self._resolve(pending)
+                unwritten = [(row, None) for row in rows]
+                for start in range(0, len(rows), self.batch_size):
+                    batch = rows[start:start + self.batch_size]
+                    with metrics.span("sink_flush", "results"):
+                        self.backend.write(batch)
+                    self.counts["written"] += len(batch)
+                    unwritten = unwritten[len(batch):]
+            except Exception as e:
+                with self._lock:
+                    self._buffer[:0] = unwritten
+                metrics.increment("sink_write_errors")
+                print(f"Error writing {len(unwritten)} allotment results, keeping them buffered: {e}", file=sys.stderr)
+                if raise_errors:
+                    raise
+
+    def close(self):
+        """Flush, then count whatever still could not be written as failed"""
+        self.flush()
+        with self._lock:
+            failed, self._buffer = len(self._buffer), []
+        if failed:
+            self.counts["failed"] += failed
+            metrics.increment("sink_failed_rows", failed)
+            print(f"{failed} allotment results were not stored", file=sys.stderr)
+        self.backend.close()
@@ -0,0 +1,251 @@
+"""
+Redis work queue shared by scraper workers on any number of nodes
+
+Keys (prefix WORK_QUEUE_PREFIX):
+  {prefix}:pending:{lane}   job ids waiting, one list per priority lane
+  {prefix}:processing       job ids claimed by some worker
+  {prefix}:dead             job ids that used up their attempts
+  {prefix}:job:{id}         job record (JSON)
+  {prefix}:lease:{id}       the holder's lease token while a worker holds the job
+  {prefix}:result:{id}      outcome callers wait on (JSON)
+
+A worker claims a job by moving its id from a pending list to processing
+(LMOVE) and setting a lease with the visibility timeout, which it renews
+while the job runs. Jobs left in processing without a lease (the worker
+died or stalled) are put back by reap() until their attempts run out.
+Renewing and releasing a job check the lease token in the same script, so a
+worker whose lease lapsed cannot touch a job another worker has since
+claimed; its outcome is dropped.
+"""
+
+import sys
+import json
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+from config import (
+    WORK_QUEUE_PREFIX, WORK_QUEUE_VISIBILITY_TIMEOUT, WORK_QUEUE_MAX_ATTEMPTS, WORK_QUEUE_RESULT_TTL,
+    WORK_QUEUE_POLL_INTERVAL,
+)
+from .redis_client import RedisClient, RedisError, get_redis_client
+
+# Claimed in this order
+LANES = ["interactive", "batch", "background"]
+
+# KEYS: lease; ARGV: token, seconds
+RENEW_SCRIPT = """
+if redis.call("GET", KEYS[1]) ~= ARGV[1] then
+    return 0
+end
+return redis.call("EXPIRE", KEYS[1], ARGV[2])
+"""
+
+# KEYS: lease, processing, job, result[, list to push the id to]
+# ARGV: token ("" when the reaper, which took the job over, releases it),
+#       job id, record, outcome ("" for none), TTL[, LPUSH or RPUSH]
+RELEASE_SCRIPT = """
+if ARGV[1] ~= "" and redis.call("GET", KEYS[1]) ~= ARGV[1] then
+    return 0
+end
+redis.call("DEL", KEYS[1])
+redis.call("LREM", KEYS[2], 1, ARGV[2])
+redis.call("SET", KEYS[3], ARGV[3], "EX", ARGV[5])
+if ARGV[4] ~= "" then
+    redis.call("SET", KEYS[4], ARGV[4], "EX", ARGV[5])
+end
+if KEYS[5] then
+    redis.call(ARGV[6], KEYS[5], ARGV[2])
+end
+return 1
+"""
+
+
+class WorkQueue:
+    """Producer and consumer operations on the Redis job lists"""
+
+    def __init__(
+        self,
+        redis_client: Optional[RedisClient] = None,
+        prefix: str = WORK_QUEUE_PREFIX,
+        visibility_timeout: int = WORK_QUEUE_VISIBILITY_TIMEOUT,
+        max_attempts: int = WORK_QUEUE_MAX_ATTEMPTS,
+        result_ttl: int = WORK_QUEUE_RESULT_TTL,
+    ):
+        self.redis = redis_client or get_redis_client()
+        self.prefix = prefix
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        self.result_ttl = result_ttl
+        # Job id -> when reap() first saw it without a lease
+        self._unleased_since: Dict[str, float] = {}
+
+    def key(self, *parts: str) -> str:
+        return ":".join((self.prefix,) + parts)
+
+    def submit(self, job: str, params: Dict, lane: str = "interactive") -> str:
+        """Queue a job and return its id"""
+        if lane not in LANES:
+            raise ValueError(f"Unknown lane: {lane}")
+        job_id = uuid.uuid4().hex
+        record = {
+            "id": job_id,
+            "job": job,
+            "params": params,
+            "lane": lane,
+            "attempts": 0,
+            "enqueuedAt": time.time(),
+        }
+        self._check(self.redis.pipeline([
+            ["SET", self.key("job", job_id), json.dumps(record), "EX", self.result_ttl],
+            ["LPUSH", self.key("pending", lane), job_id],
+        ]))
+        return job_id
+
+    def result(self, job_id: str) -> Optional[Dict]:
+        """{"ok": True, "result": ...} or {"ok": False, "error": ...}; None while pending"""
+        return self.redis.get(self.key("result", job_id))
+
+    def wait(self, job_id: str, timeout: float, poll: float = 0.2) -> Dict:
+        """
+        Poll for a job's outcome
+
+        Raises:
+            TimeoutError: No outcome within timeout seconds
+        """
+        deadline = time.monotonic() + timeout
+        delay = poll
+        while True:
+            outcome = self.result(job_id)
+            if outcome is not None:
+                return outcome
+            if time.monotonic() + delay > deadline:
+                raise TimeoutError(f"Job {job_id} did not finish within {timeout}s")
+            time.sleep(delay)
+            delay = min(delay * 1.5, WORK_QUEUE_POLL_INTERVAL)
+
+    def claim(self, worker_id: str) -> Optional[Dict]:
+        """
+        Take the next job, highest-priority lane first; None when all lanes are empty
+
+        The record carries the lease token ("lease") that renew() and the
+        release methods check.
+        """
+        for lane in LANES:
+            job_id = self.redis.execute("LMOVE", self.key("pending", lane), self.key("processing"), "RIGHT", "LEFT")
+            if not job_id:
+                continue
+
+            # Unique per claim: threads of one worker share its id
+            token = f"{worker_id}:{uuid.uuid4().hex[:12]}"
+            replies = self.redis.pipeline([
+                ["SET", self.key("lease", job_id), token, "EX", self.visibility_timeout],
+                ["GET", self.key("job", job_id)],
+            ])
+            record = replies[1]
+            if not isinstance(record, str):
+                # Record expired or unreadable; nothing to run
+                self.redis.pipeline([
+                    ["LREM", self.key("processing"), 1, job_id],
+                    ["DEL", self.key("lease", job_id)],
+                ])
+                continue
+            return {**json.loads(record), "lease": token}
+        return None
+
+    def renew(self, record: Dict) -> bool:
+        """Extend a held lease; False if it lapsed (and may now be someone else's)"""
+        reply = self.redis.execute(
+            "EVAL", RENEW_SCRIPT, 1, self.key("lease", record["id"]), record["lease"], self.visibility_timeout
+        )
+        return bool(reply)
+
+    def complete(self, record: Dict, result: Any) -> bool:
+        """Store a job's result and release it; False if the lease was lost and the result dropped"""
+        return self._release(record, {"ok": True, "result": result})
+
+    def fail(self, record: Dict, error: str) -> bool:
+        """
+        Release a failed job for another attempt, or record the failure once
+        attempts run out; False if the lease was lost and nothing changed
+        """
+        record = {**record, "attempts": record["attempts"] + 1, "lastError": error}
+        if record["attempts"] >= self.max_attempts:
+            return self._release(record, {"ok": False, "error": error, "attempts": record["attempts"]}, dead=True)
+        # RPUSH puts it at the claiming end, ahead of newer jobs
+        return self._release(record, push=("RPUSH", self.key("pending", record["lane"])))
+
+    def reject(self, record: Dict, error: str) -> bool:
+        """Record a failure that retrying won't fix"""
+        return self._release(record, {"ok": False, "error": error, "attempts": record["attempts"] + 1}, dead=True)
+
+    def _release(
+        self,
+        record: Dict,
+        outcome: Optional[Dict] = None,
+        dead: bool = False,
+        push: Optional[Tuple[str, str]] = None,
+    ) -> bool:
+        """Store the record (and outcome) and free the job, if record's lease still holds it"""
+        job_id = record["id"]
+        if dead:
+            push = ("LPUSH", self.key("dead"))
+        keys = [self.key("lease", job_id), self.key("processing"), self.key("job", job_id), self.key("result", job_id)]
+        stored = json.dumps({k: v for k, v in record.items() if k != "lease"})
+        args = [record.get("lease", ""), job_id, stored, json.dumps(outcome) if outcome else "", self.result_ttl]
+        if push:
+            keys.append(push[1])
+            args.append(push[0])
+        if self.redis.execute("EVAL", RELEASE_SCRIPT, len(keys), *keys, *args):
+            return True
+        print(f"Job {job_id} ({record['job']}) is no longer leased here; dropping its outcome", file=sys.stderr)
+        return False
+
+    def reap(self, grace: float = 5.0) -> int:
+        """
+        Requeue jobs whose lease has lapsed; returns how many were requeued
+
+        A job must be seen without a lease for `grace` seconds first, which
+        covers the moment between a claim's LMOVE and its lease write.
+        """
+        job_ids: List[str] = self.redis.execute("LRANGE", self.key("processing"), 0, -1) or []
+        if not job_ids:
+            self._unleased_since.clear()
+            return 0
+
+        leases = self.redis.pipeline([["EXISTS", self.key("lease", job_id)] for job_id in job_ids])
+        now = time.monotonic()
+        unleased = {job_id for job_id, exists in zip(job_ids, leases) if exists == 0}
+        self._unleased_since = {job_id: self._unleased_since.get(job_id, now) for job_id in unleased}
+
+        requeued = 0
+        for job_id, since in list(self._unleased_since.items()):
+            if now - since < grace:
+                continue
+            del self._unleased_since[job_id]
+            # Only the reaper whose LREM removes the id requeues it
+            if not self.redis.execute("LREM", self.key("processing"), 1, job_id):
+                continue
+            record = self.redis.get(self.key("job", job_id))
+            if not isinstance(record, dict):
+                continue
+            print(f"Job {job_id} ({record['job']}) lost its lease; requeueing", file=sys.stderr)
+            # Back into processing so fail() handles it like any other
+            # attempt; the record from Redis has no lease token, as the
+            # reaper's LREM already made the job its own
+            self.redis.execute("LPUSH", self.key("processing"), job_id)
+            self.fail(record, "Lease expired")
+            requeued += 1
+        return requeued
+
+    def stats(self) -> Dict[str, int]:
+        """Queue lengths"""
+        lists = [("pending:" + lane, self.key("pending", lane)) for lane in LANES]
+        lists += [("processing", self.key("processing")), ("dead", self.key("dead"))]
+        lengths = self.redis.pipeline([["LLEN", key] for _, key in lists])
+        return {name: length if isinstance(length, int) else 0 for (name, _), length in zip(lists, lengths)}
+
+    @staticmethod
+    def _check(replies: List[Any]):
+        for reply in replies:
+            if isinstance(reply, RedisError):
+                raise reply
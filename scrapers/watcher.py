@@ -0,0 +1,225 @@
+"""
+Company list watcher
+Decides per registrar whether a browser scrape is worth running. A probe is
+a conditional GET (If-None-Match / If-Modified-Since from the previous
+response) of the page that carries the company list; on a 200 only the
+ddlCompany options (Bigshare, Link Intime) are hashed, so view state and
+other page noise do not count as changes. The registrar is scraped and
+synced only when that fingerprint changes, or when its last scrape is older
+than WATCH_MAX_STALE (which also covers pages whose list is rendered
+client-side, e.g. KFin).
+
+Probe state is kept in Redis (ipo:watch:{registrar}) so `watch --once` from
+cron remembers fingerprints between runs. Every check also refreshes the TTL
+of the company lists the Next.js routes read, so they do not expire between
+scrapes while nothing changes. The polling interval per registrar
+tightens around its IPOs' allotment and listing dates and right after a
+change, and relaxes otherwise.
+"""
+
+import sys
+import json
+import time
+import hashlib
+import threading
+from datetime import date, datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+from lxml import html
+from config import (
+    REGISTRAR_URLS, HTTP_TIMEOUT, RESULTS_DATABASE_URL, WATCH_INTERVAL_FAST, WATCH_INTERVAL_SLOW,
+    WATCH_DATE_WINDOW, WATCH_KEY_DATES, WATCH_CHANGE_HOLD, WATCH_MAX_STALE, WATCH_STATE_TTL,
+)
+from utils.company_sync import CompanySync
+from utils.http_client import get_session
+from utils.metrics import metrics
+from utils.redis_client import RedisClient, get_redis_client
+
+# Allotment and listing dates are Indian calendar days
+IST = timezone(timedelta(hours=5, minutes=30))
+# How long key dates read from the database are reused, in seconds
+DATES_REFRESH = 3600
+
+Option = Tuple[str, Optional[str]]
+
+
+def state_key(registrar: str) -> str:
+    return f"ipo:watch:{registrar}"
+
+
+def select_options(page: bytes, select_id: str = "ddlCompany") -> Optional[List[Option]]:
+    """(label, value) of every option of a server-rendered <select>; None if the page has no such select"""
+    document = html.fromstring(page)
+    selects = document.xpath("//select[@id=$id]", id=select_id)
+    if not selects:
+        return None
+    return [(option.text_content().strip(), option.get("value")) for option in selects[0].iter("option")]
+
+
+def fingerprint(options: List[Option]) -> str:
+    """Order-independent hash of a company list"""
+    return hashlib.sha1(json.dumps(sorted(options, key=str), ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def probe(registrar: str, state: Dict) -> Dict:
+    """
+    Conditional fetch of a registrar's company list
+
+    Returns:
+        {"status": "not_modified" | "fetched" | "unwatchable", "fingerprint",
+         "etag", "lastModified"}
+    """
+    if registrar == "kfin":
+        return {"status": "unwatchable", "message": "KFin lists issues client-side"}
+
+    headers: Dict[str, str] = {}
+    if state.get("etag"):
+        headers["If-None-Match"] = state["etag"]
+    if state.get("lastModified"):
+        headers["If-Modified-Since"] = state["lastModified"]
+
+    with metrics.span("watch_probe", registrar):
+        response = get_session().get(REGISTRAR_URLS[registrar], headers=headers, timeout=HTTP_TIMEOUT)
+    if response.status_code == 304:
+        return {
+            "status": "not_modified",
+            "fingerprint": state.get("fingerprint"),
+            "etag": state.get("etag"),
+            "lastModified": state.get("lastModified"),
+        }
+    response.raise_for_status()
+
+    options = select_options(response.content)
+    if options is None:
+        return {"status": "unwatchable", "message": "No ddlCompany list in the page"}
+
+    return {
+        "status": "fetched",
+        "fingerprint": fingerprint(options),
+        "etag": response.headers.get("ETag"),
+        "lastModified": response.headers.get("Last-Modified"),
+    }
+
+
+class Watcher:
+    """Probes registrars and scrapes the ones whose company list changed"""
+
+    def __init__(
+        self,
+        scrape: Callable[[str], List[Dict]],
+        registrars: List[str],
+        redis: Optional[RedisClient] = None,
+    ):
+        """
+        Args:
+            scrape: Scrapes one registrar without syncing it (the watcher syncs)
+        """
+        self.scrape = scrape
+        self.registrars = registrars
+        self.redis = redis or get_redis_client()
+        self.sync = CompanySync(self.redis)
+        self._dates: Dict[str, Tuple[float, List[date]]] = {}
+        self._dates_lock = threading.Lock()
+
+    def key_dates(self, registrar: str) -> List[date]:
+        """Upcoming and recent allotment/listing dates for a registrar's IPOs"""
+        today = datetime.now(IST).date()
+        dates = [date.fromisoformat(day) for day in WATCH_KEY_DATES]
+        if not RESULTS_DATABASE_URL:
+            return dates
+
+        with self._dates_lock:
+            cached = self._dates.get(registrar)
+            if cached is None or time.monotonic() - cached[0] >= DATES_REFRESH:
+                from utils.result_sink import get_backend
+
+                found: List[date] = []
+                try:
+                    backend = get_backend()
+                    try:
+                        found = backend.key_dates(registrar, today - timedelta(days=WATCH_DATE_WINDOW))
+                    finally:
+                        backend.close()
+                except Exception as e:
+                    print(f"Error reading {registrar} IPO dates: {e}", file=sys.stderr)
+                cached = (time.monotonic(), found)
+                self._dates[registrar] = cached
+        return dates + cached[1]
+
+    def interval(self, registrar: str, state: Dict) -> float:
+        """Seconds until the registrar's next probe"""
+        today = datetime.now(IST).date()
+        near_date = any(abs((day - today).days) <= WATCH_DATE_WINDOW for day in self.key_dates(registrar))
+        recently_changed = time.time() - state.get("changedAt", 0) < WATCH_CHANGE_HOLD
+        return WATCH_INTERVAL_FAST if near_date or recently_changed else WATCH_INTERVAL_SLOW
+
+    def check(self, registrar: str, force: bool = False) -> Dict:
+        """Probe one registrar and scrape it if its list changed (or is stale, or force)"""
+        state = self.redis.get(state_key(registrar)) or {}
+        now = time.time()
+        try:
+            result = probe(registrar, state)
+        except Exception as e:
+            result = {"status": "error", "message": str(e)}
+            print(f"Error probing {registrar}: {e}", file=sys.stderr)
+        metrics.increment("watch_probes", registrar=registrar, status=result["status"])
+
+        changed = result["status"] == "fetched" and result["fingerprint"] != state.get("fingerprint")
+        stale = now - state.get("scrapedAt", 0) >= WATCH_MAX_STALE
+        reason = "changed" if changed else "forced" if force else "stale" if stale else None
+        summary: Dict = {"registrar": registrar, "probe": result["status"], "scraped": False, "reason": reason}
+        if "message" in result:
+            summary["message"] = result["message"]
+
+        state["checkedAt"] = now
+        if reason is None:
+            if result["status"] == "fetched":
+                state.update(etag=result["etag"], lastModified=result["lastModified"])
+        else:
+            summary.update(self.scrape_and_sync(registrar))
+            # Only remember the new fingerprint (and its validators) once the
+            # scrape that reflects it succeeded, so a failed scrape is retried
+            if summary["companies"]:
+                state["scrapedAt"] = now
+                if result["status"] in ("fetched", "not_modified"):
+                    state.update(
+                        fingerprint=result["fingerprint"], etag=result["etag"], lastModified=result["lastModified"]
+                    )
+                if summary.get("changes"):
+                    state["changedAt"] = now
+
+        self.redis.set(state_key(registrar), state, ex=WATCH_STATE_TTL)
+        try:
+            self.sync.refresh_lists(list(REGISTRAR_URLS))
+        except Exception as e:
+            print(f"Error refreshing company lists: {e}", file=sys.stderr)
+        summary["nextCheck"] = self.interval(registrar, state)
+        return summary
+
+    def scrape_and_sync(self, registrar: str) -> Dict:
+        metrics.increment("watch_scrapes", registrar=registrar)
+        companies = self.scrape(registrar)
+        changes = self.sync.sync(registrar, companies) if companies else None
+        changed = bool(changes and (changes["added"] or changes["changed"] or changes["removed"]))
+        return {
+            "scraped": True,
+            "companies": len(companies),
+            "changes": {key: len(changes[key]) for key in ("added", "changed", "removed")} if changed else None,
+        }
+
+    def run_once(self, force: bool = False) -> Dict[str, Dict]:
+        """Check every registrar once, in parallel"""
+        with ThreadPoolExecutor(max_workers=len(self.registrars), thread_name_prefix="watch") as executor:
+            summaries = executor.map(lambda registrar: self.check(registrar, force), self.registrars)
+            return {summary["registrar"]: summary for summary in summaries}
+
+    def run(self):
+        """Check each registrar on its own adaptive interval until interrupted"""
+        due = {registrar: 0.0 for registrar in self.registrars}
+        while True:
+            for registrar in self.registrars:
+                if due[registrar] <= time.monotonic():
+                    summary = self.check(registrar)
+                    due[registrar] = time.monotonic() + summary["nextCheck"]
+                    print(json.dumps(summary), flush=True)
+            time.sleep(max(1.0, min(due.values()) - time.monotonic()))
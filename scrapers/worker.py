@@ -0,0 +1,105 @@
+"""
+Queue worker
+Pulls jobs from the Redis work queue and runs them against the same job
+table as the scraper service, so any number of `python main.py worker`
+processes on different nodes share the scraping load. Each job's lease is
+renewed while it runs; one thread per process requeues jobs whose worker
+disappeared.
+
+Callers submit with WorkQueue.submit("check-allotment", {...}) and wait on
+WorkQueue.wait(job_id, timeout), or push the same records from Node.
+"""
+
+import os
+import sys
+import socket
+import threading
+from typing import Any, Callable, Dict, Optional
+from config import WORK_QUEUE_POLL_INTERVAL
+from utils.metrics import metrics
+from utils.work_queue import WorkQueue
+
+Job = Callable[[Dict], Any]
+
+
+class Worker:
+    """Claims and runs queued jobs on `concurrency` threads"""
+
+    def __init__(self, jobs: Dict[str, Job], queue: WorkQueue, concurrency: int):
+        self.jobs = jobs
+        self.queue = queue
+        self.concurrency = concurrency
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self.stopping = threading.Event()
+
+    def run_job(self, record: Dict):
+        job = self.jobs.get(record["job"])
+        if job is None:
+            self.queue.reject(record, f"Unknown job: {record['job']}")
+            return
+
+        done = threading.Event()
+
+        def heartbeat():
+            while not done.wait(self.queue.visibility_timeout / 3):
+                if not self.queue.renew(record):
+                    print(f"Lease on job {record['id']} lapsed while running", file=sys.stderr)
+                    return
+
+        threading.Thread(target=heartbeat, daemon=True).start()
+        try:
+            with metrics.span(f"worker_{record['job']}", record["params"].get("registrar", "all")):
+                result = job(record["params"])
+        except (KeyError, ValueError) as e:
+            # Bad params won't succeed on retry
+            self.queue.reject(record, str(e))
+        except Exception as e:
+            print(f"Job {record['id']} ({record['job']}) failed: {e}", file=sys.stderr)
+            self.queue.fail(record, str(e))
+        else:
+            self.queue.complete(record, result)
+        finally:
+            done.set()
+
+    def _consume(self):
+        while not self.stopping.is_set():
+            try:
+                record = self.queue.claim(self.worker_id)
+            except Exception as e:
+                print(f"Error claiming job: {e}", file=sys.stderr)
+                record = None
+
+            if record is None:
+                self.stopping.wait(WORK_QUEUE_POLL_INTERVAL)
+                continue
+
+            metrics.increment("worker_jobs", job=record["job"], lane=record["lane"])
+            self.run_job(record)
+
+    def _reap(self):
+        while not self.stopping.wait(self.queue.visibility_timeout / 2):
+            try:
+                self.queue.reap()
+            except Exception as e:
+                print(f"Error reaping jobs: {e}", file=sys.stderr)
+
+    def run(self, on_shutdown: Optional[Callable[[], None]] = None):
+        """Consume until interrupted, then let running jobs finish"""
+        threads = [threading.Thread(target=self._consume, name=f"worker-{i}") for i in range(self.concurrency)]
+        threads.append(threading.Thread(target=self._reap, name="reaper", daemon=True))
+        for thread in threads:
+            thread.start()
+        print(f"Worker {self.worker_id} consuming with {self.concurrency} threads", file=sys.stderr)
+
+        try:
+            while any(thread.is_alive() for thread in threads[:-1]):
+                for thread in threads[:-1]:
+                    thread.join(timeout=1)
+        except KeyboardInterrupt:
+            print("Stopping worker; waiting for running jobs", file=sys.stderr)
+            self.stopping.set()
+            for thread in threads[:-1]:
+                thread.join()
+        finally:
+            if on_shutdown:
+                on_shutdown()